@@ -0,0 +1,25 @@
+"""Add loans (status, due_date) index
+
+Revision ID: 5b1f3c9a7d20
+Revises: 27e74ef764f3
+Create Date: 2026-10-17 10:12:40.512384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f3c9a7d20'
+down_revision: Union[str, None] = '27e74ef764f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_loans_status_due_date', 'loans', ['status', 'due_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_loans_status_due_date', table_name='loans')
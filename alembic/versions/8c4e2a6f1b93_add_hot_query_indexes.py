@@ -0,0 +1,45 @@
+"""Add composite and partial indexes for hot loan, book and author queries
+
+Revision ID: 8c4e2a6f1b93
+Revises: 5b1f3c9a7d20
+Create Date: 2026-10-17 11:02:17.204981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2a6f1b93'
+down_revision: Union[str, None] = '5b1f3c9a7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial indexes only exist on Postgres (SQLite cannot match them against bound parameters)
+PARTIAL_INDEXES = [
+    ('ix_loans_open_id', ['id'], "status IN ('ACTIVE', 'OVERDUE')"),
+    ('ix_loans_active_user_id', ['user_id'], "status = 'ACTIVE'"),
+]
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    # On Postgres, build the indexes without blocking writes to the (large) tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_loans_user_id_status', 'loans', ['user_id', 'status'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_loans_book_id'), 'loans', ['book_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_books_author_id'), 'books', ['author_id'], unique=False, postgresql_concurrently=True)
+        if is_postgres:
+            for name, columns, where in PARTIAL_INDEXES:
+                op.create_index(name, 'loans', columns, unique=False, postgresql_where=sa.text(where), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, _, _ in reversed(PARTIAL_INDEXES):
+            op.drop_index(name, table_name='loans')
+    op.drop_index(op.f('ix_books_author_id'), table_name='books')
+    op.drop_index(op.f('ix_loans_book_id'), table_name='loans')
+    op.drop_index('ix_loans_user_id_status', table_name='loans')
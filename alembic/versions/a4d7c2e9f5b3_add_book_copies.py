@@ -0,0 +1,72 @@
+"""Add book_copies and the books' copy counters, one copy per existing book
+
+Revision ID: a4d7c2e9f5b3
+Revises: f2b8e4c6a9d1
+Create Date: 2026-10-17 18:40:12.604518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7c2e9f5b3'
+down_revision: Union[str, None] = 'f2b8e4c6a9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'book_copies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('is_available', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_book_copies_id'), 'book_copies', ['id'], unique=False)
+    op.create_index('ix_book_copies_book_id_is_available', 'book_copies', ['book_id', 'is_available'], unique=False)
+    op.add_column('books', sa.Column('copy_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('books', sa.Column('available_count', sa.Integer(), server_default='1', nullable=False))
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.add_column(sa.Column('copy_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_loans_copy_id'), ['copy_id'], unique=False)
+        batch_op.create_foreign_key('fk_loans_copy_id_book_copies', 'book_copies', ['copy_id'], ['id'])
+
+    # Every existing book becomes one copy, lent out if the book was; loans point at it
+    op.execute(
+        "INSERT INTO book_copies (book_id, is_available, created_at) "
+        "SELECT id, COALESCE(is_available, TRUE), created_at FROM books"
+    )
+    op.execute("UPDATE books SET available_count = CASE WHEN COALESCE(is_available, TRUE) THEN 1 ELSE 0 END")
+    op.execute("UPDATE loans SET copy_id = (SELECT id FROM book_copies WHERE book_copies.book_id = loans.book_id)")
+
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_books_lent_author_id', table_name='books', postgresql_concurrently=True)
+            op.create_index(
+                'ix_books_lent_author_id', 'books', ['author_id'], unique=False,
+                postgresql_where=sa.text('available_count < copy_count'), postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_books_lent_author_id', table_name='books')
+        op.create_index(
+            'ix_books_lent_author_id', 'books', ['author_id'], unique=False,
+            postgresql_where=sa.text('NOT is_available'),
+        )
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_constraint('fk_loans_copy_id_book_copies', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_loans_copy_id'))
+        batch_op.drop_column('copy_id')
+    op.drop_column('books', 'available_count')
+    op.drop_column('books', 'copy_count')
+    op.drop_index('ix_book_copies_book_id_is_available', table_name='book_copies')
+    op.drop_index(op.f('ix_book_copies_id'), table_name='book_copies')
+    op.drop_table('book_copies')
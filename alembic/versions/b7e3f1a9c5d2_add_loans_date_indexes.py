@@ -0,0 +1,29 @@
+"""Add loans loan_date and return_date indexes for the windowed loan stats rebuild
+
+Revision ID: b7e3f1a9c5d2
+Revises: a4d7c2e9f5b3
+Create Date: 2026-10-17 21:14:36.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1a9c5d2'
+down_revision: Union[str, None] = 'a4d7c2e9f5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # On Postgres, build the indexes without blocking writes to the (large) loans table
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_loans_loan_date'), 'loans', ['loan_date'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_loans_return_date'), 'loans', ['return_date'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_loans_return_date'), table_name='loans')
+    op.drop_index(op.f('ix_loans_loan_date'), table_name='loans')
@@ -0,0 +1,32 @@
+"""Count OVERDUE loans in users.active_loan_count, so overdue loans keep counting against the loan limit
+
+Revision ID: c8f2a5d1e7b4
+Revises: b7e3f1a9c5d2
+Create Date: 2026-10-17 22:40:12.734915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2a5d1e7b4'
+down_revision: Union[str, None] = 'b7e3f1a9c5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recount(statuses: str) -> None:
+    op.execute(
+        "UPDATE users SET active_loan_count = ("
+        f"SELECT count(*) FROM loans WHERE loans.user_id = users.id AND loans.status IN ({statuses}))"
+    )
+
+
+def upgrade() -> None:
+    _recount("'ACTIVE', 'OVERDUE'")
+
+
+def downgrade() -> None:
+    _recount("'ACTIVE'")
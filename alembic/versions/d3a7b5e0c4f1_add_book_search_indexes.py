@@ -0,0 +1,37 @@
+"""Add full-text and trigram search indexes on book titles and author names
+
+Revision ID: d3a7b5e0c4f1
+Revises: 8c4e2a6f1b93
+Create Date: 2026-10-17 12:20:05.871342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7b5e0c4f1'
+down_revision: Union[str, None] = '8c4e2a6f1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Other databases search with the in-process index (app/services/book_search_service.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_title_tsv', 'books', [sa.text("to_tsvector('simple', title)")], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_books_title_trgm', 'books', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_authors_name_trgm', 'authors', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_authors_name_trgm', table_name='authors')
+    op.drop_index('ix_books_title_trgm', table_name='books')
+    op.drop_index('ix_books_title_tsv', table_name='books')
@@ -0,0 +1,32 @@
+"""Add users.active_loan_count, backfilled from ACTIVE loans
+
+Revision ID: e6c9d4a2b8f7
+Revises: d3a7b5e0c4f1
+Create Date: 2026-10-17 14:21:05.318760
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6c9d4a2b8f7'
+down_revision: Union[str, None] = 'd3a7b5e0c4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('active_loan_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE users SET active_loan_count = ("
+        "SELECT count(*) FROM loans WHERE loans.user_id = users.id AND loans.status = 'ACTIVE'"
+        ") WHERE EXISTS ("
+        "SELECT 1 FROM loans WHERE loans.user_id = users.id AND loans.status = 'ACTIVE')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'active_loan_count')
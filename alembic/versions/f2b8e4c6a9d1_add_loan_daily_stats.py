@@ -0,0 +1,56 @@
+"""Add loan_daily_stats, backfilled from the loan history
+
+Revision ID: f2b8e4c6a9d1
+Revises: e6c9d4a2b8f7
+Create Date: 2026-10-17 16:02:41.907213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8e4c6a9d1'
+down_revision: Union[str, None] = 'e6c9d4a2b8f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'loan_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('checkouts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('returns', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('late_returns', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+        sa.PrimaryKeyConstraint('day', 'book_id'),
+    )
+    op.execute(
+        "INSERT INTO loan_daily_stats (day, book_id, author_id, checkouts, returns, late_returns) "
+        "SELECT events.day, events.book_id, books.author_id, "
+        "SUM(events.checkouts), SUM(events.returns), SUM(events.late_returns) FROM ("
+        "SELECT date(loan_date) AS day, book_id, 1 AS checkouts, 0 AS returns, 0 AS late_returns FROM loans "
+        "UNION ALL "
+        "SELECT date(return_date), book_id, 0, 1, CASE WHEN return_date > due_date THEN 1 ELSE 0 END "
+        "FROM loans WHERE return_date IS NOT NULL"
+        ") AS events JOIN books ON books.id = events.book_id "
+        "GROUP BY events.day, events.book_id, books.author_id"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_books_lent_author_id', 'books', ['author_id'], unique=False,
+                postgresql_where=sa.text('NOT is_available'), postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_books_lent_author_id', table_name='books')
+    op.drop_table('loan_daily_stats')
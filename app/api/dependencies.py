@@ -1,50 +1,63 @@
-from typing import Generator
+from typing import Optional
 import redis
-from app.core.database import SessionLocal
+from app.core.database import DBSession, get_db, is_async, run_db
+from app.core.cache import get_redis
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from pydantic import ValidationError
 
 from app.core.config import settings
-from app.services.user_service import user_service
-from app.domain.entities.user import User
+from app.core.auth_cache import auth_cache
+from app.core.pagination import decode_cursor
+from app.services.user_service import async_user_service, user_service
+from app.domain.dtos.user import UserResponse
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login"
 )
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
+async def get_redis_client() -> Optional[redis.Redis]:
+    """
+    Shared pooled client, or None while Redis is down (callers then skip the cache).
+    """
+    return get_redis()
 
-def get_redis_client():
+async def get_cursor(after: Optional[str] = None) -> Optional[int]:
+    """
+    Decodes the opaque `after` cursor of keyset-paginated list endpoints.
+    """
+    if after is None:
+        return None
     try:
-        client = redis.from_url(settings.REDIS_URL)
-        yield client
-    except redis.ConnectionError:
-        yield None
-    finally:
-        pass
+        return decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
 
-def get_current_user(
-    db: SessionLocal = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = payload.get("sub")
-    except (jwt.PyJWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = user_service.get_user(db, user_id=int(token_data))
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_current_user(
+    db: DBSession = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> UserResponse:
+    """
+    Resolves the token's user. Repeat requests with the same token are served from `auth_cache`
+    without decoding the JWT or querying `users`.
+    """
+    user = auth_cache.get(token)
+    if user is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            user_id = int(payload.get("sub"))
+        except (jwt.PyJWTError, ValidationError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        service = async_user_service if is_async(db) else user_service
+        user = await run_db(db, service.get_user, user_id=user_id, response_model=Optional[UserResponse])
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        auth_cache.set(token, user, token_expires_at=payload.get("exp"))
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     return user
-
@@ -1,22 +1,23 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.core.database import DBSession, run_db
 from app.services.user_service import user_service
-from app.core.security import verify_password, create_access_token
+from app.core.security import password_pool, create_access_token
 from app.core.config import settings
 
 router = APIRouter()
 
 @router.post("/login", response_model=dict)
-def login_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_access_token(db: DBSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = user_service.get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db, user_service.get_user_by_email, email=form_data.username)
+    # bcrypt is CPU-bound: run it on the dedicated password pool (503 when saturated)
+    if not user or not await password_pool.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
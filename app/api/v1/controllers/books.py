@@ -1,74 +1,222 @@
 from typing import List, Optional
 import redis
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 
-from app.domain.dtos.book import BookCreate, BookResponse, AuthorCreate, AuthorResponse
-from app.api.dependencies import get_db, get_current_user, get_redis_client
-from app.domain.entities.user import User
+from app.domain.dtos.book import (
+    BookCreate, BookCopiesCreate, BookResponse, AuthorCreate, AuthorResponse, BookImportResult,
+    BookAvailability, BookAvailabilityQuery, BookAvailabilityBatch,
+)
+from app.api.dependencies import get_db, get_current_user, get_redis_client, get_cursor
+from app.core.database import DBSession, is_async, run_db
+from app.domain.dtos.user import UserResponse
 from app.core.rate_limit import limiter
-from app.services.book_service import BookService
+from app.core.pagination import set_next_cursor, set_next_cursor_from_ids
+from app.core.etag import etag_response, json_etag_response
+from app.core.streaming import ExportFormat, export_response
+from app.services.book_service import AsyncBookService, BookService
+from app.services.book_import_service import BookImportService, SUPPORTED_FORMATS, detect_format
+from app.services.book_availability_service import book_availability_service
 
 router = APIRouter()
 
 @router.post("/authors/", response_model=AuthorResponse)
 @limiter.limit("5/minute")
-def create_author(
+async def create_author(
     request: Request, 
     author: AuthorCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Registers a new author.
     """
     # Create a local service instance without Redis requirement for authors
     service = BookService()
-    return service.create_author(db=db, author=author)
+    return await run_db(db, service.create_author, author=author, response_model=AuthorResponse)
 
 @router.get("/authors/", response_model=List[AuthorResponse])
 @limiter.limit("30/minute")
-def read_authors(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_authors(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[int] = Depends(get_cursor),
+    db: DBSession = Depends(get_db)
+):
     """
     Lists authors with pagination.
+    Pass the `X-Next-Cursor` response header back as `after` for keyset pagination.
+    Honors `If-None-Match` with a 304.
     """
-    service = BookService()
-    return service.get_authors(db, skip=skip, limit=limit)
+    service = AsyncBookService() if is_async(db) else BookService()
+    authors = await run_db(db, service.get_authors, skip=skip, limit=limit, after=after, response_model=List[AuthorResponse], read_only=True)
+    set_next_cursor(response, authors, limit)
+    return etag_response(request, authors, List[AuthorResponse], response)
+
+@router.get("/authors/{author_id}", response_model=AuthorResponse)
+@limiter.limit("60/minute")
+async def read_author(
+    request: Request,
+    author_id: int,
+    db: DBSession = Depends(get_db),
+    redis_client: Optional[redis.Redis] = Depends(get_redis_client)
+):
+    """
+    Fetches an author by ID (cached per author). Honors `If-None-Match` with a 304.
+    """
+    service = (AsyncBookService if is_async(db) else BookService)(redis_client=redis_client)
+    author = await run_db(db, service.get_author, author_id=author_id, response_model=Optional[AuthorResponse])
+    if author is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return etag_response(request, author, AuthorResponse)
 
 @router.post("/", response_model=BookResponse)
 @limiter.limit("5/minute")
-def create_book(
+async def create_book(
     request: Request, 
     book: BookCreate, 
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user),
+    db: DBSession = Depends(get_db), 
+    current_user: UserResponse = Depends(get_current_user),
+    redis_client: Optional[redis.Redis] = Depends(get_redis_client)
+):
+    """
+    Registers a new book linked to an existing author, with `copies` physical copies (1 by
+    default). CLEARS the book list CACHE.
+    """
+    service = BookService(redis_client=redis_client)
+    return await run_db(db, service.create_book, book=book, response_model=BookResponse)
+
+@router.post("/{book_id}/copies", response_model=BookResponse)
+@limiter.limit("5/minute")
+async def add_book_copies(
+    request: Request,
+    book_id: int,
+    copies: BookCopiesCreate,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
     redis_client: Optional[redis.Redis] = Depends(get_redis_client)
 ):
     """
-    Registers a new book linked to an existing author. CLEARS the book list CACHE.
+    Adds `count` physical copies of a book to the shelf (raising `copy_count` and `available_count`).
     """
     service = BookService(redis_client=redis_client)
-    return service.create_book(db=db, book=book)
+    return await run_db(db, service.add_copies, book_id=book_id, count=copies.count, response_model=BookResponse)
+
+@router.post("/bulk", response_model=BookImportResult)
+@limiter.limit("2/minute")
+async def import_books(
+    request: Request,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+    redis_client: Optional[redis.Redis] = Depends(get_redis_client)
+):
+    """
+    Bulk imports books from a CSV (with header) or JSON Lines upload, streamed in batches.
+    Rows name their author by `author_id` or `author_name` (created if missing); ISBNs already
+    in the catalogue are skipped. Invalid rows are reported without aborting the import.
+    """
+    fmt = (format or detect_format(file.filename) or "").lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format, expected one of {', '.join(SUPPORTED_FORMATS)}")
+    service = BookImportService(redis_client=redis_client)
+    return await run_db(db, service.import_stream, stream=file.file, fmt=fmt, response_model=BookImportResult)
 
 @router.get("/", response_model=List[BookResponse])
 @limiter.limit("60/minute")
-def read_books(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_db), redis_client = Depends(get_redis_client)):
+async def read_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[int] = Depends(get_cursor),
+    db: DBSession = Depends(get_db),
+    redis_client = Depends(get_redis_client)
+):
     """
     Lists books with pagination.
-    Attempts to fetch via Cache (Redis) first. If absent, requests from DB and sets Cache for 1 hr.
+    Pages are cached in Redis as book ids for 1 hr, the books themselves per book as serialized
+    JSON, which a cache hit returns as is.
+    Pass the `X-Next-Cursor` response header back as `after` for keyset pagination.
+    Honors `If-None-Match` with a 304.
     """
-    service = BookService(redis_client=redis_client)
-    return service.get_books(db, skip=skip, limit=limit)
+    service = (AsyncBookService if is_async(db) else BookService)(redis_client=redis_client)
+    book_ids, body = await run_db(db, service.get_books_json, skip=skip, limit=limit, after=after)
+    set_next_cursor_from_ids(response, book_ids, limit)
+    return json_etag_response(request, body, response)
 
-@router.get("/{book_id}/availability")
+@router.get("/export")
+@limiter.limit("10/minute")
+async def export_books(
+    request: Request,
+    format: ExportFormat = "csv",
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Streams the whole catalogue, with author names, as CSV or NDJSON (one JSON object per line).
+    """
+    return export_response(db, BookService().export_query(), format, "books")
+
+@router.get("/search", response_model=List[BookResponse])
 @limiter.limit("60/minute")
-def check_availability(request: Request, book_id: int, db: Session = Depends(get_db)):
+async def search_books(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    skip: int = 0,
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_db)
+):
     """
-    Checks if a book is available for loan.
+    Searches book titles and author names, best matches first.
+    Words match as prefixes and tolerate a typo, e.g. `q=dispo le guin`.
     """
     service = BookService()
-    book = service.get_book(db, book_id=book_id)
-    if not book:
+    return await run_db(db, service.search_books, q=q, skip=skip, limit=limit, response_model=List[BookResponse], read_only=True)
+
+@router.post("/availability", response_model=BookAvailabilityBatch)
+@limiter.limit("60/minute")
+async def check_availability_batch(request: Request, query: BookAvailabilityQuery, db: DBSession = Depends(get_db)):
+    """
+    Checks the availability of up to 1000 books in one call (cache first).
+    Ids of books that do not exist are listed in `not_found`.
+    """
+    get_many = book_availability_service.get_many_async if is_async(db) else book_availability_service.get_many
+    found = await run_db(db, get_many, book_ids=query.book_ids)
+    book_ids = list(dict.fromkeys(query.book_ids))
+    return BookAvailabilityBatch(
+        items=[BookAvailability(book_id=book_id, is_available=found[book_id]) for book_id in book_ids if book_id in found],
+        not_found=[book_id for book_id in book_ids if book_id not in found],
+    )
+
+@router.get("/{book_id}/availability", response_model=BookAvailability)
+@limiter.limit("60/minute")
+async def check_availability(request: Request, book_id: int, db: DBSession = Depends(get_db)):
+    """
+    Checks if a book is available for loan (cache first).
+    """
+    get_many = book_availability_service.get_many_async if is_async(db) else book_availability_service.get_many
+    found = await run_db(db, get_many, book_ids=[book_id])
+    if book_id not in found:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    return BookAvailability(book_id=book_id, is_available=found[book_id])
+
+@router.get("/{book_id}", response_model=BookResponse)
+@limiter.limit("60/minute")
+async def read_book(
+    request: Request,
+    book_id: int,
+    db: DBSession = Depends(get_db),
+    redis_client: Optional[redis.Redis] = Depends(get_redis_client)
+):
+    """
+    Fetches a book with its author by ID (cached per book). Honors `If-None-Match` with a 304.
+    """
+    service = (AsyncBookService if is_async(db) else BookService)(redis_client=redis_client)
+    body = await run_db(db, service.get_book_json, book_id=book_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Book not found")
-        
-    return {"book_id": book.id, "is_available": book.is_available}
+    return json_etag_response(request, body)
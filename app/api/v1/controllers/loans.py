@@ -1,50 +1,126 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-
-from app.domain.dtos.loan import LoanCreate, LoanResponse
-from app.api.dependencies import get_db, get_current_user
-from app.services.loan_service import loan_service
-from app.domain.entities.user import User
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.domain.dtos.loan import LoanCreate, LoanResponse, LoanBatchCreate, LoanBatchReturn, AccruedFine
+from app.api.dependencies import get_db, get_current_user, get_cursor
+from app.core.database import DBSession, is_async, run_db, stream_rows
+from app.core.streaming import ExportFormat, export_response, json_array
+from app.services.loan_service import async_loan_service, loan_service
+from app.domain.dtos.user import UserResponse
+from app.domain.entities.loan import LoanStatus
 from app.core.rate_limit import limiter
+from app.core.pagination import set_next_cursor
 
 router = APIRouter()
 
 @router.post("/", response_model=LoanResponse)
 @limiter.limit("5/minute")
-def create_loan(
+async def create_loan(
     request: Request, 
     loan: LoanCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Performs a book loan.
     - Default deadline is saved in the Model (14 days from registry).
-    - Book must be valid and have `is_available = True`.
-    - User cannot have 3 ACTIVE loans simultaneously.
+    - Book must be valid and have a free copy (`available_count > 0`); any free copy is lent.
+    - User cannot have 3 open (ACTIVE or OVERDUE) loans simultaneously.
+    """
+    return await run_db(db, loan_service.create_loan, loan=loan, response_model=LoanResponse)
+
+@router.post("/batch", response_model=List[LoanResponse])
+@limiter.limit("5/minute")
+async def create_loans(
+    request: Request,
+    batch: LoanBatchCreate,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Lends several books to one user at once, all or none.
+    - Every book must exist and have a free copy.
+    - The user's active loans plus the basket cannot exceed 3.
+    """
+    return await run_db(db, loan_service.create_loans, batch=batch, response_model=List[LoanResponse])
+
+@router.post("/return/batch", response_model=List[LoanResponse])
+@limiter.limit("5/minute")
+async def return_loans(
+    request: Request,
+    batch: LoanBatchReturn,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Processes several returns at once, all or none, with each loan's fine at R$ 2.00/day.
     """
-    return loan_service.create_loan(db=db, loan=loan)
+    return await run_db(db, loan_service.return_loans, batch=batch, response_model=List[LoanResponse])
 
 @router.post("/{loan_id}/return", response_model=LoanResponse)
 @limiter.limit("5/minute")
-def return_loan(
+async def return_loan(
     request: Request, 
     loan_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Processes a loan return.
     - Automatically calculates the fine (if any) at R$ 2.00/day.
-    - Releases the book's `is_available` status.
+    - Puts the copy back on the shelf (`available_count`).
     """
-    return loan_service.return_loan(db=db, loan_id=loan_id)
+    return await run_db(db, loan_service.return_loan, loan_id=loan_id, response_model=LoanResponse)
 
 @router.get("/active-delayed", response_model=List[LoanResponse])
 @limiter.limit("20/minute")
-def read_active_or_delayed_loans(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_active_or_delayed_loans(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[int] = Depends(get_cursor),
+    db: DBSession = Depends(get_db)
+):
     """
     Lists all active (within deadline) or delayed (overdue and not returned) loans system-wide.
+    Pass the `X-Next-Cursor` response header back as `after` for keyset pagination.
+    """
+    service = async_loan_service if is_async(db) else loan_service
+    loans = await run_db(db, service.get_active_or_delayed_loans, skip=skip, limit=limit, after=after, response_model=List[LoanResponse], read_only=True)
+    set_next_cursor(response, loans, limit)
+    return loans
+
+@router.get("/fines", response_model=List[AccruedFine])
+@limiter.limit("20/minute")
+async def read_accrued_fines(
+    request: Request,
+    group_by: Literal["user", "author"] = "user",
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Fines accrued so far (R$ 2.00 per day past due) by loans not returned yet, per user or per
+    author, largest first. Computed in one aggregate query and streamed as it is read.
+    """
+    statement = loan_service.accrued_fines_query(db, group_by=group_by)
+    return StreamingResponse(json_array(stream_rows(db, statement), AccruedFine), media_type="application/json")
+
+@router.get("/export")
+@limiter.limit("10/minute")
+async def export_loans(
+    request: Request,
+    format: ExportFormat = "csv",
+    status: Optional[List[LoanStatus]] = Query(None),
+    user_id: Optional[int] = None,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Streams loans as CSV or NDJSON (one JSON object per line), in id order.
+    - `status` may be repeated (e.g. `status=ACTIVE&status=OVERDUE`); `user_id` narrows to one user.
+    - Rows are read through a server-side cursor and written as they arrive, with no pagination.
     """
-    return loan_service.get_active_or_delayed_loans(db, skip=skip, limit=limit)
+    statement = loan_service.export_query(statuses=status, user_id=user_id)
+    return export_response(db, statement, format, "loans")
@@ -0,0 +1,78 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.domain.dtos.stats import AuthorActiveLoans, AuthorLoanStats, BookLoanStats, DailyLoanStats
+from app.api.dependencies import get_db, get_redis_client
+from app.core.database import DBSession, run_db
+from app.core.rate_limit import limiter
+from app.core.etag import json_etag_response
+from app.services.stats_service import StatsService
+
+router = APIRouter()
+
+@router.get("/books/top", response_model=List[BookLoanStats])
+@limiter.limit("60/minute")
+async def read_top_books(
+    request: Request,
+    days: int = Query(30, ge=1, le=366),
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_db),
+    redis_client = Depends(get_redis_client)
+):
+    """
+    Most borrowed books over the last `days` days (today included), by checkouts.
+    Served from the daily loan stats and cached briefly. Honors `If-None-Match` with a 304.
+    """
+    service = StatsService(redis_client=redis_client)
+    body = await run_db(db, service.top_books_json, days=days, limit=limit)
+    return json_etag_response(request, body)
+
+@router.get("/authors/top", response_model=List[AuthorLoanStats])
+@limiter.limit("60/minute")
+async def read_top_authors(
+    request: Request,
+    days: int = Query(30, ge=1, le=366),
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_db),
+    redis_client = Depends(get_redis_client)
+):
+    """
+    Most borrowed authors over the last `days` days (today included), by checkouts of their books.
+    Served from the daily loan stats and cached briefly. Honors `If-None-Match` with a 304.
+    """
+    service = StatsService(redis_client=redis_client)
+    body = await run_db(db, service.top_authors_json, days=days, limit=limit)
+    return json_etag_response(request, body)
+
+@router.get("/authors/active-loans", response_model=List[AuthorActiveLoans])
+@limiter.limit("60/minute")
+async def read_active_loans_by_author(
+    request: Request,
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_db),
+    redis_client = Depends(get_redis_client)
+):
+    """
+    Authors with the most books currently out on loan. Cached briefly.
+    Honors `If-None-Match` with a 304.
+    """
+    service = StatsService(redis_client=redis_client)
+    body = await run_db(db, service.active_loans_by_author_json, limit=limit)
+    return json_etag_response(request, body)
+
+@router.get("/overdue-rate", response_model=List[DailyLoanStats])
+@limiter.limit("60/minute")
+async def read_overdue_rate(
+    request: Request,
+    days: int = Query(30, ge=1, le=366),
+    db: DBSession = Depends(get_db),
+    redis_client = Depends(get_redis_client)
+):
+    """
+    Checkouts, returns and the share of returns that came back late, per day over the last `days`
+    days (days without activity are left out). Served from the daily loan stats and cached
+    briefly. Honors `If-None-Match` with a 304.
+    """
+    service = StatsService(redis_client=redis_client)
+    body = await run_db(db, service.overdue_rate_json, days=days)
+    return json_etag_response(request, body)
@@ -1,50 +1,113 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from app.domain.dtos.user import UserCreate, UserResponse, UserUpdate
-from app.api.dependencies import get_db
-from app.services.user_service import user_service
-from app.services.loan_service import loan_service
+from app.api.dependencies import get_db, get_current_user, get_cursor
+from app.core.database import DBSession, is_async, run_db
+from app.core.security import password_pool
+from app.services.user_service import async_user_service, user_service
+from app.services.loan_service import async_loan_service, loan_service
 from app.domain.dtos.loan import LoanResponse
 from app.core.rate_limit import limiter
+from app.core.pagination import set_next_cursor
+from app.core.etag import etag_response
+from app.core.streaming import ExportFormat, export_response
 
 router = APIRouter()
 
 @router.post("/", response_model=UserResponse)
 @limiter.limit("5/minute")
-def create_user(request: Request, user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(request: Request, user: UserCreate, db: DBSession = Depends(get_db)):
     """
     Registers a new user.
     """
-    return user_service.create_user(db=db, user=user)
+    hashed_password = await password_pool.hash(user.password)
+    return await run_db(db, user_service.create_user, user=user, hashed_password=hashed_password, response_model=UserResponse)
 
 @router.get("/", response_model=List[UserResponse])
 @limiter.limit("20/minute")
-def read_users(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_users(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[int] = Depends(get_cursor),
+    db: DBSession = Depends(get_db)
+):
     """
     Lists all users with pagination.
+    Pass the `X-Next-Cursor` response header back as `after` for keyset pagination.
+    Honors `If-None-Match` with a 304.
     """
-    return user_service.get_users(db, skip=skip, limit=limit)
+    service = async_user_service if is_async(db) else user_service
+    users = await run_db(db, service.get_users, skip=skip, limit=limit, after=after, response_model=List[UserResponse], read_only=True)
+    set_next_cursor(response, users, limit)
+    return etag_response(request, users, List[UserResponse], response)
+
+@router.get("/export")
+@limiter.limit("10/minute")
+async def export_users(
+    request: Request,
+    format: ExportFormat = "csv",
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Streams every user (without password hashes) as CSV or NDJSON (one JSON object per line).
+    """
+    return export_response(db, user_service.export_query(), format, "users")
 
 @router.get("/{user_id}", response_model=UserResponse)
 @limiter.limit("30/minute")
-def read_user(request: Request, user_id: int, db: Session = Depends(get_db)):
+async def read_user(request: Request, user_id: int, db: DBSession = Depends(get_db)):
     """
-    Fetches a user by ID.
+    Fetches a user by ID. Honors `If-None-Match` with a 304.
     """
-    user = user_service.get_user(db, user_id=user_id)
+    service = async_user_service if is_async(db) else user_service
+    user = await run_db(db, service.get_user, user_id=user_id, response_model=Optional[UserResponse], read_only=True)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return etag_response(request, user, UserResponse)
+
+@router.put("/{user_id}", response_model=UserResponse)
+@limiter.limit("10/minute")
+async def update_user(
+    request: Request,
+    user_id: int,
+    user: UserUpdate,
+    db: DBSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Updates the caller's own profile, password or `is_active` flag (403 for any other user).
+    Deactivated users can no longer authenticate.
+    """
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to update another user")
+    hashed_password = None
+    if user.password is not None:
+        hashed_password = await password_pool.hash(user.password)
+    return await run_db(db, user_service.update_user, user_id=user_id, user_in=user, hashed_password=hashed_password, response_model=UserResponse)
 
 @router.get("/{user_id}/loans", response_model=List[LoanResponse])
 @limiter.limit("30/minute")
-def read_user_loans(request: Request, user_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_user_loans(
+    request: Request,
+    response: Response,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[int] = Depends(get_cursor),
+    db: DBSession = Depends(get_db)
+):
     """
     Lists all loans (history) associated with a user.
+    Pass the `X-Next-Cursor` response header back as `after` for keyset pagination.
     """
-    user = user_service.get_user(db, user_id=user_id)
+    users_service, loans_service = (async_user_service, async_loan_service) if is_async(db) else (user_service, loan_service)
+    user = await run_db(db, users_service.get_user, user_id=user_id, read_only=True)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return loan_service.get_user_loans(db=db, user_id=user_id, skip=skip, limit=limit)
+    loans = await run_db(db, loans_service.get_user_loans, user_id=user_id, skip=skip, limit=limit, after=after, response_model=List[LoanResponse], read_only=True)
+    set_next_cursor(response, loans, limit)
+    return loans
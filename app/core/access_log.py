@@ -0,0 +1,58 @@
+import logging
+import random
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logger import access_logger
+
+def should_log(status_code: int, duration_ms: float) -> bool:
+    """Errors and slow requests are always logged; the rest at ACCESS_LOG_SAMPLE_RATE."""
+    if status_code >= 400 or duration_ms >= settings.ACCESS_LOG_SLOW_MS:
+        return True
+    rate = settings.ACCESS_LOG_SAMPLE_RATE
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+class AccessLogMiddleware:
+    """One access record per request, written once the response is complete."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if should_log(status_code, duration_ms):
+                if status_code >= 500:
+                    level = logging.ERROR
+                elif status_code >= 400 or duration_ms >= settings.ACCESS_LOG_SLOW_MS:
+                    level = logging.WARNING
+                else:
+                    level = logging.INFO
+                client = scope.get("client")
+                access_logger.log(
+                    level, "%s %s %d %.1fms", scope["method"], scope["path"], status_code, duration_ms,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(duration_ms, 2),
+                        "client": client[0] if client else None,
+                    },
+                )
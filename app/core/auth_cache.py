@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from app.core.cache import get_redis, safe_redis_call
+from app.core.config import settings
+from app.domain.dtos.user import UserResponse
+
+class AuthCache:
+    """
+    Caches the authenticated user's snapshot per access token (keyed by the token's SHA-256), so
+    repeat requests with the same token skip `jwt.decode` and the `users` SELECT. Entries live for
+    `ttl_seconds` or until the token expires, whichever comes first, and are dropped when the user
+    is updated.
+
+    In-process by default: a bounded LRU, invalidated per process (other workers catch up within
+    the TTL). With `use_redis` the entries live in Redis instead, shared and invalidated across
+    workers; while Redis is unavailable every lookup is a miss.
+    """
+    KEY_PREFIX = "auth:token:"
+    USER_TOKENS_PREFIX = "auth:user_tokens:"
+
+    def __init__(self, max_size: int, ttl_seconds: float, use_redis: bool = False):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, UserResponse]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[UserResponse]:
+        user = self._get_redis(self._key(token)) if self.use_redis else self._get_local(self._key(token))
+        with self._lock:
+            if user is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return user
+
+    def set(self, token: str, user: UserResponse, token_expires_at: Optional[float] = None) -> None:
+        """`token_expires_at` is the token's `exp` claim (a Unix timestamp)."""
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        if self.use_redis:
+            self._set_redis(self._key(token), user, ttl)
+        else:
+            self._set_local(self._key(token), user, ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        if self.use_redis:
+            self._invalidate_redis(user_id)
+            return
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis" if self.use_redis else "memory",
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    # In-process LRU
+
+    def _get_local(self, key: str) -> Optional[UserResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                self._drop(key, user.id)
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def _set_local(self, key: str, user: UserResponse, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest_key, (_, oldest_user) = next(iter(self._entries.items()))
+                self._drop(oldest_key, oldest_user.id)
+
+    def _drop(self, key: str, user_id: int) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    # Redis
+
+    def _get_redis(self, key: str) -> Optional[UserResponse]:
+        redis_client = get_redis()
+        if redis_client is None:
+            return None
+        cached = safe_redis_call(redis_client.get, self.KEY_PREFIX + key)
+        return UserResponse.model_validate_json(cached) if cached else None
+
+    def _set_redis(self, key: str, user: UserResponse, ttl: float) -> None:
+        redis_client = get_redis()
+        if redis_client is None:
+            return
+        user_tokens = f"{self.USER_TOKENS_PREFIX}{user.id}"
+        pipeline = redis_client.pipeline()
+        pipeline.setex(self.KEY_PREFIX + key, max(1, int(ttl)), user.model_dump_json())
+        pipeline.sadd(user_tokens, key)
+        pipeline.expire(user_tokens, max(1, int(self.ttl_seconds)))
+        safe_redis_call(pipeline.execute)
+
+    def _invalidate_redis(self, user_id: int) -> None:
+        redis_client = get_redis()
+        if redis_client is None:
+            return
+        user_tokens = f"{self.USER_TOKENS_PREFIX}{user_id}"
+        keys = safe_redis_call(redis_client.smembers, user_tokens, default=set())
+        safe_redis_call(redis_client.delete, user_tokens, *(self.KEY_PREFIX + key.decode() for key in keys))
+
+auth_cache = AuthCache(
+    max_size=settings.AUTH_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    use_redis=settings.AUTH_CACHE_REDIS,
+)
@@ -1,11 +1,110 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
 import redis
 from app.core.config import settings
 from app.core.logger import logger
+from app.core.metrics import observe_redis
+
+class RedisCircuitBreaker:
+    """
+    Stops sending commands to Redis for `cooldown_seconds` after a failure, so requests fall back
+    to the database immediately instead of each one waiting on a socket timeout. Once the cooldown
+    elapses a single caller is let through as a probe; its success closes the breaker again.
+    """
+
+    def __init__(self, cooldown_seconds: float):
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            if self._opened_at is not None and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                # Re-arm before probing so concurrent callers keep skipping Redis meanwhile
+                self._opened_at = time.monotonic()
+                return True
+        return False
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            with self._lock:
+                self._opened_at = None
+            logger.info("Redis is reachable again. Cache re-enabled.")
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            was_closed = self._opened_at is None
+            self._opened_at = time.monotonic()
+        if was_closed:
+            logger.warning(f"Redis unavailable: {error}. Cache disabled for {self.cooldown_seconds}s.")
 
-# Redis client used via dependency injection (app/api/dependencies.py → get_redis_client)
-try:
-    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    redis_client.ping()
-except Exception as e:
-    logger.warning(f"Redis unavailable at startup: {e}. Cache will be disabled.")
+redis_breaker = RedisCircuitBreaker(settings.REDIS_CIRCUIT_BREAKER_COOLDOWN_SECONDS)
+
+# Process-wide pool and client, created once by init_redis() at application startup
+redis_pool: Optional[redis.BlockingConnectionPool] = None
+redis_client: Optional[redis.Redis] = None
+
+def init_redis() -> None:
+    global redis_pool, redis_client
+    redis_pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
+    redis_client = redis.Redis(connection_pool=redis_pool)
+    safe_redis_call(redis_client.ping)
+
+def close_redis() -> None:
+    global redis_pool, redis_client
+    if redis_pool is not None:
+        redis_pool.disconnect()
+    redis_pool = None
     redis_client = None
+
+def get_redis() -> Optional[redis.Redis]:
+    """Returns the shared client, or None when Redis is not configured or the breaker is open."""
+    if redis_client is None or not redis_breaker.allow_request():
+        return None
+    return redis_client
+
+def safe_redis_call(command: Callable[..., Any], *args, default: Any = None, **kwargs) -> Any:
+    """Runs a Redis command, tripping the circuit breaker and returning `default` if it fails."""
+    start = time.perf_counter()
+    try:
+        result = command(*args, **kwargs)
+    except redis.RedisError as e:
+        redis_breaker.record_failure(e)
+        return default
+    finally:
+        observe_redis(getattr(command, "__name__", "unknown"), time.perf_counter() - start)
+    redis_breaker.record_success()
+    return result
+
+def redis_stats() -> dict:
+    stats = {
+        "enabled": redis_client is not None,
+        "circuit_open": redis_breaker.is_open,
+        "failures": redis_breaker.failures,
+    }
+    if redis_pool is not None:
+        created = len(redis_pool._connections)
+        idle = sum(1 for connection in list(redis_pool.pool.queue) if connection is not None)
+        stats["pool"] = {
+            "max_connections": redis_pool.max_connections,
+            "created_connections": created,
+            "in_use_connections": created - idle,
+            "idle_connections": idle,
+        }
+    return stats
@@ -1,15 +1,245 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import inspect
+from functools import lru_cache
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterator, List, Optional, Sequence, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Row, Select, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+def _connect_args(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite connections are handed between threadpool workers within a request
+        return {"check_same_thread": False}
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql+asyncpg"):
+        return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+def _async_database_url(url: str) -> str:
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+def _engine_args(url: str) -> dict:
+    args = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "connect_args": _connect_args(url),
+    }
+    # The sync SQLite dialect picks its own pool class and keeps it. aiosqlite defaults to no pool,
+    # which opens a connection (and its worker thread) per session, so file databases get a queue
+    if url.startswith("sqlite+aiosqlite") and ":memory:" not in url:
+        args["poolclass"] = AsyncAdaptedQueuePool
+    if not url.startswith("sqlite") or "poolclass" in args:
+        args.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        )
+    return args
+
+# Set on `Session.info` by run_db(read_only=True) for the duration of the call
+READ_ONLY = "read_only"
+
+class RoutingSession(Session):
+    """
+    Sends the plain SELECTs of read-only calls to the replica and everything else (writes, flushes,
+    SELECT ... FOR UPDATE, calls not marked read-only) to the primary `bind`.
+    """
+
+    def __init__(self, *args, replica: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replica is not None
+            and self.info.get(READ_ONLY)
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return self.replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+engine = create_engine(settings.DATABASE_URL, **_engine_args(settings.DATABASE_URL))
+instrument_engine(engine, "sync")
+replica_engine: Optional[Engine] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, **_engine_args(settings.DATABASE_REPLICA_URL))
+    instrument_engine(replica_engine, "replica")
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replica=replica_engine)
+
+# Async request path (DB_ASYNC_MODE): AsyncSession over asyncpg/aiosqlite. The async repositories
+# and services query it natively; sync calls (the writes) are driven through `run_sync`.
+async_engine = None
+async_replica_engine = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+if settings.DB_ASYNC_MODE:
+    async_url = settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(async_url, **_engine_args(async_url))
+    instrument_engine(async_engine.sync_engine, "async")
+    if settings.DATABASE_REPLICA_URL:
+        async_replica_url = settings.ASYNC_DATABASE_REPLICA_URL or _async_database_url(settings.DATABASE_REPLICA_URL)
+        async_replica_engine = create_async_engine(async_replica_url, **_engine_args(async_replica_url))
+        instrument_engine(async_replica_engine.sync_engine, "async_replica")
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+        replica=async_replica_engine.sync_engine if async_replica_engine is not None else None,
+    )
+
+DBSession = Union[Session, AsyncSession]
 
 Base = declarative_base()
 
-def get_db():
+def is_async(db: DBSession) -> bool:
+    """Whether the request runs on the async path, where reads go through the async services."""
+    return isinstance(db, AsyncSession)
+
+async def get_db() -> AsyncGenerator[DBSession, None]:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+@lru_cache(maxsize=None)
+def _type_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+def _read_attributes(value: Any, annotation: Any) -> Any:
+    """
+    Reads every attribute `annotation` needs from ORM objects in plain Python. Under an AsyncSession a
+    lazy load switches greenlets, which must never happen inside pydantic-core's native validation.
+    """
+    if value is None or isinstance(value, dict):
+        return value
+    origin = get_origin(annotation)
+    if origin is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        return _read_attributes(value, annotation)
+    if origin in (list, List):
+        item_annotation = get_args(annotation)[0]
+        return [_read_attributes(item, item_annotation) for item in value]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: _read_attributes(getattr(value, name), field.annotation)
+            for name, field in annotation.model_fields.items()
+        }
+    return value
+
+async def run_db(
+    db: DBSession, fn: Callable[..., Any], *args, response_model: Any = None, read_only: bool = False, **kwargs
+) -> Any:
+    """
+    Runs a repository/service call `fn(session, *args, **kwargs)` without blocking the event loop.
+    A sync `fn` runs on the threadpool with a `Session`, or through `run_sync` with an
+    `AsyncSession`; an async `fn` (the async services) is awaited with the `AsyncSession` itself.
+
+    When `response_model` is given the result is converted to it inside the same call, so lazy loads
+    and expired attributes are resolved there instead of during response serialization.
+
+    `read_only` calls read from the replica when one is configured, and are retried once on a fresh
+    connection if theirs turns out to be dead (with pre-ping off, the first use finds out).
+    """
+    if isinstance(db, AsyncSession):
+        def call_sync(session: Session) -> Any:
+            session.info[READ_ONLY] = read_only
+            try:
+                result = fn(session, *args, **kwargs)
+                if response_model is None:
+                    return result
+                return _type_adapter(response_model).validate_python(_read_attributes(result, response_model))
+            finally:
+                session.info.pop(READ_ONLY, None)
+
+        async def call_async() -> Any:
+            if not inspect.iscoroutinefunction(fn):
+                return await db.run_sync(call_sync)
+            db.sync_session.info[READ_ONLY] = read_only
+            try:
+                result = await fn(db, *args, **kwargs)
+                if response_model is None:
+                    return result
+                # The async services load everything their results expose, so nothing lazy-loads here
+                return _type_adapter(response_model).validate_python(result, from_attributes=True)
+            finally:
+                db.sync_session.info.pop(READ_ONLY, None)
+
+        try:
+            return await call_async()
+        except DBAPIError as e:
+            if not (read_only and e.connection_invalidated):
+                raise
+            await db.rollback()
+            return await call_async()
+
+    def call(session: Session) -> Any:
+        # Each call is its own unit of work. Closing here releases the connection on the same
+        # worker thread (a connection held across threadpool hops can starve the pool under load);
+        # get_db still closes the session when the request ends.
+        session.info[READ_ONLY] = read_only
+        try:
+            result = fn(session, *args, **kwargs)
+            if response_model is None:
+                return result
+            return _type_adapter(response_model).validate_python(result, from_attributes=True)
+        finally:
+            session.info.pop(READ_ONLY, None)
+            session.close()
+
+    try:
+        return await run_in_threadpool(call, db)
+    except DBAPIError as e:
+        # The pool has already discarded the dead connection; a read is safe to run again
+        if not (read_only and e.connection_invalidated):
+            raise
+        return await run_in_threadpool(call, db)
+
+async def stream_rows(
+    db: DBSession, statement: Select, chunk_size: int = 1000, read_only: bool = False
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Runs `statement` with a server-side cursor where the driver has one, yielding its rows in
+    chunks of `chunk_size` as they are fetched instead of loading the whole result. The session
+    is closed once the rows are exhausted (or the consumer stops). `read_only` routes it to the
+    replica like run_db.
+    """
+    statement = statement.execution_options(yield_per=chunk_size)
+    (db.sync_session if isinstance(db, AsyncSession) else db).info[READ_ONLY] = read_only
+    if isinstance(db, AsyncSession):
+        try:
+            result = await db.stream(statement)
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await db.close()
+        return
+
+    def chunks() -> Iterator[Sequence[Row]]:
+        try:
+            yield from db.execute(statement).partitions()
+        finally:
+            db.close()
+
+    async for rows in iterate_in_threadpool(chunks()):
+        yield rows
@@ -0,0 +1,99 @@
+import threading
+from typing import ClassVar, Dict, Generic, Iterable, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+from redis import Redis
+
+from app.core.cache import safe_redis_call
+from app.domain.dtos.book import AuthorResponse, BookResponse
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+class CacheFamily:
+    """Hit and miss counters of one family of cache keys, reported together on /health."""
+    registry: ClassVar[Dict[str, "CacheFamily"]] = {}
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        CacheFamily.registry[name] = self
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+class EntityCache(CacheFamily, Generic[ModelT]):
+    """
+    Read-through cache of one entity type in Redis, one `<name>:<id>` key per row holding its
+    response DTO as JSON. Lookups take any number of ids in one MGET; the caller loads the misses
+    and stores them back. Redis errors count as misses.
+    """
+
+    def __init__(self, name: str, model: Type[ModelT], ttl_seconds: int):
+        super().__init__(name)
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self._adapter = TypeAdapter(model)
+
+    def key(self, entity_id: int) -> str:
+        return f"{self.name}:{entity_id}"
+
+    def dump(self, item: ModelT) -> bytes:
+        return self._adapter.dump_json(item)
+
+    def get_many(self, redis_client: Optional[Redis], ids: List[int]) -> Dict[int, ModelT]:
+        return {
+            entity_id: self.model.model_validate_json(value)
+            for entity_id, value in self.get_json_many(redis_client, ids).items()
+        }
+
+    def get_json_many(self, redis_client: Optional[Redis], ids: List[int]) -> Dict[int, bytes]:
+        """The cached entries as stored (each one the entity's JSON response), without parsing them."""
+        found: Dict[int, bytes] = {}
+        if redis_client is not None and ids:
+            values = safe_redis_call(redis_client.mget, [self.key(entity_id) for entity_id in ids], default=[])
+            found = {entity_id: value for entity_id, value in zip(ids, values) if value is not None}
+        self.record(hits=len(found), misses=len(ids) - len(found))
+        return found
+
+    def set_many(self, redis_client: Optional[Redis], items: Iterable[ModelT]) -> None:
+        self.set_json_many(redis_client, {item.id: self.dump(item) for item in items})
+
+    def set_json_many(self, redis_client: Optional[Redis], entries: Dict[int, bytes]) -> None:
+        if redis_client is None or not entries:
+            return
+        pipeline = redis_client.pipeline(transaction=False)
+        for entity_id, value in entries.items():
+            pipeline.setex(self.key(entity_id), self.ttl_seconds, value)
+        safe_redis_call(pipeline.execute)
+
+    def invalidate(self, redis_client: Optional[Redis], ids: Iterable[int]) -> None:
+        keys = [self.key(entity_id) for entity_id in ids]
+        if redis_client is not None and keys:
+            safe_redis_call(redis_client.delete, *keys)
+
+def cache_family_stats() -> dict:
+    return {name: family.stats() for name, family in CacheFamily.registry.items()}
+
+ENTITY_TTL_SECONDS = 3600
+
+book_cache = EntityCache("book", BookResponse, ENTITY_TTL_SECONDS)
+author_cache = EntityCache("author", AuthorResponse, ENTITY_TTL_SECONDS)
+books_list_cache = CacheFamily("books_list")
+stats_cache = CacheFamily("stats")
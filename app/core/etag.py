@@ -0,0 +1,34 @@
+import hashlib
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def _adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110): W/ prefixes are ignored
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def etag_response(request: Request, content: Any, response_model: Any, response: Optional[Response] = None) -> Response:
+    """
+    Serializes `content` as `response_model` and tags it with an ETag (a hash of the body).
+    Returns 304 without a body when the request's `If-None-Match` already names that ETag.
+    Headers set on the endpoint's `response` parameter are carried over.
+    """
+    return json_etag_response(request, _adapter(response_model).dump_json(content), response)
+
+def json_etag_response(request: Request, body: bytes, response: Optional[Response] = None) -> Response:
+    """`etag_response` for a body that is already serialized JSON."""
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = dict(response.headers) if response is not None else {}
+    headers.pop("content-length", None)
+    headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,198 @@
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.process_collector import ProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Everything below is exported on /metrics. A dedicated registry keeps the output to the app's own
+# metrics plus process CPU/memory, and lets tests read values without global state.
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+
+# Requests are labelled by route template ("/api/v1/books/{book_id}"), never by raw path, so the
+# number of series stays bounded; paths that match no route share UNMATCHED_ROUTE.
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency, from the first ASGI call to the last body chunk.",
+    ["method", "route"], registry=registry,
+)
+REQUESTS = Counter("http_requests", "Requests served, by final status code.", ["method", "route", "status"], registry=registry)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served.", registry=registry)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duration of each SQL statement.", registry=registry,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements run while serving one request.", ["route"], registry=registry,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Total SQL statement time of one request.", ["route"], registry=registry,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection.", ["pool"], registry=registry,
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_HELD = Histogram(
+    "db_pool_checkout_duration_seconds", "Time a connection stays checked out of the pool.", ["pool"], registry=registry,
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "Connections currently checked out.", ["pool"], registry=registry)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Duration of Redis commands issued through safe_redis_call.",
+    ["command"], registry=registry,
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+RATE_LIMITED = Counter("rate_limit_rejections", "Requests rejected with 429 by the rate limiter.", ["route"], registry=registry)
+
+class RequestStats:
+    """SQL work of the request being served, shared with the threadpool through a ContextVar."""
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def route_label(scope: Scope) -> str:
+    """The template of the route that served `scope`, looked up by the endpoint the router set."""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return UNMATCHED_ROUTE
+    paths: Optional[Dict[Callable, str]] = getattr(app.state, "route_paths", None)
+    if paths is None:
+        paths = {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+        app.state.route_paths = paths
+    return paths.get(endpoint, UNMATCHED_ROUTE)
+
+class MetricsMiddleware:
+    """
+    Records latency, status and SQL work per request. A plain ASGI middleware: it adds no task or
+    body buffering, so it stays cheap enough to leave on (see benchmarks/bench_metrics.py).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _request_stats.reset(token)
+            method, route = scope["method"], route_label(scope)
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.db_seconds)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not settings.METRICS_ENABLED:
+        return
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+def instrument_engine(engine: Engine, pool_name: str) -> None:
+    """
+    Times every statement of `engine` and its pool's checkouts. The wait for a free connection
+    has no pool event, so the pool's `_do_get` (the blocking part of a checkout) is wrapped.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    pool = engine.pool
+    wait, held = DB_POOL_WAIT.labels(pool_name), DB_POOL_HELD.labels(pool_name)
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            if settings.METRICS_ENABLED:
+                wait.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None and settings.METRICS_ENABLED:
+            held.observe(time.perf_counter() - checked_out_at)
+
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.labels(pool_name).set_function(pool.checkedout)
+
+def observe_redis(command: str, seconds: float) -> None:
+    if settings.METRICS_ENABLED:
+        REDIS_LATENCY.labels(command).observe(seconds)
+
+def record_rate_limited(scope: Scope) -> None:
+    RATE_LIMITED.labels(route_label(scope)).inc()
+
+class CacheStatsCollector:
+    """
+    Exports the caches' hit and miss counters, as reported on /health, at scrape time, so the
+    lookups themselves pay nothing extra.
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, dict]]):
+        self.stats = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache lookups served from the cache.", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that fell through to the source.", labels=["cache"])
+        for name, stats in self.stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+        yield hits
+        yield misses
+
+def metrics_response() -> Response:
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,33 @@
+import base64
+import json
+from typing import Sequence
+
+from fastapi import Response
+
+# Response header carrying the opaque cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Returns the last seen id encoded in `cursor`. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["id"]
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid pagination cursor")
+    return last_id
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Advertises the next page cursor when the current page came back full."""
+    if limit > 0 and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+
+def set_next_cursor_from_ids(response: Response, ids: Sequence[int], limit: int) -> None:
+    """`set_next_cursor` for a page known only by its ids (e.g. a pre-serialized body)."""
+    if limit > 0 and len(ids) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ids[-1])
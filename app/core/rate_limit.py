@@ -1,4 +1,25 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.core.config import settings
+
+storage_uri = settings.RATE_LIMIT_STORAGE_URI or settings.REDIS_URL
+storage_options = {}
+if storage_uri.startswith(("redis://", "rediss://")):
+    storage_options = {
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        "socket_connect_timeout": settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    }
+
+# Counters live in Redis so every worker and replica enforces the same limits. The
+# sliding-window-counter strategy runs as one Lua script per check (atomic, a single round trip).
+# While Redis is unreachable, limits are enforced per process from memory; slowapi probes the
+# backend again with exponential backoff and switches back once it answers.
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=storage_uri,
+    storage_options=storage_options,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    key_prefix="rate_limit",
+    in_memory_fallback_enabled=True,
+)
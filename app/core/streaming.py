@@ -0,0 +1,76 @@
+import csv
+import enum
+import io
+import json
+from datetime import date
+from typing import Any, AsyncIterator, List, Literal, Sequence, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Row, Select
+
+from app.core.database import DBSession, stream_rows
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+async def json_array(chunks: AsyncIterator[Sequence[Row]], model: Type[BaseModel]) -> AsyncIterator[bytes]:
+    """
+    Serializes row chunks as one JSON array of `model`, a chunk at a time, so a response body can
+    be sent while the query is still being read.
+    """
+    adapter = TypeAdapter(List[model])
+    yield b"["
+    first = True
+    async for rows in chunks:
+        if not rows:
+            continue
+        body = adapter.dump_json([model.model_validate(row._mapping) for row in rows])
+        yield (b"" if first else b",") + body[1:-1]
+        first = False
+    yield b"]"
+
+def _plain(value: Any) -> Any:
+    """A column value as CSV and JSON write it: enums by value, dates in ISO 8601."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+async def csv_rows(chunks: AsyncIterator[Sequence[Row]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    """Serializes row chunks as CSV with a `columns` header line, a chunk at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+
+async def ndjson_rows(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """Serializes row chunks as newline-delimited JSON objects, a chunk at a time."""
+    async for rows in chunks:
+        yield "".join(
+            json.dumps({key: _plain(value) for key, value in row._mapping.items()}, separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+
+def export_response(db: DBSession, statement: Select, format: ExportFormat, filename: str) -> StreamingResponse:
+    """
+    Streams every row of `statement` as a CSV or NDJSON attachment, read through a server-side
+    cursor on the replica, so memory stays flat however many rows there are.
+    """
+    chunks = stream_rows(db, statement, read_only=True)
+    if format == "csv":
+        body = csv_rows(chunks, list(statement.selected_columns.keys()))
+    else:
+        body = ndjson_rows(chunks)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
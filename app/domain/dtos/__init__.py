@@ -1,3 +1,4 @@
 from app.domain.dtos.user import UserCreate, UserUpdate, UserResponse
-from app.domain.dtos.book import BookCreate, BookUpdate, BookResponse, AuthorCreate, AuthorResponse
-from app.domain.dtos.loan import LoanCreate, LoanResponse, LoanReturn
+from app.domain.dtos.book import BookCreate, BookUpdate, BookResponse, AuthorCreate, AuthorResponse, BookImportRow, BookImportResult
+from app.domain.dtos.loan import LoanCreate, LoanResponse, LoanReturn, LoanBatchCreate, LoanBatchReturn, AccruedFine
+from app.domain.dtos.stats import BookLoanStats, AuthorLoanStats, AuthorActiveLoans, DailyLoanStats
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -18,10 +18,11 @@ class AuthorResponse(AuthorBase):
 class BookBase(BaseModel):
     title: str
     isbn: Optional[str] = None
-    is_available: bool = True
 
 class BookCreate(BookBase):
+    """A new book and its copies, all on the shelf: availability follows the copies, it is not set."""
     author_id: int
+    copies: int = Field(1, ge=1, le=1000)
 
 class BookUpdate(BaseModel):
     title: Optional[str] = None
@@ -29,10 +30,63 @@ class BookUpdate(BaseModel):
     is_available: Optional[bool] = None
 
 class BookResponse(BookBase):
+    is_available: bool
     id: int
+    copy_count: int
+    available_count: int
     author_id: int
     created_at: datetime
     author: AuthorResponse
 
     class Config:
         from_attributes = True
+
+class BookCopiesCreate(BaseModel):
+    count: int = Field(..., ge=1, le=1000)
+
+class BookAvailability(BaseModel):
+    book_id: int
+    is_available: bool
+
+class BookAvailabilityQuery(BaseModel):
+    book_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class BookAvailabilityBatch(BaseModel):
+    items: List[BookAvailability]
+    not_found: List[int] = []
+
+class BookImportRow(BookBase):
+    """
+    One CSV/JSONL row of a bulk import. The author is referenced by id or by name (created if
+    missing). The book gets one copy, on the shelf.
+    """
+    author_id: Optional[int] = None
+    author_name: Optional[str] = None
+
+    @field_validator("title", "isbn")
+    @classmethod
+    def check_not_blank(cls, value: Optional[str]) -> Optional[str]:
+        # COPY writes an empty string as NULL, failing the whole batch instead of this row
+        if value is not None and not value.strip():
+            raise ValueError("must not be empty")
+        return value
+
+    @model_validator(mode="after")
+    def check_author(self) -> "BookImportRow":
+        if self.author_id is None and not self.author_name:
+            raise ValueError("author_id or author_name is required")
+        return self
+
+class BookImportError(BaseModel):
+    line: int
+    detail: str
+
+class BookImportResult(BaseModel):
+    rows_read: int = 0
+    books_created: int = 0
+    authors_created: int = 0
+    duplicates_skipped: int = 0
+    errors_count: int = 0
+    errors: List[BookImportError] = []
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
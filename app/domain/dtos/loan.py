@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional
 from datetime import datetime
 from app.domain.entities.loan import LoanStatus
 
@@ -12,6 +12,7 @@ class LoanCreate(LoanBase):
 
 class LoanResponse(LoanBase):
     id: int
+    copy_id: Optional[int] = None
     loan_date: datetime
     due_date: datetime
     return_date: Optional[datetime] = None
@@ -21,5 +22,43 @@ class LoanResponse(LoanBase):
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def derive_overdue(self) -> "LoanResponse":
+        # The sweeper persists OVERDUE periodically; report it as soon as the due date passes
+        if self.status == LoanStatus.ACTIVE and self.due_date < datetime.utcnow():
+            self.status = LoanStatus.OVERDUE
+        return self
+
 class LoanReturn(BaseModel):
     pass
+
+class LoanBatchCreate(BaseModel):
+    """A basket of books checked out together by one user: all of them or none."""
+    user_id: int
+    book_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+    @field_validator("book_ids")
+    @classmethod
+    def check_unique(cls, book_ids: List[int]) -> List[int]:
+        if len(set(book_ids)) != len(book_ids):
+            raise ValueError("book_ids must be unique")
+        return book_ids
+
+class LoanBatchReturn(BaseModel):
+    """Loans returned together: all of them or none."""
+    loan_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+    @field_validator("loan_ids")
+    @classmethod
+    def check_unique(cls, loan_ids: List[int]) -> List[int]:
+        if len(set(loan_ids)) != len(loan_ids):
+            raise ValueError("loan_ids must be unique")
+        return loan_ids
+
+class AccruedFine(BaseModel):
+    """Fines accrued by one user's (or one author's books') loans still open past their due date."""
+    id: int
+    name: str
+    overdue_loans: int
+    days_late: int
+    fines: float
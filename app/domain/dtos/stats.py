@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from datetime import date
+
+class BookLoanStats(BaseModel):
+    """A book and how many times it was checked out in the requested window."""
+    id: int
+    title: str
+    author_id: int
+    checkouts: int
+
+class AuthorLoanStats(BaseModel):
+    """An author and how many times their books were checked out in the requested window."""
+    id: int
+    name: str
+    checkouts: int
+
+class AuthorActiveLoans(BaseModel):
+    """An author and how many of their books are out right now."""
+    id: int
+    name: str
+    active_loans: int
+
+class DailyLoanStats(BaseModel):
+    """One day's loan activity; `overdue_rate` is the share of that day's returns that came back late."""
+    day: date
+    checkouts: int
+    returns: int
+    late_returns: int
+    overdue_rate: float
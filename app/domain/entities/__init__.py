@@ -1,6 +1,7 @@
 from app.core.database import Base
 from app.domain.entities.user import User
-from app.domain.entities.book import Book, Author
+from app.domain.entities.book import Book, BookCopy, Author
 from app.domain.entities.loan import Loan
+from app.domain.entities.loan_stats import LoanDailyStats
 
 # Para o Alembic conseguir encontrar as models e gerar as migrations automaticamente
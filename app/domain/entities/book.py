@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, DDL, Index, event, func, literal_column, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
 
 class Author(Base):
     __tablename__ = "authors"
+    __table_args__ = (
+        # Postgres search: trigram word similarity on names (typo tolerant)
+        Index(
+            "ix_authors_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -15,14 +21,52 @@ class Author(Base):
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Postgres search: prefix full-text matching and trigram word similarity on titles
+        Index(
+            "ix_books_title_tsv", func.to_tsvector(literal_column("'simple'"), literal_column("title")),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        # Postgres only: the books with copies out, per author (active loans per author in /stats)
+        Index(
+            "ix_books_lent_author_id", "author_id", postgresql_where=text("available_count < copy_count")
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     isbn = Column(String(20), unique=True, index=True, nullable=True)
+    # Materialized from book_copies: copies owned, copies on the shelf, and available_count > 0
+    copy_count = Column(Integer, default=1, nullable=False)
+    available_count = Column(Integer, default=1, nullable=False)
     is_available = Column(Boolean, default=True)
     
-    author_id = Column(Integer, ForeignKey("authors.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("authors.id"), index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     author = relationship("Author", back_populates="books")
     loans = relationship("Loan", back_populates="book")
+    copies = relationship("BookCopy", back_populates="book", cascade="all, delete-orphan")
+
+
+class BookCopy(Base):
+    """One physical copy of a book; a loan holds exactly one copy."""
+    __tablename__ = "book_copies"
+    __table_args__ = (
+        # Checkout picks any free copy of a book
+        Index("ix_book_copies_book_id_is_available", "book_id", "is_available"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    is_available = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    book = relationship("Book", back_populates="copies")
+
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
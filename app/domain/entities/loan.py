@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Enum, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -9,16 +9,35 @@ class LoanStatus(str, enum.Enum):
     RETURNED = "RETURNED"
     OVERDUE = "OVERDUE"
 
+# Loans whose book has not come back yet
+OPEN_LOAN_STATUSES = (LoanStatus.ACTIVE, LoanStatus.OVERDUE)
+
 class Loan(Base):
     __tablename__ = "loans"
+    __table_args__ = (
+        # Serves the overdue sweep (status = ACTIVE AND due_date in a range) as an index range scan
+        Index("ix_loans_status_due_date", "status", "due_date"),
+        # A user's loan history, and the open loan counts checked by counter reconciliation
+        Index("ix_loans_user_id_status", "user_id", "status"),
+        # Postgres only: small partial indexes over the few open loans among the returned ones
+        Index(
+            "ix_loans_open_id", "id", postgresql_where=text("status IN ('ACTIVE', 'OVERDUE')")
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_loans_active_user_id", "user_id", postgresql_where=text("status = 'ACTIVE'")
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id"), index=True, nullable=False)
+    # The copy handed out; set by checkout (loans loaded straight into the table may have none)
+    copy_id = Column(Integer, ForeignKey("book_copies.id"), index=True, nullable=True)
     
-    loan_date = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Indexed for the loan stats rebuild, which reads the loans checked out or returned in recent days
+    loan_date = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
     due_date = Column(DateTime, nullable=False)
-    return_date = Column(DateTime, nullable=True)
+    return_date = Column(DateTime, index=True, nullable=True)
     
     status = Column(Enum(LoanStatus), default=LoanStatus.ACTIVE, nullable=False)
     late_fee = Column(Float, default=0.0)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer
+from app.core.database import Base
+
+class LoanDailyStats(Base):
+    """
+    Loan activity of one book on one day (UTC): checkouts, returns and the returns that came back
+    after their due date. Maintained by checkout and return in their transactions, and rebuilt
+    from `loans` by the loan stats refresher. Serves /stats without reading the loan history.
+    """
+    __tablename__ = "loan_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("authors.id"), nullable=False)
+
+    checkouts = Column(Integer, nullable=False, default=0, server_default="0")
+    returns = Column(Integer, nullable=False, default=0, server_default="0")
+    late_returns = Column(Integer, nullable=False, default=0, server_default="0")
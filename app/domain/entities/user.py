@@ -12,6 +12,9 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
+    # Open loans, OVERDUE ones included despite the name, checked against the loan limit;
+    # maintained by checkout and return in their transactions
+    active_loan_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
     loans = relationship("Loan", back_populates="user", cascade="all, delete-orphan")
@@ -1,17 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.core.logger import logger
+from app.core.logger import logging_stats
+from app.core.access_log import AccessLogMiddleware
 from app.core.rate_limit import limiter
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.cache import init_redis, close_redis, redis_stats
+from app.core.auth_cache import auth_cache
+from app.core.entity_cache import cache_family_stats
+from app.core.security import PasswordPoolFull, password_pool
+from app.core.metrics import CacheStatsCollector, MetricsMiddleware, metrics_response, record_rate_limited, registry
+from app.services.overdue_sweeper import overdue_sweeper
+from app.services.counter_reconciler import counter_reconciler
+from app.services.loan_stats_refresher import loan_stats_refresher
+from app.services.book_availability_service import book_availability_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_redis()
+    overdue_sweeper.start()
+    counter_reconciler.start()
+    loan_stats_refresher.start()
+    yield
+    await loan_stats_refresher.stop()
+    await counter_reconciler.stop()
+    await overdue_sweeper.stop()
+    password_pool.shutdown()
+    close_redis()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set all CORS enabled origins
@@ -21,22 +47,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"Completed request: {request.method} {request.url.path} with status {response.status_code}")
-    return response
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    record_rate_limited(request.scope)
+    return _rate_limit_exceeded_handler(request, exc)
+
+@app.exception_handler(PasswordPoolFull)
+async def password_pool_full_handler(request: Request, exc: PasswordPoolFull):
+    # Shed load instead of queueing more bcrypt work than the pool can drain
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+# Added last so they wrap every other middleware and time the whole request
+app.add_middleware(AccessLogMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 def docs_redirect():
     return RedirectResponse(url='/docs')
 
+def cache_stats() -> dict:
+    return {
+        **cache_family_stats(),
+        "book_availability": book_availability_service.stats(),
+        "auth": auth_cache.stats(),
+    }
+
+registry.register(CacheStatsCollector(cache_stats))
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
 @app.get("/health", tags=["Health"])
 def health_check():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "redis": redis_stats(),
+        "cache": cache_family_stats(),
+        "overdue_sweeper": overdue_sweeper.stats(),
+        "counter_reconciler": counter_reconciler.stats(),
+        "loan_stats_refresher": loan_stats_refresher.stats(),
+        "book_availability": book_availability_service.stats(),
+        "auth_cache": auth_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "logging": logging_stats(),
+    }
@@ -1,38 +1,138 @@
-from typing import Generic, TypeVar, Type, List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from typing import Generic, TypeVar, Type, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy import Select, select
 
 from app.core.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 class BaseRepository(Generic[ModelType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(self, model: Type[ModelType], load_options: Sequence[LoaderOption] = ()):
+        # Eager-loading options applied to reads by default, e.g. `joinedload(Book.author)`
         self.model = model
+        self.load_options = tuple(load_options)
 
-    def get(self, db: Session, id: int) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+    def _query(self, db: Session, options: Optional[Sequence[LoaderOption]] = None) -> Query:
+        """Query with the repository's default loader options, or `options` instead when given (`()` for none)."""
+        return db.query(self.model).options(*(self.load_options if options is None else options))
 
-    def get_multi(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+    def get(self, db: Session, id: int, options: Optional[Sequence[LoaderOption]] = None) -> Optional[ModelType]:
+        return self._query(db, options).filter(self.model.id == id).first()
 
-    def create(self, db: Session, obj_in_data: dict) -> ModelType:
+    def get_multi(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[int] = None,
+        options: Optional[Sequence[LoaderOption]] = None
+    ) -> List[ModelType]:
+        return self._paginate(self._query(db, options), skip=skip, limit=limit, after=after).all()
+
+    def get_ids(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[int]:
+        """Ids of the rows `get_multi` would return, read from the primary key index alone."""
+        return [row[0] for row in self._paginate(db.query(self.model.id), skip=skip, limit=limit, after=after)]
+
+    def _paginate(self, query: Query, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> Query:
+        """
+        Applies keyset pagination (`id > after`, walking the primary key index) when a cursor
+        is given, falling back to offset pagination otherwise. `skip` is ignored with a cursor.
+        Both walk the rows in id order, so an offset page's last id is a valid cursor.
+        """
+        if after is not None:
+            return query.filter(self.model.id > after).order_by(self.model.id).limit(limit)
+        return query.order_by(self.model.id).offset(skip).limit(limit)
+
+    def create(self, db: Session, obj_in_data: dict, commit: bool = True) -> ModelType:
+        """With `commit=False` the row is only flushed, leaving the caller's transaction open."""
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit)
         return db_obj
 
-    def update(self, db: Session, db_obj: ModelType, obj_in_data: dict) -> ModelType:
+    def update(self, db: Session, db_obj: ModelType, obj_in_data: dict, commit: bool = True) -> ModelType:
         for field, value in obj_in_data.items():
             setattr(db_obj, field, value)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit)
         return db_obj
 
+    def _save(self, db: Session, db_obj: ModelType, commit: bool) -> None:
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
+        else:
+            db.flush()
+
     def delete(self, db: Session, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
         return obj
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """
+    `BaseRepository` for an `AsyncSession` (DB_ASYNC_MODE): the same reads and writes, awaited
+    natively. Nothing may lazy-load under an AsyncSession, so whatever the callers' responses
+    nest has to be in `load_options`.
+    """
+    def __init__(self, model: Type[ModelType], load_options: Sequence[LoaderOption] = ()):
+        self.model = model
+        self.load_options = tuple(load_options)
+
+    def _select(self, options: Optional[Sequence[LoaderOption]] = None) -> Select:
+        """SELECT with the repository's default loader options, or `options` instead when given (`()` for none)."""
+        return select(self.model).options(*(self.load_options if options is None else options))
+
+    async def get(self, db: AsyncSession, id: int, options: Optional[Sequence[LoaderOption]] = None) -> Optional[ModelType]:
+        return (await db.scalars(self._select(options).where(self.model.id == id))).first()
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[int] = None,
+        options: Optional[Sequence[LoaderOption]] = None
+    ) -> List[ModelType]:
+        return list(await db.scalars(self._paginate(self._select(options), skip=skip, limit=limit, after=after)))
+
+    async def get_ids(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[int]:
+        """Ids of the rows `get_multi` would return, read from the primary key index alone."""
+        return list(await db.scalars(self._paginate(select(self.model.id), skip=skip, limit=limit, after=after)))
+
+    def _paginate(self, statement: Select, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> Select:
+        """Keyset pagination with a cursor, offset pagination otherwise, as in `BaseRepository._paginate`."""
+        if after is not None:
+            return statement.where(self.model.id > after).order_by(self.model.id).limit(limit)
+        return statement.order_by(self.model.id).offset(skip).limit(limit)
+
+    async def create(self, db: AsyncSession, obj_in_data: dict, commit: bool = True) -> ModelType:
+        """With `commit=False` the row is only flushed, leaving the caller's transaction open."""
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await self._save(db, db_obj, commit)
+        return db_obj
+
+    async def update(self, db: AsyncSession, db_obj: ModelType, obj_in_data: dict, commit: bool = True) -> ModelType:
+        for field, value in obj_in_data.items():
+            setattr(db_obj, field, value)
+        db.add(db_obj)
+        await self._save(db, db_obj, commit)
+        return db_obj
+
+    async def _save(self, db: AsyncSession, db_obj: ModelType, commit: bool) -> None:
+        if commit:
+            await db.commit()
+            await db.refresh(db_obj)
+        else:
+            await db.flush()
+
+    async def delete(self, db: AsyncSession, id: int) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        if obj is not None:
+            await db.delete(obj)
+            await db.commit()
+        return obj
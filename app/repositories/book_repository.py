@@ -1,17 +1,269 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from app.repositories.base import BaseRepository
-from app.domain.entities.book import Book, Author
+import csv
+import io
+from typing import Optional, List, Dict, Iterable, Set, Tuple
+from sqlalchemy import Select, case, exists, func, insert, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from app.repositories.base import AsyncBaseRepository, BaseRepository
+from app.domain.entities.book import Book, BookCopy, Author
+from app.domain.entities.loan import Loan, OPEN_LOAN_STATUSES
+
+# Text search configuration of the books title tsvector index (inlined so the index matches)
+SEARCH_CONFIG = literal_column("'simple'")
 
 class BookRepository(BaseRepository[Book]):
+    # Column order of bulk_insert rows streamed through COPY
+    COPY_COLUMNS = ("title", "isbn", "is_available", "copy_count", "available_count", "author_id", "created_at")
+    # Checkout skips copies another transaction is claiming (benchmarks turn it off to compare)
+    SKIP_LOCKED = True
+
     def get_by_isbn(self, db: Session, isbn: str) -> Optional[Book]:
-        return db.query(Book).filter(Book.isbn == isbn).first()
+        return self._query(db).filter(Book.isbn == isbn).first()
+
+    def claim_copies(self, db: Session, book_ids: List[int]) -> Dict[int, int]:
+        """
+        Marks one free copy of each book as lent in one `UPDATE ... RETURNING` and returns the
+        claimed copy id by book id (books with no free copy are left out; the caller rolls back
+        unless every book got one). Each copy is picked with `FOR UPDATE SKIP LOCKED`, so
+        concurrent checkouts of one title take different copies instead of queueing on the
+        first free one. Does not commit.
+
+        Like every bulk UPDATE here it skips the ORM session sync: with it, SQLAlchemy adds the
+        primary key to the RETURNING clause, and statements first compiled by several threads at
+        once could hand the columns back swapped (a copy id read as a book id) on Postgres.
+        """
+        free_copy = (
+            select(BookCopy.id)
+            .where(BookCopy.book_id == Book.id, BookCopy.is_available == True)
+            .limit(1)
+            .with_for_update(skip_locked=self.SKIP_LOCKED)
+            .correlate(Book)
+            .scalar_subquery()
+        )
+        return dict(db.execute(
+            update(BookCopy)
+            .where(BookCopy.id.in_(select(free_copy).where(Book.id.in_(book_ids))), BookCopy.is_available == True)
+            .values(is_available=False)
+            .returning(BookCopy.book_id, BookCopy.id)
+            .execution_options(synchronize_session=False)
+        ).all())
+
+    def release_copies(self, db: Session, copy_ids: List[int]) -> None:
+        """Puts lent copies back on the shelf in one UPDATE. Does not commit."""
+        db.execute(update(BookCopy).where(BookCopy.id.in_(copy_ids)).values(is_available=True))
+
+    def add_available(self, db: Session, deltas: Dict[int, int]) -> Dict[int, int]:
+        """
+        Adds `deltas` (by book id) to `available_count`, keeping `is_available` in step, in one
+        `UPDATE ... RETURNING` and returns the new counts. Checkout and return call it after
+        claiming or releasing the copies and just before committing, so the lock on a popular
+        book's row is held as briefly as possible. Does not commit.
+        """
+        new_count = Book.available_count + case(deltas, value=Book.id, else_=0)
+        return dict(db.execute(
+            update(Book).where(Book.id.in_(list(deltas)))
+            .values(available_count=new_count, is_available=new_count > 0)
+            .returning(Book.id, Book.available_count)
+            .execution_options(synchronize_session=False)
+        ).all())
+
+    def add_copies(self, db: Session, book_id: int, count: int, available: bool = True) -> None:
+        """Adds `count` copies to a book and to its counters. Does not commit."""
+        db.execute(insert(BookCopy).values([{"book_id": book_id, "is_available": available}] * count))
+        added = count if available else 0
+        db.execute(
+            update(Book).where(Book.id == book_id).values(
+                copy_count=Book.copy_count + count,
+                available_count=Book.available_count + added,
+                is_available=Book.available_count + added > 0,
+            )
+        )
+
+    def add_first_copies(self, db: Session, after: int = 0) -> None:
+        """
+        Gives each book with an id above `after` that has no copy yet its first one (lent if the
+        book is), in one INSERT ... SELECT. For books inserted in bulk without copies. Does not commit.
+        """
+        has_copy = exists().where(BookCopy.book_id == Book.id)
+        db.execute(insert(BookCopy).from_select(
+            ["book_id", "is_available", "created_at"],
+            select(Book.id, Book.is_available, Book.created_at).where(Book.id > after, ~has_copy),
+        ))
+
+    def exists(self, db: Session, book_id: int) -> bool:
+        return db.query(Book.id).filter(Book.id == book_id).first() is not None
+
+    def get_availability(self, db: Session, ids: List[int]) -> Dict[int, bool]:
+        """`is_available` by id for the given books (missing ids are skipped)."""
+        if not ids:
+            return {}
+        return dict(db.execute(select(Book.id, Book.is_available).where(Book.id.in_(ids))).all())
+
+    def _open_loan_on_copy(self):
+        return exists().where(Loan.copy_id == BookCopy.id, Loan.status.in_(OPEN_LOAN_STATUSES))
+
+    def get_availability_after(self, db: Session, after: int, limit: int) -> List[Tuple[int, int, int, bool, int, int, int]]:
+        """
+        (id, copy_count, available_count, is_available, copies, free copies, copies flagged wrong)
+        of the next `limit` books with an id above `after`: the counters next to what book_copies
+        and the open loans say (a copy is free unless a loan is open on it).
+        """
+        def copies(*where):
+            return (
+                select(func.count()).select_from(BookCopy).where(BookCopy.book_id == Book.id, *where)
+                .correlate(Book).scalar_subquery()
+            )
+        return db.execute(
+            select(
+                Book.id, Book.copy_count, Book.available_count, Book.is_available,
+                copies(), copies(~self._open_loan_on_copy()),
+                copies(BookCopy.is_available == self._open_loan_on_copy()),
+            )
+            .where(Book.id > after).order_by(Book.id).limit(limit)
+        ).all()
 
-    def get_by_author(self, db: Session, author_id: int, skip: int = 0, limit: int = 100) -> List[Book]:
-        return db.query(Book).filter(Book.author_id == author_id).offset(skip).limit(limit).all()
+    def recompute_availability(self, db: Session, ids: List[int]) -> None:
+        """
+        Resets the copies' `is_available` from the loans table (free unless a loan is open on the
+        copy), then the books' counters from their copies, for `ids`. Copies then books are locked
+        first, the order checkout takes them in, so the result sees any checkout or return in
+        flight. Does not commit.
+        """
+        db.execute(select(BookCopy.id).where(BookCopy.book_id.in_(ids)).with_for_update())
+        db.execute(select(Book.id).where(Book.id.in_(ids)).with_for_update())
+        db.execute(
+            update(BookCopy).where(BookCopy.book_id.in_(ids)).values(is_available=~self._open_loan_on_copy())
+        )
+        free = (
+            select(func.count()).select_from(BookCopy)
+            .where(BookCopy.book_id == Book.id, BookCopy.is_available == True)
+            .correlate(Book).scalar_subquery()
+        )
+        db.execute(
+            update(Book).where(Book.id.in_(ids)).values(
+                copy_count=select(func.count()).select_from(BookCopy).where(BookCopy.book_id == Book.id)
+                .correlate(Book).scalar_subquery(),
+                available_count=free,
+                is_available=free > 0,
+            )
+        )
+
+    def get_by_author(self, db: Session, author_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Book]:
+        query = self._query(db).filter(Book.author_id == author_id)
+        return self._paginate(query, skip=skip, limit=limit, after=after).all()
+
+    def get_by_ids(self, db: Session, ids: List[int]) -> List[Book]:
+        """Books with the given ids, in the order of `ids` (missing ids are skipped)."""
+        if not ids:
+            return []
+        books = {book.id: book for book in self._query(db).filter(Book.id.in_(ids))}
+        return [books[book_id] for book_id in ids if book_id in books]
+
+    def get_titles_after(self, db: Session, after: int, limit: int) -> List[Tuple[int, str, int]]:
+        """(id, title, author_id) of the next `limit` books with an id above `after`."""
+        return db.execute(
+            select(Book.id, Book.title, Book.author_id).where(Book.id > after).order_by(Book.id).limit(limit)
+        ).all()
+
+    def search(self, db: Session, text: str, terms: List[str], skip: int = 0, limit: int = 10) -> List[Book]:
+        """
+        Postgres only: books whose title matches every term as a prefix (`tsvector`), or whose
+        title or author name is similar to `text` (`pg_trgm` word similarity, typo tolerant).
+        Ranked by full-text rank plus similarity. `terms` must be word tokens.
+        """
+        ts_query = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        title_tsv = func.to_tsvector(SEARCH_CONFIG, Book.title)
+        similarity = func.greatest(func.word_similarity(text, Book.title), func.word_similarity(text, Author.name))
+        query = (
+            self._query(db, options=[contains_eager(Book.author)])
+            .join(Book.author)
+            .filter(or_(
+                title_tsv.op("@@")(ts_query),
+                Book.title.op("%>")(text),
+                Author.name.op("%>")(text),
+            ))
+            .order_by((func.ts_rank(title_tsv, ts_query) + similarity).desc(), Book.id)
+        )
+        return query.offset(skip).limit(limit).all()
+
+    def get_existing_isbns(self, db: Session, isbns: Iterable[str]) -> Set[str]:
+        return set(db.scalars(select(Book.isbn).where(Book.isbn.in_(list(isbns)))))
+
+    def bulk_insert(self, db: Session, rows: List[dict]) -> None:
+        """
+        Inserts many books in one statement: `COPY ... FROM STDIN` on Postgres (psycopg2),
+        a multi-row `INSERT ... VALUES` elsewhere, then one INSERT ... SELECT giving each new book
+        its first copy. Rows must carry every copied column, with a `copy_count` of 1. Does not commit.
+        """
+        if not rows:
+            return
+        after = db.scalar(select(func.coalesce(func.max(Book.id), 0)))
+        connection = db.connection()
+        if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([row[column] for column in self.COPY_COLUMNS])
+            buffer.seek(0)
+            with connection.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY books ({', '.join(self.COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+        else:
+            db.execute(insert(Book).values(rows))
+        self.add_first_copies(db, after=after)
+
+    def export_query(self) -> Select:
+        """Plain book columns with the author's name in id order, for streaming exports without ORM objects."""
+        return (
+            select(
+                Book.id, Book.title, Book.isbn, Book.is_available, Book.copy_count, Book.available_count,
+                Book.author_id, Author.name.label("author_name"),
+            )
+            .join(Author, Author.id == Book.author_id)
+            .order_by(Book.id)
+        )
 
 class AuthorRepository(BaseRepository[Author]):
-    pass
+    def get_ids_by_names(self, db: Session, names: Iterable[str]) -> Dict[str, int]:
+        """Maps author names to ids (the oldest author when a name is duplicated)."""
+        rows = db.execute(
+            select(Author.name, func.min(Author.id)).where(Author.name.in_(list(names))).group_by(Author.name)
+        )
+        return {name: author_id for name, author_id in rows}
+
+    def get_names_after(self, db: Session, after: int, limit: int) -> List[Tuple[int, str]]:
+        """(id, name) of the next `limit` authors with an id above `after`."""
+        return db.execute(
+            select(Author.id, Author.name).where(Author.id > after).order_by(Author.id).limit(limit)
+        ).all()
+
+    def get_existing_ids(self, db: Session, ids: Iterable[int]) -> Set[int]:
+        return set(db.scalars(select(Author.id).where(Author.id.in_(list(ids)))))
+
+    def bulk_create(self, db: Session, names: List[str]) -> Dict[str, int]:
+        """Inserts authors in one statement and returns their ids by name. Does not commit."""
+        if not names:
+            return {}
+        db.execute(insert(Author).values([{"name": name} for name in names]))
+        return self.get_ids_by_names(db, names)
+
+class AsyncBookRepository(AsyncBaseRepository[Book]):
+    async def get_by_ids(self, db: AsyncSession, ids: List[int]) -> List[Book]:
+        """Books with the given ids, in the order of `ids` (missing ids are skipped)."""
+        if not ids:
+            return []
+        books = {book.id: book for book in await db.scalars(self._select().where(Book.id.in_(ids)))}
+        return [books[book_id] for book_id in ids if book_id in books]
+
+    async def get_availability(self, db: AsyncSession, ids: List[int]) -> Dict[int, bool]:
+        """`is_available` by id for the given books (missing ids are skipped)."""
+        if not ids:
+            return {}
+        return dict((await db.execute(select(Book.id, Book.is_available).where(Book.id.in_(ids)))).all())
 
-book_repository = BookRepository(Book)
+# BookResponse nests the author: load it in the same SELECT instead of one lazy load per book
+book_repository = BookRepository(Book, load_options=[joinedload(Book.author)])
 author_repository = AuthorRepository(Author)
+async_book_repository = AsyncBookRepository(Book, load_options=[joinedload(Book.author)])
+async_author_repository = AsyncBaseRepository(Author)
@@ -1,30 +1,137 @@
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional, Sequence
+from sqlalchemy import DateTime, Integer, Select, case, cast, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.repositories.base import BaseRepository
-from app.domain.entities.loan import Loan, LoanStatus
+from sqlalchemy.sql.elements import ColumnElement
+from app.repositories.base import AsyncBaseRepository, BaseRepository
+from app.domain.entities.book import Author, Book
+from app.domain.entities.loan import Loan, LoanStatus, OPEN_LOAN_STATUSES
+from app.domain.entities.user import User
 
 class LoanRepository(BaseRepository[Loan]):
-    def get_active_by_user(self, db: Session, user_id: int) -> List[Loan]:
-        return db.query(Loan).filter(
-            Loan.user_id == user_id,
-            Loan.status == LoanStatus.ACTIVE
-        ).all()
+    def get_for_update(self, db: Session, id: int) -> Optional[Loan]:
+        """Fetches a loan with a row lock (`SELECT ... FOR UPDATE`) so it cannot be returned twice."""
+        return db.query(Loan).filter(Loan.id == id).with_for_update().first()
 
-    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Loan]:
-        return db.query(Loan).filter(Loan.user_id == user_id).offset(skip).limit(limit).all()
+    def get_many_for_update(self, db: Session, ids: List[int]) -> List[Loan]:
+        """`get_for_update` for several loans in one query, locking them in id order."""
+        return db.query(Loan).filter(Loan.id.in_(ids)).order_by(Loan.id).with_for_update().all()
 
-    def get_all_active_or_delayed(self, db: Session, skip: int = 0, limit: int = 100) -> List[Loan]:
-        return db.query(Loan).filter(
+    def get_by_ids(self, db: Session, ids: List[int]) -> List[Loan]:
+        """
+        Loans with the given ids, in the order of `ids` (missing ids are skipped). Loans already in
+        the session are refreshed, so bulk UPDATEs made through it show.
+        """
+        if not ids:
+            return []
+        loans = {loan.id: loan for loan in db.query(Loan).filter(Loan.id.in_(ids)).populate_existing()}
+        return [loans[loan_id] for loan_id in ids if loan_id in loans]
+
+    def create_many(self, db: Session, rows: List[dict]) -> List[int]:
+        """
+        Inserts the loans in one multi-row INSERT and returns their ids (in no particular order).
+        Rows must carry every column, defaults are not applied. Does not commit.
+        """
+        return list(db.scalars(insert(Loan).values(rows).returning(Loan.id)))
+
+    def days_late(self, db: Session, now: datetime) -> ColumnElement[int]:
+        """Whole days from `due_date` to `now` (truncated like `timedelta.days`), as SQL for the session's database."""
+        now = literal(now, DateTime)
+        if db.get_bind().dialect.name == "sqlite":
+            return cast(func.julianday(now) - func.julianday(Loan.due_date), Integer)
+        return cast(func.floor(func.extract("epoch", now - Loan.due_date) / 86400), Integer)
+
+    def late_fee(self, db: Session, now: datetime, fee_per_day: float) -> ColumnElement[float]:
+        """The fine a loan owes if returned at `now`: `fee_per_day` per whole day past `due_date`."""
+        return case((Loan.due_date < now, self.days_late(db, now) * fee_per_day), else_=0.0)
+
+    def mark_returned(self, db: Session, ids: List[int], returned_at: datetime, fee_per_day: float) -> None:
+        """
+        Marks the loans as RETURNED at `returned_at` in one UPDATE, computing each late fee in SQL.
+        Does not commit.
+        """
+        db.query(Loan).filter(Loan.id.in_(ids)).update({
+            "status": LoanStatus.RETURNED,
+            "return_date": returned_at,
+            "late_fee": self.late_fee(db, returned_at, fee_per_day),
+        }, synchronize_session=False)
+
+    def accrued_fines_query(
+        self, db: Session, now: datetime, fee_per_day: float, group_by: Literal["user", "author"]
+    ) -> Select:
+        """
+        Fines accrued so far by the loans still open past their due date, per user or per author:
+        (id, name, overdue_loans, days_late, fines), largest fines first. The overdue loans are
+        aggregated before the names are joined, so only owing users or authors are looked up.
+        """
+        days_late = self.days_late(db, now)
+        if group_by == "author":
+            entity, key = Author, Book.author_id
+            overdue = select(key.label("key")).select_from(Loan).join(Book, Book.id == Loan.book_id)
+        else:
+            entity, key = User, Loan.user_id
+            overdue = select(key.label("key"))
+        totals = (
+            overdue.add_columns(func.count(Loan.id).label("overdue_loans"), func.sum(days_late).label("days_late"))
+            .where(Loan.status.in_(OPEN_LOAN_STATUSES), Loan.due_date < now)
+            .group_by(key)
+            .subquery()
+        )
+        fines = (totals.c.days_late * fee_per_day).label("fines")
+        return (
+            select(entity.id, entity.name, totals.c.overdue_loans, totals.c.days_late, fines)
+            .join(totals, totals.c.key == entity.id)
+            .order_by(fines.desc(), entity.id)
+        )
+
+    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        query = db.query(Loan).filter(Loan.user_id == user_id)
+        return self._paginate(query, skip=skip, limit=limit, after=after).all()
+
+    def get_by_book(self, db: Session, book_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        query = db.query(Loan).filter(Loan.book_id == book_id)
+        return self._paginate(query, skip=skip, limit=limit, after=after).all()
+
+    def get_all_active_or_delayed(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        query = db.query(Loan).filter(
             Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.OVERDUE])
-        ).offset(skip).limit(limit).all()
+        )
+        return self._paginate(query, skip=skip, limit=limit, after=after).all()
+
+    def mark_overdue_loans(self, db: Session, now: datetime, since: Optional[datetime] = None) -> int:
+        """
+        Transitions ACTIVE loans whose due_date passed before `now` to OVERDUE and returns how many
+        were updated. With `since`, only loans that fell due in [since, now) are considered. Does
+        not commit.
+        """
+        statement = update(Loan).where(Loan.status == LoanStatus.ACTIVE, Loan.due_date < now)
+        if since is not None:
+            statement = statement.where(Loan.due_date >= since)
+        return db.execute(
+            statement.values(status=LoanStatus.OVERDUE).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def export_query(self, statuses: Optional[Sequence[LoanStatus]] = None, user_id: Optional[int] = None) -> Select:
+        """Plain loan columns in id order, for streaming exports without ORM objects."""
+        statement = select(
+            Loan.id, Loan.user_id, Loan.book_id, Loan.loan_date, Loan.due_date,
+            Loan.return_date, Loan.status, Loan.late_fee,
+        ).order_by(Loan.id)
+        if statuses:
+            statement = statement.where(Loan.status.in_(statuses))
+        if user_id is not None:
+            statement = statement.where(Loan.user_id == user_id)
+        return statement
+
+class AsyncLoanRepository(AsyncBaseRepository[Loan]):
+    async def get_by_user(self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        statement = self._select().where(Loan.user_id == user_id)
+        return list(await db.scalars(self._paginate(statement, skip=skip, limit=limit, after=after)))
 
-    def mark_overdue_loans(self, db: Session) -> None:
-        """Transitions ACTIVE loans past their due_date to OVERDUE."""
-        db.query(Loan).filter(
-            Loan.status == LoanStatus.ACTIVE,
-            Loan.due_date < datetime.utcnow()
-        ).update({"status": LoanStatus.OVERDUE}, synchronize_session=False)
-        db.commit()
+    async def get_all_active_or_delayed(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        statement = self._select().where(Loan.status.in_(OPEN_LOAN_STATUSES))
+        return list(await db.scalars(self._paginate(statement, skip=skip, limit=limit, after=after)))
 
 loan_repository = LoanRepository(Loan)
+async_loan_repository = AsyncLoanRepository(Loan)
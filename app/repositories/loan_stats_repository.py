@@ -0,0 +1,132 @@
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
+from sqlalchemy import Date, Row, Select, case, delete, func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.domain.entities.book import Author, Book
+from app.domain.entities.loan import Loan
+from app.domain.entities.loan_stats import LoanDailyStats
+
+COUNTERS = ("checkouts", "returns", "late_returns")
+
+class LoanStatsRepository:
+    """
+    Reads and writes `loan_daily_stats`. Not a BaseRepository: the rows are keyed by (day, book_id),
+    not by an `id`.
+    """
+
+    def _add(self, db: Session, rows: Select) -> None:
+        """Adds the counters of `rows` (day, book_id, author_id, *COUNTERS) to the daily rows, creating missing ones."""
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        statement = insert(LoanDailyStats).from_select(["day", "book_id", "author_id", *COUNTERS], rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["day", "book_id"],
+            set_={name: getattr(LoanDailyStats, name) + getattr(statement.excluded, name) for name in COUNTERS},
+        ))
+
+    def record_checkouts(self, db: Session, day: date, book_ids: List[int]) -> None:
+        """Counts one checkout on `day` for each of `book_ids`, in one statement. Does not commit."""
+        self._add(db, select(
+            literal(day, Date), Book.id, Book.author_id, literal(1), literal(0), literal(0)
+        ).where(Book.id.in_(book_ids)))
+
+    def record_returns(self, db: Session, day: date, returns: Dict[int, int], late_returns: Optional[Dict[int, int]] = None) -> None:
+        """
+        Counts `returns[book_id]` returns on `day` for each book, `late_returns[book_id]` of them
+        late, in one statement. Does not commit.
+        """
+        late = case(late_returns, value=Book.id, else_=0) if late_returns else literal(0)
+        self._add(db, select(
+            literal(day, Date), Book.id, Book.author_id, literal(0), case(returns, value=Book.id), late
+        ).where(Book.id.in_(list(returns))))
+
+    def rebuild(self, db: Session, since: date, before: date) -> int:
+        """
+        Recomputes the daily rows of the days from `since` up to `before` (excluded) from the loans
+        checked out or returned in them, and returns how many were written. Later days are left to
+        the request path, which only writes to the current day. Does not commit.
+        """
+        start, end = datetime.combine(since, time.min), datetime.combine(before, time.min)
+        checkouts = select(
+            func.date(Loan.loan_date, type_=Date).label("day"), Loan.book_id,
+            literal(1).label("checkouts"), literal(0).label("returns"), literal(0).label("late_returns"),
+        ).where(Loan.loan_date >= start, Loan.loan_date < end)
+        returns = select(
+            func.date(Loan.return_date, type_=Date).label("day"), Loan.book_id,
+            literal(0), literal(1), case((Loan.return_date > Loan.due_date, 1), else_=0),
+        ).where(Loan.return_date >= start, Loan.return_date < end)
+        events = union_all(checkouts, returns).subquery()
+        rows = (
+            select(
+                events.c.day, events.c.book_id, Book.author_id,
+                *(func.sum(events.c[name]) for name in COUNTERS),
+            )
+            .join(Book, Book.id == events.c.book_id)
+            .group_by(events.c.day, events.c.book_id, Book.author_id)
+        )
+        db.execute(delete(LoanDailyStats).where(LoanDailyStats.day >= since, LoanDailyStats.day < before))
+        result = db.execute(LoanDailyStats.__table__.insert().from_select(["day", "book_id", "author_id", *COUNTERS], rows))
+        return result.rowcount
+
+    def top_books(self, db: Session, since: date, limit: int) -> List[Row]:
+        """(id, title, author_id, checkouts) of the most borrowed books from `since` on."""
+        totals = (
+            select(LoanDailyStats.book_id, func.sum(LoanDailyStats.checkouts).label("checkouts"))
+            .where(LoanDailyStats.day >= since)
+            .group_by(LoanDailyStats.book_id)
+            .order_by(func.sum(LoanDailyStats.checkouts).desc(), LoanDailyStats.book_id)
+            .limit(limit)
+            .subquery()
+        )
+        return db.execute(
+            select(Book.id, Book.title, Book.author_id, totals.c.checkouts)
+            .join(totals, totals.c.book_id == Book.id)
+            .order_by(totals.c.checkouts.desc(), Book.id)
+        ).all()
+
+    def top_authors(self, db: Session, since: date, limit: int) -> List[Row]:
+        """(id, name, checkouts) of the most borrowed authors from `since` on."""
+        totals = (
+            select(LoanDailyStats.author_id, func.sum(LoanDailyStats.checkouts).label("checkouts"))
+            .where(LoanDailyStats.day >= since)
+            .group_by(LoanDailyStats.author_id)
+            .order_by(func.sum(LoanDailyStats.checkouts).desc(), LoanDailyStats.author_id)
+            .limit(limit)
+            .subquery()
+        )
+        return db.execute(
+            select(Author.id, Author.name, totals.c.checkouts)
+            .join(totals, totals.c.author_id == Author.id)
+            .order_by(totals.c.checkouts.desc(), Author.id)
+        ).all()
+
+    def active_loans_by_author(self, db: Session, limit: int) -> List[Row]:
+        """
+        (id, name, active_loans) of the authors with the most copies out. Counted from the books'
+        copy counters (kept in step with the open loans), not from the loan history.
+        """
+        lent = func.sum(Book.copy_count - Book.available_count)
+        totals = (
+            select(Book.author_id, lent.label("active_loans"))
+            .where(Book.available_count < Book.copy_count)
+            .group_by(Book.author_id)
+            .order_by(lent.desc(), Book.author_id)
+            .limit(limit)
+            .subquery()
+        )
+        return db.execute(
+            select(Author.id, Author.name, totals.c.active_loans)
+            .join(totals, totals.c.author_id == Author.id)
+            .order_by(totals.c.active_loans.desc(), Author.id)
+        ).all()
+
+    def daily_totals(self, db: Session, since: date) -> List[Row]:
+        """(day, checkouts, returns, late_returns) for each day with activity from `since` on."""
+        return db.execute(
+            select(LoanDailyStats.day, *(func.sum(getattr(LoanDailyStats, name)).label(name) for name in COUNTERS))
+            .where(LoanDailyStats.day >= since)
+            .group_by(LoanDailyStats.day)
+            .order_by(LoanDailyStats.day)
+        ).all()
+
+loan_stats_repository = LoanStatsRepository()
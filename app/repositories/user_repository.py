@@ -1,10 +1,83 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Select, case, func, select
 from sqlalchemy.orm import Session
-from app.repositories.base import BaseRepository
+from app.repositories.base import AsyncBaseRepository, BaseRepository
 from app.domain.entities.user import User
+from app.domain.entities.loan import Loan, OPEN_LOAN_STATUSES
 
 class UserRepository(BaseRepository[User]):
     def get_by_email(self, db: Session, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
+    def exists(self, db: Session, user_id: int) -> bool:
+        return db.query(User.id).filter(User.id == user_id).first() is not None
+
+    def claim_loan_slot(self, db: Session, user_id: int, max_loans: int, count: int = 1) -> bool:
+        """
+        Atomically adds `count` to the user's `active_loan_count` if the result stays within
+        `max_loans` (`UPDATE ... WHERE active_loan_count + count <= max`). The row lock it takes
+        serializes that user's checkouts. Returns False if the user is missing or would go over the
+        limit. Does not commit.
+        """
+        claimed = db.query(User).filter(
+            User.id == user_id,
+            User.active_loan_count + count <= max_loans
+        ).update({"active_loan_count": User.active_loan_count + count}, synchronize_session=False)
+        return claimed == 1
+
+    def get_active_loan_count(self, db: Session, user_id: int) -> Optional[int]:
+        """The user's `active_loan_count`, or None if the user does not exist."""
+        return db.query(User.active_loan_count).filter(User.id == user_id).scalar()
+
+    def release_loan_slot(self, db: Session, user_id: int) -> None:
+        """Decrements the user's `active_loan_count` (never below zero). Does not commit."""
+        db.query(User).filter(
+            User.id == user_id,
+            User.active_loan_count > 0
+        ).update({"active_loan_count": User.active_loan_count - 1}, synchronize_session=False)
+
+    def release_loan_slots(self, db: Session, counts: Dict[int, int]) -> None:
+        """
+        Subtracts `counts[user_id]` from each user's `active_loan_count` (never below zero) in one
+        UPDATE. Does not commit.
+        """
+        if not counts:
+            return
+        released = case(counts, value=User.id, else_=0)
+        db.query(User).filter(User.id.in_(counts)).update(
+            {"active_loan_count": case((User.active_loan_count > released, User.active_loan_count - released), else_=0)},
+            synchronize_session=False,
+        )
+
+    def _active_loans(self):
+        return (
+            select(func.count(Loan.id))
+            .where(Loan.user_id == User.id, Loan.status.in_(OPEN_LOAN_STATUSES))
+            .scalar_subquery()
+        )
+
+    def get_loan_counts_after(self, db: Session, after: int, limit: int) -> List[Tuple[int, int, int]]:
+        """(id, active_loan_count, open loans counted in the loans table) of the next `limit` users with an id above `after`."""
+        return db.execute(
+            select(User.id, User.active_loan_count, self._active_loans())
+            .where(User.id > after).order_by(User.id).limit(limit)
+        ).all()
+
+    def recount_active_loans(self, db: Session, user_ids: List[int]) -> None:
+        """
+        Resets `active_loan_count` from the loans table for `user_ids`. The rows are locked first so
+        the recount sees any checkout or return that was in flight. Does not commit.
+        """
+        db.execute(select(User.id).where(User.id.in_(user_ids)).with_for_update())
+        db.query(User).filter(User.id.in_(user_ids)).update(
+            {"active_loan_count": self._active_loans()}, synchronize_session=False
+        )
+
+    def export_query(self) -> Select:
+        """Plain user columns (no password hash) in id order, for streaming exports without ORM objects."""
+        return select(
+            User.id, User.name, User.email, User.is_active, User.active_loan_count, User.created_at
+        ).order_by(User.id)
+
 user_repository = UserRepository(User)
+async_user_repository = AsyncBaseRepository(User)
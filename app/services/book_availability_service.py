@@ -0,0 +1,159 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from redis import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import get_redis, safe_redis_call
+from app.repositories.book_repository import async_book_repository, book_repository
+
+class BookAvailabilityService:
+    """
+    Book availability served from a Redis bitfield, two bits per book id (0 = not cached,
+    1 = lent, 2 = available): one `BITFIELD GET` answers any number of ids in O(1) each.
+    Checkout, return and book creation write the new value after their commit; ids not cached
+    yet are read from the database and filled in only where still not cached, so a lookup racing
+    a checkout never overwrites the checkout's newer value. Without Redis every lookup is a
+    single query.
+
+    The cache is advisory: checkouts are still decided by the database. A value written while
+    Redis was unreachable stays stale until the counter reconciliation corrects it.
+    """
+    KEY = "books:availability"
+    NOT_CACHED, LENT, AVAILABLE = 0, 1, 2
+    # BITFIELD offsets are 32-bit: larger ids are always read from the database
+    MAX_CACHED_ID = 2 ** 31 - 1
+    # Sets each (offset, value) pair of ARGV only where the field is still NOT_CACHED, atomically
+    FILL_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local offset = '#' .. ARGV[i]
+    if redis.call('BITFIELD', KEYS[1], 'GET', 'u2', offset)[1] == 0 then
+        redis.call('BITFIELD', KEYS[1], 'SET', 'u2', offset, ARGV[i + 1])
+    end
+end
+return 0
+"""
+    # Sets each (offset, expected, value) triple of ARGV only where the field still holds `expected`
+    REPLACE_SCRIPT = """
+for i = 1, #ARGV, 3 do
+    local offset = '#' .. ARGV[i]
+    if redis.call('BITFIELD', KEYS[1], 'GET', 'u2', offset)[1] == tonumber(ARGV[i + 1]) then
+        redis.call('BITFIELD', KEYS[1], 'SET', 'u2', offset, ARGV[i + 2])
+    end
+end
+return 0
+"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _cacheable(cls, book_id: int) -> bool:
+        return 0 < book_id <= cls.MAX_CACHED_ID
+
+    def get_many(self, db: Session, book_ids: Iterable[int]) -> Dict[int, bool]:
+        """`is_available` by id; books that do not exist are left out."""
+        redis_client = get_redis()
+        found, missing = self._lookup(redis_client, book_ids)
+        if missing:
+            loaded = book_repository.get_availability(db, missing)
+            self.fill(redis_client, loaded)
+            found.update(loaded)
+        return found
+
+    async def get_many_async(self, db: AsyncSession, book_ids: Iterable[int]) -> Dict[int, bool]:
+        """`get_many` over an AsyncSession (DB_ASYNC_MODE), with the Redis calls on the threadpool."""
+        redis_client = get_redis()
+        if redis_client is None:
+            found, missing = self._lookup(None, book_ids)
+        else:
+            found, missing = await run_in_threadpool(self._lookup, redis_client, book_ids)
+        if missing:
+            loaded = await async_book_repository.get_availability(db, missing)
+            if redis_client is not None:
+                await run_in_threadpool(self.fill, redis_client, loaded)
+            found.update(loaded)
+        return found
+
+    def _lookup(self, redis_client: Optional[Redis], book_ids: Iterable[int]) -> Tuple[Dict[int, bool], List[int]]:
+        """The cached availability by id, and the ids (deduplicated, in order) to read from the database."""
+        ids = list(dict.fromkeys(book_ids))
+        found: Dict[int, bool] = {}
+        missing = ids
+        cached = self.read(redis_client, [book_id for book_id in ids if self._cacheable(book_id)])
+        if cached:
+            found = {book_id: value == self.AVAILABLE for book_id, value in cached.items() if value != self.NOT_CACHED}
+            missing = [book_id for book_id in ids if book_id not in found]
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set(self, book_id: int, is_available: bool) -> None:
+        """Caches a book's availability; call it after the change is committed."""
+        self.write(get_redis(), {book_id: is_available})
+
+    def read(self, redis_client: Optional[Redis], book_ids: List[int]) -> Optional[Dict[int, int]]:
+        """Raw cached values (NOT_CACHED, LENT or AVAILABLE) by id, or None if Redis is unavailable."""
+        if redis_client is None or not book_ids:
+            return None
+        args = []
+        for book_id in book_ids:
+            args += ["GET", "u2", f"#{book_id}"]
+        values = safe_redis_call(redis_client.execute_command, "BITFIELD", self.KEY, *args)
+        return None if values is None else dict(zip(book_ids, values))
+
+    def write(self, redis_client: Optional[Redis], availability: Dict[int, bool]) -> None:
+        """Caches committed values, replacing whatever is cached."""
+        if redis_client is None:
+            return
+        args = []
+        for book_id, is_available in availability.items():
+            if self._cacheable(book_id):
+                args += ["SET", "u2", f"#{book_id}", self.AVAILABLE if is_available else self.LENT]
+        if args:
+            safe_redis_call(redis_client.execute_command, "BITFIELD", self.KEY, *args)
+
+    def fill(self, redis_client: Optional[Redis], availability: Dict[int, bool]) -> None:
+        """Caches values read from the database, only for ids that are still not cached."""
+        if redis_client is None:
+            return
+        args = []
+        for book_id, is_available in availability.items():
+            if self._cacheable(book_id):
+                args += [book_id, self.AVAILABLE if is_available else self.LENT]
+        if args:
+            safe_redis_call(redis_client.eval, self.FILL_SCRIPT, 1, self.KEY, *args)
+
+    def replace(self, redis_client: Optional[Redis], expected: Dict[int, int], availability: Dict[int, bool]) -> None:
+        """
+        Caches values read from the database, only for ids whose raw cached value is still the one
+        in `expected`, so a checkout or return that wrote its value meanwhile is not overwritten.
+        """
+        if redis_client is None:
+            return
+        args = []
+        for book_id, is_available in availability.items():
+            if self._cacheable(book_id) and book_id in expected:
+                args += [book_id, expected[book_id], self.AVAILABLE if is_available else self.LENT]
+        if args:
+            safe_redis_call(redis_client.eval, self.REPLACE_SCRIPT, 1, self.KEY, *args)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+book_availability_service = BookAvailabilityService()
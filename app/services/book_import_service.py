@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.domain.dtos.book import BookImportError, BookImportResult, BookImportRow
+from app.repositories.book_repository import book_repository, author_repository
+from app.services.book_service import BookService
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "jsonl"
+        if extension == "csv":
+            return "csv"
+    return None
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Lazily yields (line number, raw row) from a CSV (with header) or JSONL text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value != ""}
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, e
+    else:
+        raise ValueError(f"Unsupported import format '{fmt}', expected one of {SUPPORTED_FORMATS}")
+
+class BookImportService:
+    """
+    Streams books into the catalogue in batches: one ISBN lookup, one author lookup/insert, one
+    multi-row INSERT (COPY on Postgres) and one INSERT of their first copies per batch, committed
+    per batch, so memory stays bounded by the batch size whatever the input size. The book list
+    cache is invalidated once at the end.
+    """
+    BATCH_SIZE = 1000
+    MAX_REPORTED_ERRORS = 100
+    AUTHOR_CACHE_SIZE = 10_000
+
+    def __init__(self, redis_client: Optional[Redis] = None, batch_size: Optional[int] = None):
+        self.redis_client = redis_client
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self._author_ids: "OrderedDict[str, int]" = OrderedDict()
+
+    def import_stream(self, db: Session, stream: IO[bytes], fmt: str, progress=None) -> BookImportResult:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        return self.import_rows(db, read_rows(text, fmt), progress=progress)
+
+    def import_rows(self, db: Session, rows: Iterable[Tuple[int, object]], progress=None) -> BookImportResult:
+        """`progress`, if given, is called with the running result after every batch."""
+        result = BookImportResult()
+        start = time.perf_counter()
+        rows = iter(rows)
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(db, batch, result)
+                db.commit()
+                self._update_rate(result, start)
+                if progress:
+                    progress(result)
+        finally:
+            if result.books_created:
+                BookService(redis_client=self.redis_client)._clear_books_cache()
+        self._update_rate(result, start)
+        return result
+
+    def _import_batch(self, db: Session, batch: List[Tuple[int, object]], result: BookImportResult) -> None:
+        books: Dict[Optional[str], Tuple[int, BookImportRow]] = {}
+        untracked: List[Tuple[int, BookImportRow]] = []
+        for line, raw in batch:
+            result.rows_read += 1
+            try:
+                if isinstance(raw, Exception):
+                    raise ValueError(str(raw))
+                row = BookImportRow.model_validate(raw)
+            except (ValidationError, ValueError) as e:
+                self._add_error(result, line, str(e))
+                continue
+            if row.isbn is None:
+                untracked.append((line, row))
+            elif row.isbn in books:
+                result.duplicates_skipped += 1
+            else:
+                books[row.isbn] = (line, row)
+
+        # Rows whose ISBN is already in the catalogue (including earlier batches) are skipped
+        if books:
+            for isbn in book_repository.get_existing_isbns(db, books.keys()):
+                del books[isbn]
+                result.duplicates_skipped += 1
+
+        candidates = list(books.values()) + untracked
+        author_ids, existing_author_ids = self._resolve_authors(db, [row for _, row in candidates], result)
+
+        now = datetime.utcnow()
+        to_insert = []
+        for line, row in candidates:
+            if row.author_id is None:
+                author_id = author_ids[row.author_name]
+            elif row.author_id in existing_author_ids:
+                author_id = row.author_id
+            else:
+                self._add_error(result, line, f"Author {row.author_id} not found")
+                continue
+            to_insert.append({
+                "title": row.title,
+                "isbn": row.isbn,
+                "is_available": True,
+                "copy_count": 1,
+                "available_count": 1,
+                "author_id": author_id,
+                "created_at": now,
+            })
+        book_repository.bulk_insert(db, to_insert)
+        result.books_created += len(to_insert)
+
+    def _resolve_authors(
+        self, db: Session, rows: List[BookImportRow], result: BookImportResult
+    ) -> Tuple[Dict[str, int], Set[int]]:
+        """
+        Returns the ids of the batch's author names (missing authors are created in one INSERT)
+        and which of the batch's explicit author ids exist.
+        """
+        author_ids = {row.author_id for row in rows if row.author_id is not None}
+        existing_ids = author_repository.get_existing_ids(db, author_ids) if author_ids else set()
+
+        names = {row.author_name for row in rows if row.author_id is None}
+        resolved = {name: self._author_ids[name] for name in names if name in self._author_ids}
+        missing = names - resolved.keys()
+        if missing:
+            found = author_repository.get_ids_by_names(db, missing)
+            created = author_repository.bulk_create(db, sorted(missing - found.keys()))
+            result.authors_created += len(created)
+            resolved.update(found)
+            resolved.update(created)
+
+        for name, author_id in resolved.items():
+            self._author_ids[name] = author_id
+            self._author_ids.move_to_end(name)
+        while len(self._author_ids) > self.AUTHOR_CACHE_SIZE:
+            self._author_ids.popitem(last=False)
+        return resolved, existing_ids
+
+    def _add_error(self, result: BookImportResult, line: int, detail: str) -> None:
+        result.errors_count += 1
+        if len(result.errors) < self.MAX_REPORTED_ERRORS:
+            result.errors.append(BookImportError(line=line, detail=detail))
+
+    @staticmethod
+    def _update_rate(result: BookImportResult, start: float) -> None:
+        result.elapsed_seconds = round(time.perf_counter() - start, 3)
+        if result.elapsed_seconds:
+            result.rows_per_second = round(result.rows_read / result.elapsed_seconds, 1)
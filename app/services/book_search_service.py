@@ -0,0 +1,206 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.domain.entities.book import Book
+from app.repositories.book_repository import book_repository, author_repository
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-stripped word tokens."""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return _TOKEN_RE.findall("".join(ch for ch in normalized if not unicodedata.combining(ch)))
+
+def _deletes(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if `a` and `b` differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+class BookSearchIndex:
+    """
+    In-memory inverted index over book titles and author names. Each query term matches index
+    tokens exactly, by prefix, or within one edit (typo tolerance, via a symmetric-delete
+    dictionary). Every term must match a book's title or author; title matches rank above author
+    matches, and exact above prefix above fuzzy. Not thread-safe on its own.
+    """
+    EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.4
+    TITLE_WEIGHT = 2.0
+    MIN_PREFIX_LENGTH = 2
+    MIN_FUZZY_LENGTH = 4
+    MAX_EXPANSIONS = 50
+
+    def __init__(self):
+        self.title_postings: Dict[str, Set[int]] = {}
+        self.author_postings: Dict[str, Set[int]] = {}
+        self.books_by_author: Dict[int, Set[int]] = {}
+        self.book_count = 0
+        self._variants: Dict[str, Set[str]] = {}
+        self._sorted_vocabulary: Optional[List[str]] = []
+
+    def add_author(self, author_id: int, name: str) -> None:
+        for token in set(tokenize(name)):
+            self._add_token(token)
+            self.author_postings.setdefault(token, set()).add(author_id)
+
+    def add_book(self, book_id: int, title: str, author_id: int) -> None:
+        books = self.books_by_author.setdefault(author_id, set())
+        if book_id not in books:
+            self.book_count += 1
+            books.add(book_id)
+        for token in set(tokenize(title)):
+            self._add_token(token)
+            self.title_postings.setdefault(token, set()).add(book_id)
+
+    def _add_token(self, token: str) -> None:
+        if token in self._variants.get(token, ()):
+            return
+        self._sorted_vocabulary = None
+        for variant in _deletes(token) | {token}:
+            self._variants.setdefault(variant, set()).add(token)
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """Index tokens matching `term`, with their match quality."""
+        matches: Dict[str, float] = {}
+        if len(term) >= self.MIN_FUZZY_LENGTH:
+            for variant in _deletes(term) | {term}:
+                for token in self._variants.get(variant, ()):
+                    if _within_one_edit(term, token):
+                        matches[token] = self.FUZZY
+        if len(term) >= self.MIN_PREFIX_LENGTH:
+            if self._sorted_vocabulary is None:
+                self._sorted_vocabulary = sorted(token for token, tokens in self._variants.items() if token in tokens)
+            vocabulary = self._sorted_vocabulary
+            start = bisect_left(vocabulary, term)
+            for token in vocabulary[start:start + self.MAX_EXPANSIONS]:
+                if not token.startswith(term):
+                    break
+                matches[token] = self.PREFIX
+        if term in self._variants.get(term, ()):
+            matches[term] = self.EXACT
+        return matches
+
+    def _term_matches(self, term: str) -> Dict[float, Set[int]]:
+        """Books matching one query term, grouped by score (a book can appear under several)."""
+        matched: Dict[float, Set[int]] = {}
+        for token, quality in self._expand(term).items():
+            for author_id in self.author_postings.get(token, ()):
+                matched.setdefault(quality, set()).update(self.books_by_author.get(author_id, ()))
+            matched.setdefault(quality * self.TITLE_WEIGHT, set()).update(self.title_postings.get(token, ()))
+        return matched
+
+    @staticmethod
+    def _best_scores(matched: Dict[float, Set[int]]) -> Dict[int, float]:
+        # Weakest matches first so better ones overwrite them; set and dict operations stay in C
+        scores: Dict[int, float] = {}
+        for score in sorted(matched):
+            scores.update(dict.fromkeys(matched[score], score))
+        return scores
+
+    def search(self, text: str, limit: int) -> List[int]:
+        """Ids of the `limit` best matching books, best first (ties by id)."""
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms or limit <= 0:
+            return []
+        if len(terms) == 1:
+            # Walk the score groups best first, so a common word never scores every book it matches
+            ranked: List[int] = []
+            seen: Set[int] = set()
+            for score, book_ids in sorted(self._term_matches(terms[0]).items(), reverse=True):
+                ranked.extend(heapq.nsmallest(limit - len(ranked), book_ids - seen))
+                if len(ranked) >= limit:
+                    break
+                seen |= book_ids
+            return ranked
+
+        per_term = [self._best_scores(self._term_matches(term)) for term in terms]
+        candidates = set(per_term[0]).intersection(*per_term[1:])
+        totals = {book_id: sum(scores[book_id] for scores in per_term) for book_id in candidates}
+        # nlargest is stable, so feeding ids in ascending order breaks score ties by id
+        return heapq.nlargest(limit, sorted(totals), key=totals.__getitem__)
+
+class BookSearchService:
+    """
+    Book search over titles and author names. On Postgres it runs in SQL (`tsvector` prefix
+    matching plus `pg_trgm` word similarity, both GIN-indexed). Elsewhere it uses a per-process
+    `BookSearchIndex` that is built lazily, updated as books and authors are created here, and
+    caught up with rows inserted by other processes (or bulk imports) every REFRESH_SECONDS.
+    """
+    REFRESH_SECONDS = 5.0
+    SYNC_CHUNK_SIZE = 50_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drops the in-memory index; the next search rebuilds it from the database."""
+        with self._lock:
+            self.index = BookSearchIndex()
+            self._synced_author_id = 0
+            self._synced_book_id = 0
+            self._next_sync = 0.0
+
+    def search(self, db: Session, text: str, skip: int = 0, limit: int = 10) -> List[Book]:
+        if db.get_bind().dialect.name == "postgresql":
+            return book_repository.search(db, text=text, terms=tokenize(text), skip=skip, limit=limit)
+        self._sync(db)
+        with self._lock:
+            ids = self.index.search(text, limit=skip + limit)[skip:]
+        return book_repository.get_by_ids(db, ids)
+
+    def index_author(self, author_id: int, name: str) -> None:
+        with self._lock:
+            self.index.add_author(author_id, name)
+
+    def index_book(self, book_id: int, title: str, author_id: int) -> None:
+        with self._lock:
+            self.index.add_book(book_id, title, author_id)
+
+    def _sync(self, db: Session) -> None:
+        if time.monotonic() < self._next_sync:
+            return
+        while True:
+            rows = author_repository.get_names_after(db, after=self._synced_author_id, limit=self.SYNC_CHUNK_SIZE)
+            with self._lock:
+                for author_id, name in rows:
+                    self.index.add_author(author_id, name)
+            if rows:
+                self._synced_author_id = rows[-1][0]
+            if len(rows) < self.SYNC_CHUNK_SIZE:
+                break
+        while True:
+            rows = book_repository.get_titles_after(db, after=self._synced_book_id, limit=self.SYNC_CHUNK_SIZE)
+            with self._lock:
+                for book_id, title, author_id in rows:
+                    self.index.add_book(book_id, title, author_id)
+            if rows:
+                self._synced_book_id = rows[-1][0]
+            if len(rows) < self.SYNC_CHUNK_SIZE:
+                break
+        self._next_sync = time.monotonic() + self.REFRESH_SECONDS
+
+    def stats(self) -> dict:
+        return {
+            "books": self.index.book_count,
+            "tokens": len(self.index.title_postings) + len(self.index.author_postings),
+        }
+
+book_search_service = BookSearchService()
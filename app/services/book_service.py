@@ -1,30 +1,49 @@
 import json
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from redis import Redis
+from starlette.concurrency import run_in_threadpool
 
-from app.domain.entities.book import Book, Author
-from app.domain.dtos.book import BookCreate, AuthorCreate
-from app.repositories.book_repository import book_repository, author_repository
+from app.domain.entities.book import Book, BookCopy, Author
+from app.domain.dtos.book import BookCreate, AuthorCreate, BookResponse, AuthorResponse
+from app.repositories.book_repository import book_repository, author_repository, async_book_repository, async_author_repository
+from app.core.cache import safe_redis_call
+from app.core.entity_cache import book_cache, author_cache, books_list_cache
+from app.services.book_search_service import book_search_service
+from app.services.book_availability_service import book_availability_service
 
 class BookService:
     CACHE_KEY_PREFIX = "books_list"
+    # Generation counter namespacing every cached page: bumping it orphans all pages at once
+    CACHE_GENERATION_KEY = f"{CACHE_KEY_PREFIX}:gen"
+    CACHE_TTL_SECONDS = 3600
 
     def __init__(self, redis_client: Optional[Redis] = None):
         self.redis_client = redis_client
 
+    def _cache_generation(self) -> Optional[int]:
+        """Current page namespace, or None if Redis could not be reached."""
+        generation = safe_redis_call(self.redis_client.get, self.CACHE_GENERATION_KEY, default=False)
+        if generation is False:
+            return None
+        return int(generation) if generation else 0
+
     def _clear_books_cache(self):
+        # A single O(1) INCR instead of KEYS + DEL: pages of older generations are never
+        # read again and expire on their own TTL.
         if self.redis_client:
-            keys = self.redis_client.keys(f"{self.CACHE_KEY_PREFIX}:*")
-            if keys:
-                self.redis_client.delete(*keys)
+            safe_redis_call(self.redis_client.incr, self.CACHE_GENERATION_KEY)
 
     def create_author(self, db: Session, author: AuthorCreate) -> Author:
-        return author_repository.create(db=db, obj_in_data={"name": author.name})
+        new_author = author_repository.create(db=db, obj_in_data={"name": author.name})
+        book_search_service.index_author(new_author.id, new_author.name)
+        return new_author
 
-    def get_authors(self, db: Session, skip: int = 0, limit: int = 100) -> List[Author]:
-        return author_repository.get_multi(db, skip=skip, limit=limit)
+    def get_authors(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Author]:
+        return author_repository.get_multi(db, skip=skip, limit=limit, after=after)
 
     def create_book(self, db: Session, book: BookCreate) -> Book:
         db_author = author_repository.get(db=db, id=book.author_id)
@@ -35,51 +54,179 @@ class BookService:
         if db_book:
             raise HTTPException(status_code=400, detail="ISBN already registered")
             
-        new_book = book_repository.create(db=db, obj_in_data=book.model_dump())
+        data = book.model_dump(exclude={"copies"})
+        new_book = book_repository.create(db=db, obj_in_data={
+            **data,
+            "is_available": True,
+            "copy_count": book.copies,
+            "available_count": book.copies,
+            "copies": [BookCopy(is_available=True) for _ in range(book.copies)],
+        })
         self._clear_books_cache()
+        book_search_service.index_book(new_book.id, new_book.title, new_book.author_id)
+        book_availability_service.set(new_book.id, new_book.is_available)
         return new_book
 
-    def get_books(self, db: Session, skip: int = 0, limit: int = 100) -> List[Book]:
-        cache_key = f"{self.CACHE_KEY_PREFIX}:{skip}:{limit}"
+    def add_copies(self, db: Session, book_id: int, count: int) -> Book:
+        """Adds `count` copies to the shelf and to the book's counters, in one transaction."""
+        if not book_repository.exists(db, book_id=book_id):
+            raise HTTPException(status_code=404, detail="Book not found")
+        book_repository.add_copies(db, book_id=book_id, count=count)
+        db.commit()
+        book_availability_service.set(book_id, True)
+        book_cache.invalidate(self.redis_client, [book_id])
+        return book_repository.get(db, id=book_id)
 
-        if self.redis_client:
-            cached = self.redis_client.get(cache_key)
-            if cached:
-                books_data = json.loads(cached)
-                books = []
-                for data in books_data:
-                    author_data = data.pop("author", None)
-                    book = Book(**data)
-                    if author_data:
-                        from app.domain.entities.book import Author
-                        book.author = Author(**author_data)
-                    books.append(book)
-                return books
-
-        books = book_repository.get_multi(db, skip=skip, limit=limit)
+    def get_books(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Book]:
+        # Redis errors disable the cache for the rest of the call (generation is None)
+        generation = self._cache_generation() if self.redis_client else None
+        if generation is None:
+            return book_repository.get_multi(db, skip=skip, limit=limit, after=after)
+        return self._get_books_by_ids(db, self._page_ids(db, generation, skip=skip, limit=limit, after=after))
 
-        if self.redis_client:
-            books_dict = [
-                {
-                    "id": b.id,
-                    "title": b.title,
-                    "isbn": b.isbn,
-                    "is_available": b.is_available,
-                    "author_id": b.author_id,
-                    "created_at": b.created_at.isoformat() if b.created_at else None,
-                    "author": {
-                        "id": b.author.id,
-                        "name": b.author.name,
-                        "created_at": b.author.created_at.isoformat() if b.author.created_at else None,
-                    } if b.author else None,
-                }
-                for b in books
-            ]
-            self.redis_client.setex(cache_key, 3600, json.dumps(books_dict))
-
-        return books
-
-    def get_book(self, db: Session, book_id: int) -> Optional[Book]:
-        return book_repository.get(db, id=book_id)
+    def get_books_json(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> Tuple[List[int], bytes]:
+        """
+        The page as a serialized `List[BookResponse]` body, with its book ids. On a cache hit it is
+        spliced from the cached books' JSON without parsing it or building ORM or Pydantic objects.
+        """
+        generation = self._cache_generation() if self.redis_client else None
+        if generation is None:
+            books = book_repository.get_multi(db, skip=skip, limit=limit, after=after)
+            entries = {book.id: book_cache.dump(BookResponse.model_validate(book)) for book in books}
+            book_ids = list(entries)
+        else:
+            book_ids = self._page_ids(db, generation, skip=skip, limit=limit, after=after)
+            entries = self._get_books_json_by_ids(db, book_ids)
+            book_ids = [book_id for book_id in book_ids if book_id in entries]
+        return book_ids, b"[" + b",".join(entries[book_id] for book_id in book_ids) + b"]"
+
+    def _page_ids(self, db: Session, generation: int, skip: int, limit: int, after: Optional[int]) -> List[int]:
+        """
+        Cached pages only hold book ids; the books themselves come from the per-book cache, so a
+        new book costs each page an id-only query on its next read, not a reload of every book.
+        """
+        cache_key = self._page_cache_key(generation, skip=skip, limit=limit, after=after)
+        cached = safe_redis_call(self.redis_client.get, cache_key)
+        if cached:
+            books_list_cache.record(hits=1)
+            return json.loads(cached)
+        books_list_cache.record(misses=1)
+        book_ids = book_repository.get_ids(db, skip=skip, limit=limit, after=after)
+        safe_redis_call(self.redis_client.setex, cache_key, self.CACHE_TTL_SECONDS, json.dumps(book_ids))
+        return book_ids
+
+    def _page_cache_key(self, generation: int, skip: int, limit: int, after: Optional[int]) -> str:
+        if after is not None:
+            return f"{self.CACHE_KEY_PREFIX}:{generation}:after:{after}:{limit}"
+        return f"{self.CACHE_KEY_PREFIX}:{generation}:{skip}:{limit}"
+
+    def _get_books_json_by_ids(self, db: Session, book_ids: List[int]) -> Dict[int, bytes]:
+        """Each book's serialized BookResponse by id, from the per-book cache or else the database."""
+        entries = book_cache.get_json_many(self.redis_client, book_ids)
+        missing = [book_id for book_id in book_ids if book_id not in entries]
+        if missing:
+            loaded = {
+                book.id: book_cache.dump(BookResponse.model_validate(book))
+                for book in book_repository.get_by_ids(db, missing)
+            }
+            book_cache.set_json_many(self.redis_client, loaded)
+            entries.update(loaded)
+        return entries
+
+    def _get_books_by_ids(self, db: Session, book_ids: List[int]) -> List[BookResponse]:
+        entries = self._get_books_json_by_ids(db, book_ids)
+        return [BookResponse.model_validate_json(entries[book_id]) for book_id in book_ids if book_id in entries]
+
+    def export_query(self) -> Select:
+        return book_repository.export_query()
+
+    def search_books(self, db: Session, q: str, skip: int = 0, limit: int = 10) -> List[Book]:
+        return book_search_service.search(db, text=q, skip=skip, limit=limit)
+
+    def get_book(self, db: Session, book_id: int) -> Optional[BookResponse]:
+        books = self._get_books_by_ids(db, [book_id])
+        return books[0] if books else None
+
+    def get_book_json(self, db: Session, book_id: int) -> Optional[bytes]:
+        """The book's serialized BookResponse, or None if it does not exist."""
+        return self._get_books_json_by_ids(db, [book_id]).get(book_id)
+
+    def get_author(self, db: Session, author_id: int) -> Optional[AuthorResponse]:
+        cached = author_cache.get_many(self.redis_client, [author_id])
+        if author_id in cached:
+            return cached[author_id]
+        author = author_repository.get(db, id=author_id)
+        if author is None:
+            return None
+        author = AuthorResponse.model_validate(author)
+        author_cache.set_many(self.redis_client, [author])
+        return author
+
+class AsyncBookService(BookService):
+    """
+    The read endpoints of `BookService` over an AsyncSession (DB_ASYNC_MODE), with the same Redis
+    caches: queries are awaited natively and the blocking Redis calls run on the threadpool. The
+    writes are inherited unchanged and run through `run_db` on the session's sync side.
+    """
+
+    async def _cache_call(self, fn: Callable[..., Any], *args) -> Any:
+        """Runs a blocking cache call on the threadpool, or inline when there is no Redis to wait on."""
+        if self.redis_client is None:
+            return fn(*args)
+        return await run_in_threadpool(fn, *args)
+
+    async def get_authors(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Author]:
+        return await async_author_repository.get_multi(db, skip=skip, limit=limit, after=after)
+
+    async def get_author(self, db: AsyncSession, author_id: int) -> Optional[AuthorResponse]:
+        cached = await self._cache_call(author_cache.get_many, self.redis_client, [author_id])
+        if author_id in cached:
+            return cached[author_id]
+        author = await async_author_repository.get(db, id=author_id)
+        if author is None:
+            return None
+        author = AuthorResponse.model_validate(author)
+        await self._cache_call(author_cache.set_many, self.redis_client, [author])
+        return author
+
+    async def get_books_json(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> Tuple[List[int], bytes]:
+        generation = await self._cache_call(self._cache_generation) if self.redis_client else None
+        if generation is None:
+            books = await async_book_repository.get_multi(db, skip=skip, limit=limit, after=after)
+            entries = {book.id: book_cache.dump(BookResponse.model_validate(book)) for book in books}
+            book_ids = list(entries)
+        else:
+            book_ids = await self._fetch_page_ids(db, generation, skip=skip, limit=limit, after=after)
+            entries = await self._fetch_books_json_by_ids(db, book_ids)
+            book_ids = [book_id for book_id in book_ids if book_id in entries]
+        return book_ids, b"[" + b",".join(entries[book_id] for book_id in book_ids) + b"]"
+
+    async def get_book_json(self, db: AsyncSession, book_id: int) -> Optional[bytes]:
+        return (await self._fetch_books_json_by_ids(db, [book_id])).get(book_id)
+
+    async def _fetch_page_ids(self, db: AsyncSession, generation: int, skip: int, limit: int, after: Optional[int]) -> List[int]:
+        """`_page_ids` over an AsyncSession."""
+        cache_key = self._page_cache_key(generation, skip=skip, limit=limit, after=after)
+        cached = await self._cache_call(safe_redis_call, self.redis_client.get, cache_key)
+        if cached:
+            books_list_cache.record(hits=1)
+            return json.loads(cached)
+        books_list_cache.record(misses=1)
+        book_ids = await async_book_repository.get_ids(db, skip=skip, limit=limit, after=after)
+        await self._cache_call(safe_redis_call, self.redis_client.setex, cache_key, self.CACHE_TTL_SECONDS, json.dumps(book_ids))
+        return book_ids
+
+    async def _fetch_books_json_by_ids(self, db: AsyncSession, book_ids: List[int]) -> Dict[int, bytes]:
+        """`_get_books_json_by_ids` over an AsyncSession."""
+        entries = await self._cache_call(book_cache.get_json_many, self.redis_client, book_ids)
+        missing = [book_id for book_id in book_ids if book_id not in entries]
+        if missing:
+            loaded = {
+                book.id: book_cache.dump(BookResponse.model_validate(book))
+                for book in await async_book_repository.get_by_ids(db, missing)
+            }
+            await self._cache_call(book_cache.set_json_many, self.redis_client, loaded)
+            entries.update(loaded)
+        return entries
 
 book_service = BookService()
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.entity_cache import book_cache
+from app.core.logger import logger
+from app.repositories.book_repository import book_repository
+from app.repositories.user_repository import user_repository
+from app.services.book_availability_service import book_availability_service
+from app.services.periodic_job import PeriodicJob
+
+class CounterReconciler(PeriodicJob):
+    """
+    Verifies the materialized counters against the loans table, which is the ground truth:
+    `users.active_loan_count` (the user's open loans), the copies' `is_available` (no open loan on
+    the copy), the books' `copy_count`, `available_count` and `is_available` (their copies) and the
+    Redis availability cache. Both tables are scanned in id order, CHUNK_SIZE rows per query; with
+    `fix`, drifted rows are rewritten (counters under row locks) and committed chunk by chunk, and
+    stale cache entries are replaced only where no checkout or return rewrote them meanwhile.
+    In the background it runs every `interval_seconds`, the first time one interval after startup.
+    """
+    NAME = "Counter reconciliation"
+    CHUNK_SIZE = 5_000
+
+    def __init__(self, interval_seconds: float = settings.COUNTER_RECONCILE_INTERVAL_SECONDS):
+        super().__init__(interval_seconds)
+        self.last_run: Optional[datetime] = None
+        self.last_report: Optional[dict] = None
+
+    def reconcile(self, db: Session, fix: bool = True) -> dict:
+        report = {
+            "users_checked": 0,
+            "user_counts_drifted": 0,
+            "books_checked": 0,
+            "books_availability_drifted": 0,
+            "cache_entries_drifted": 0,
+            "fixed": fix,
+        }
+
+        after = 0
+        while True:
+            rows = user_repository.get_loan_counts_after(db, after=after, limit=self.CHUNK_SIZE)
+            if not rows:
+                break
+            drifted = [user_id for user_id, counted, open_loans in rows if counted != open_loans]
+            if drifted and fix:
+                user_repository.recount_active_loans(db, user_ids=drifted)
+            db.commit()
+            report["users_checked"] += len(rows)
+            report["user_counts_drifted"] += len(drifted)
+            after = rows[-1][0]
+
+        after = 0
+        while True:
+            rows = book_repository.get_availability_after(db, after=after, limit=self.CHUNK_SIZE)
+            if not rows:
+                break
+            truth = {book_id: free > 0 for book_id, _, _, _, _, free, _ in rows}
+            drifted = [
+                book_id for book_id, copy_count, available_count, is_available, copies, free, wrong_flags in rows
+                if (copy_count, available_count, is_available, wrong_flags) != (copies, free, free > 0, 0)
+            ]
+            if drifted and fix:
+                book_repository.recompute_availability(db, ids=drifted)
+            db.commit()
+
+            redis_client = get_redis()
+            if drifted and fix:
+                book_cache.invalidate(redis_client, drifted)
+            cached = book_availability_service.read(redis_client, list(truth)) or {}
+            stale = [
+                book_id for book_id, value in cached.items()
+                if value != book_availability_service.NOT_CACHED
+                and (value == book_availability_service.AVAILABLE) != truth[book_id]
+            ]
+            if stale and fix:
+                # The scan above is not locked: re-read the committed values after the cache, and
+                # only replace entries a checkout or return has not rewritten since they were read
+                fresh = book_repository.get_availability(db, stale)
+                db.commit()
+                book_availability_service.replace(
+                    redis_client, {book_id: cached[book_id] for book_id in stale}, fresh
+                )
+
+            report["books_checked"] += len(rows)
+            report["books_availability_drifted"] += len(drifted)
+            report["cache_entries_drifted"] += len(stale)
+            after = rows[-1][0]
+
+        self.last_run = datetime.utcnow()
+        self.last_report = report
+        return report
+
+    def run(self, db: Session) -> dict:
+        return self.reconcile(db)
+
+    def on_result(self, report: dict) -> None:
+        drifted = report["user_counts_drifted"] + report["books_availability_drifted"] + report["cache_entries_drifted"]
+        if drifted:
+            logger.warning(f"Counter reconciliation fixed drift: {report}")
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_report": self.last_report,
+        }
+
+counter_reconciler = CounterReconciler()
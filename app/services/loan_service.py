@@ -1,13 +1,20 @@
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Literal, Optional
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 from app.domain.entities.loan import Loan, LoanStatus
-from app.domain.dtos.loan import LoanCreate
-from app.repositories.loan_repository import loan_repository
+from app.domain.dtos.loan import LoanCreate, LoanBatchCreate, LoanBatchReturn
+from app.repositories.loan_repository import loan_repository, async_loan_repository
 from app.repositories.book_repository import book_repository
 from app.repositories.user_repository import user_repository
+from app.repositories.loan_stats_repository import loan_stats_repository
+from app.services.book_availability_service import book_availability_service
+from app.core.cache import get_redis
+from app.core.entity_cache import book_cache
 
 class LoanService:
     MAX_ACTIVE_LOANS = 3
@@ -16,70 +23,188 @@ class LoanService:
     def get_loans(self, db: Session, skip: int = 0, limit: int = 100) -> List[Loan]:
         return loan_repository.get_multi(db, skip=skip, limit=limit)
 
-    def get_active_or_delayed_loans(self, db: Session, skip: int = 0, limit: int = 100) -> List[Loan]:
-        # Mark overdue loans before returning the list
-        loan_repository.mark_overdue_loans(db)
-        return loan_repository.get_all_active_or_delayed(db, skip=skip, limit=limit)
+    def get_active_or_delayed_loans(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        # Read-only: OVERDUE is persisted by the background sweeper and derived from due_date in the response
+        return loan_repository.get_all_active_or_delayed(db, skip=skip, limit=limit, after=after)
 
-    def get_user_loans(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Loan]:
-        return loan_repository.get_by_user(db, user_id=user_id, skip=skip, limit=limit)
+    def get_user_loans(self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        return loan_repository.get_by_user(db, user_id=user_id, skip=skip, limit=limit, after=after)
 
     def create_loan(self, db: Session, loan: LoanCreate) -> Loan:
-        # Check User
-        user = user_repository.get(db, id=loan.user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Check Active Loans Limit
-        active_loans = loan_repository.get_active_by_user(db, user_id=loan.user_id)
-        if len(active_loans) >= self.MAX_ACTIVE_LOANS:
+        """
+        Checkout in a single transaction: take one of the user's loan slots with a conditional
+        UPDATE on their `active_loan_count` (which also serializes that user's checkouts), claim
+        any free copy of the book (concurrent checkouts skip the copies others are claiming),
+        insert the loan, then take the copy off the book's `available_count` and count the loan
+        in the daily loan stats, and commit once. The book's rows come last so they stay locked
+        only for the end of the transaction.
+        """
+        # Check User & Active Loans Limit
+        if not user_repository.claim_loan_slot(db, user_id=loan.user_id, max_loans=self.MAX_ACTIVE_LOANS):
+            user_exists = user_repository.exists(db, user_id=loan.user_id)
+            db.rollback()
+            if not user_exists:
+                raise HTTPException(status_code=404, detail="User not found")
             raise HTTPException(status_code=400, detail=f"User has reached the maximum limit of {self.MAX_ACTIVE_LOANS} active loans")
 
-        # Check Book
-        book = book_repository.get(db, id=loan.book_id)
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        if not book.is_available:
+        # Claim a Copy
+        copy_id = book_repository.claim_copies(db, book_ids=[loan.book_id]).get(loan.book_id)
+        if copy_id is None:
+            book_exists = book_repository.exists(db, book_id=loan.book_id)
+            db.rollback()
+            if not book_exists:
+                raise HTTPException(status_code=404, detail="Book not found")
             raise HTTPException(status_code=400, detail="Book is not available for loan")
 
-        # Create Loan & Update Book Status
-        due_date = datetime.utcnow() + timedelta(days=14)
+        # Create Loan
+        now = datetime.utcnow()
         db_loan = loan_repository.create(db=db, obj_in_data={
             "user_id": loan.user_id, 
             "book_id": loan.book_id,
-            "due_date": due_date
-        })
-        book_repository.update(db, db_obj=book, obj_in_data={"is_available": False})
-        
+            "copy_id": copy_id,
+            "loan_date": now,
+            "due_date": now + timedelta(days=14)
+        }, commit=False)
+        available = book_repository.add_available(db, {loan.book_id: -1})
+        loan_stats_repository.record_checkouts(db, day=now.date(), book_ids=[loan.book_id])
+        db.commit()
+        db.refresh(db_loan)
+        if not available[loan.book_id]:
+            book_availability_service.set(loan.book_id, False)
+        book_cache.invalidate(get_redis(), [loan.book_id])
+
         return db_loan
 
     def return_loan(self, db: Session, loan_id: int) -> Loan:
-        loan = loan_repository.get(db, id=loan_id)
+        loan = loan_repository.get_for_update(db, id=loan_id)
         if not loan:
+            db.rollback()
             raise HTTPException(status_code=404, detail="Loan not found")
             
         if loan.status == LoanStatus.RETURNED:
+            db.rollback()
             raise HTTPException(status_code=400, detail="Loan is already returned")
 
-        # Calculate late fee
-        days_late = (datetime.utcnow() - loan.due_date).days
-        fine_amount = 0.0
-        
-        if days_late > 0:
-            fine_amount = days_late * self.LATE_FEE_PER_DAY
-            
-        # Update Loan Status & Apply Fine
-        updated_loan = loan_repository.update(db, db_obj=loan, obj_in_data={
-            "return_date": datetime.utcnow(),
-            "status": LoanStatus.RETURNED,
-            "late_fee": max(0.0, fine_amount)
-        })
+        # Update Loan Status & Apply Fine (computed in SQL), free the user's slot and the copy
+        # (one transaction, locking the user, the copy and the book in checkout's order)
+        now = datetime.utcnow()
+        loan_repository.mark_returned(db, [loan.id], returned_at=now, fee_per_day=self.LATE_FEE_PER_DAY)
+        user_repository.release_loan_slot(db, user_id=loan.user_id)
+        # A loan from before book copies holds no copy: nothing is released and the cache is left alone
+        available = {}
+        if loan.copy_id is not None:
+            book_repository.release_copies(db, copy_ids=[loan.copy_id])
+            available = book_repository.add_available(db, {loan.book_id: 1})
+        loan_stats_repository.record_returns(
+            db, day=now.date(), returns={loan.book_id: 1}, late_returns={loan.book_id: 1} if now > loan.due_date else {}
+        )
+        db.commit()
+        db.refresh(loan)
+        redis_client = get_redis()
+        book_availability_service.write(redis_client, {book_id: count > 0 for book_id, count in available.items()})
+        book_cache.invalidate(redis_client, [loan.book_id])
+
+        return loan
+
+    def create_loans(self, db: Session, batch: LoanBatchCreate) -> List[Loan]:
+        """
+        Checks out a basket of books for one user in a single transaction, all or none: one
+        conditional UPDATE takes all the loan slots (checking the basket against MAX_ACTIVE_LOANS),
+        one claims a free copy of every book, one inserts the loans, one takes the copies off the
+        books' `available_count`, one counts the loans in the daily loan stats, then a single commit.
+        """
+        book_ids = batch.book_ids
+        if not user_repository.claim_loan_slot(db, user_id=batch.user_id, max_loans=self.MAX_ACTIVE_LOANS, count=len(book_ids)):
+            active = user_repository.get_active_loan_count(db, user_id=batch.user_id)
+            db.rollback()
+            if active is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            raise HTTPException(
+                status_code=400,
+                detail=f"User has {active} active loans: {len(book_ids)} more would exceed the maximum limit of {self.MAX_ACTIVE_LOANS} active loans",
+            )
+
+        claimed = book_repository.claim_copies(db, book_ids=book_ids)
+        if len(claimed) != len(book_ids):
+            existing = book_repository.get_availability(db, [book_id for book_id in book_ids if book_id not in claimed])
+            db.rollback()
+            missing = [book_id for book_id in book_ids if book_id not in claimed and book_id not in existing]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Books not found: {missing}")
+            raise HTTPException(status_code=400, detail=f"Books not available for loan: {sorted(existing)}")
+
+        now = datetime.utcnow()
+        loan_ids = loan_repository.create_many(db, [
+            {"user_id": batch.user_id, "book_id": book_id, "copy_id": claimed[book_id], "loan_date": now,
+             "due_date": now + timedelta(days=14), "status": LoanStatus.ACTIVE, "late_fee": 0.0}
+            for book_id in book_ids
+        ])
+        available = book_repository.add_available(db, {book_id: -1 for book_id in book_ids})
+        loan_stats_repository.record_checkouts(db, day=now.date(), book_ids=book_ids)
+        db.commit()
+        redis_client = get_redis()
+        book_availability_service.write(redis_client, {book_id: False for book_id, count in available.items() if not count})
+        book_cache.invalidate(redis_client, book_ids)
+
+        position = {book_id: i for i, book_id in enumerate(book_ids)}
+        return sorted(loan_repository.get_by_ids(db, loan_ids), key=lambda loan: position[loan.book_id])
+
+    def return_loans(self, db: Session, batch: LoanBatchReturn) -> List[Loan]:
+        """
+        Returns several loans (of any users) in a single transaction, all or none: the loans are
+        locked in one query, marked RETURNED with their late fees (computed in SQL) in one UPDATE,
+        the users' slots, the copies and the books' `available_count` are released with one UPDATE
+        each, and the daily loan stats count the returns with one upsert.
+        """
+        loans = loan_repository.get_many_for_update(db, ids=batch.loan_ids)
+        if len(loans) != len(batch.loan_ids):
+            db.rollback()
+            found = {loan.id for loan in loans}
+            raise HTTPException(status_code=404, detail=f"Loans not found: {[loan_id for loan_id in batch.loan_ids if loan_id not in found]}")
+        returned = [loan.id for loan in loans if loan.status == LoanStatus.RETURNED]
+        if returned:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Loans already returned: {returned}")
+
+        now = datetime.utcnow()
+        book_ids = [loan.book_id for loan in loans]
+        # Several loans may hold copies of the same book, and several may belong to one user
+        released = Counter(loan.book_id for loan in loans if loan.copy_id is not None)
+        slots = Counter(loan.user_id for loan in loans)
+        loan_repository.mark_returned(db, batch.loan_ids, returned_at=now, fee_per_day=self.LATE_FEE_PER_DAY)
+        # Users, copies, then books: the lock order of checkout and single returns
+        if slots:
+            user_repository.release_loan_slots(db, slots)
+        available = {}
+        if released:
+            book_repository.release_copies(db, copy_ids=[loan.copy_id for loan in loans if loan.copy_id is not None])
+            available = book_repository.add_available(db, released)
+        loan_stats_repository.record_returns(
+            db, day=now.date(), returns=Counter(book_ids),
+            late_returns=Counter(loan.book_id for loan in loans if now > loan.due_date),
+        )
+        db.commit()
+        redis_client = get_redis()
+        book_availability_service.write(redis_client, {book_id: count > 0 for book_id, count in available.items()})
+        book_cache.invalidate(redis_client, book_ids)
+
+        return loan_repository.get_by_ids(db, batch.loan_ids)
+
+    def accrued_fines_query(self, db: Session, group_by: Literal["user", "author"] = "user") -> Select:
+        """Fines owed so far on loans not returned yet, per user or author (see `loan_repository.accrued_fines_query`)."""
+        return loan_repository.accrued_fines_query(db, now=datetime.utcnow(), fee_per_day=self.LATE_FEE_PER_DAY, group_by=group_by)
+
+    def export_query(self, statuses: Optional[List[LoanStatus]] = None, user_id: Optional[int] = None) -> Select:
+        return loan_repository.export_query(statuses=statuses, user_id=user_id)
+
+class AsyncLoanService:
+    """The loan list reads over an AsyncSession (DB_ASYNC_MODE); checkouts and returns go through `LoanService`."""
 
-        # Make Book Available Again
-        book = book_repository.get(db, id=loan.book_id)
-        if book:
-            book_repository.update(db, db_obj=book, obj_in_data={"is_available": True})
+    async def get_active_or_delayed_loans(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        return await async_loan_repository.get_all_active_or_delayed(db, skip=skip, limit=limit, after=after)
 
-        return updated_loan
+    async def get_user_loans(self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[Loan]:
+        return await async_loan_repository.get_by_user(db, user_id=user_id, skip=skip, limit=limit, after=after)
 
 loan_service = LoanService()
+async_loan_service = AsyncLoanService()
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.repositories.loan_repository import loan_repository
+from app.services.periodic_job import PeriodicJob
+
+class OverdueLoanSweeper(PeriodicJob):
+    """
+    Periodically persists OVERDUE for ACTIVE loans past their due date, off the request path. The
+    users' loan counters are left alone, since an OVERDUE loan counts toward the loan limit until
+    it is returned, whether or not a sweep has run. Each sweep only scans loans that fell due since
+    the previous successful sweep (the watermark), an index range over (status, due_date); the
+    first sweep after startup covers everything. A failed sweep does not advance the watermark, so
+    the next one covers its window again.
+    """
+    NAME = "Overdue sweep"
+    RUN_AT_STARTUP = True
+
+    def __init__(self, interval_seconds: float = settings.OVERDUE_SWEEP_INTERVAL_SECONDS):
+        super().__init__(interval_seconds)
+        self.watermark: Optional[datetime] = None
+        self.last_swept = 0
+        self.total_swept = 0
+
+    def sweep(self, db: Session, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        swept = loan_repository.mark_overdue_loans(db, now=now, since=self.watermark)
+        db.commit()
+        self.watermark = now
+        self.last_swept = swept
+        self.total_swept += swept
+        return swept
+
+    def run(self, db: Session) -> int:
+        return self.sweep(db)
+
+    def on_result(self, swept: int) -> None:
+        if swept:
+            logger.info(f"Overdue sweep marked {swept} loans as OVERDUE")
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "last_swept": self.last_swept,
+            "total_swept": self.total_swept,
+        }
+
+overdue_sweeper = OverdueLoanSweeper()
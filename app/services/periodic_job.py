@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import SessionLocal
+from app.core.logger import logger
+
+class PeriodicJob:
+    """
+    Runs `run(db)` in the background every `interval_seconds` (0 disables it), on the threadpool
+    with a session of its own, and hands the result to `on_result`. The first run is one interval
+    after startup unless `RUN_AT_STARTUP` is set. A failed run is logged and the job carries on.
+    """
+    NAME = "Periodic job"
+    RUN_AT_STARTUP = False
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def run(self, db: Session) -> Any:
+        raise NotImplementedError
+
+    def on_result(self, result: Any) -> None:
+        pass
+
+    def _run_once(self) -> Any:
+        db = SessionLocal()
+        try:
+            return self.run(db)
+        finally:
+            db.close()
+
+    async def _loop(self) -> None:
+        if not self.RUN_AT_STARTUP:
+            await asyncio.sleep(self.interval_seconds)
+        while True:
+            try:
+                self.on_result(await run_in_threadpool(self._run_once))
+            except Exception as e:
+                logger.error(f"{self.NAME} failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"running": self._task is not None}
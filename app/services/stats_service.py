@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.core.cache import safe_redis_call
+from app.core.config import settings
+from app.core.entity_cache import stats_cache
+from app.domain.dtos.stats import AuthorActiveLoans, AuthorLoanStats, BookLoanStats, DailyLoanStats
+from app.repositories.loan_stats_repository import loan_stats_repository
+
+class StatsService:
+    """
+    Loan dashboards read from the daily summary table (and the books' copy counters), so their cost
+    depends on the requested window, not on how long the loan history is. Each response is
+    cached in Redis as serialized JSON for STATS_CACHE_TTL_SECONDS; without Redis every call
+    queries the database.
+    """
+    CACHE_KEY_PREFIX = "stats"
+
+    def __init__(self, redis_client: Optional[Redis] = None):
+        self.redis_client = redis_client
+
+    def _cached(self, key: str, model: Type[BaseModel], load: Callable[[], List[Any]]) -> bytes:
+        """The cached JSON body under `key`, or `load()`'s rows serialized as `List[model]` and cached."""
+        cache_key = f"{self.CACHE_KEY_PREFIX}:{key}"
+        if self.redis_client is not None:
+            cached = safe_redis_call(self.redis_client.get, cache_key)
+            if cached:
+                stats_cache.record(hits=1)
+                return cached
+            stats_cache.record(misses=1)
+        body = TypeAdapter(List[model]).dump_json([model.model_validate(row) for row in load()])
+        if self.redis_client is not None:
+            safe_redis_call(self.redis_client.setex, cache_key, settings.STATS_CACHE_TTL_SECONDS, body)
+        return body
+
+    @staticmethod
+    def _since(days: int) -> date:
+        """First day of a window of `days` days ending today (UTC)."""
+        return datetime.utcnow().date() - timedelta(days=days - 1)
+
+    def top_books_json(self, db: Session, days: int = 30, limit: int = 10) -> bytes:
+        return self._cached(f"top_books:{days}:{limit}", BookLoanStats, lambda: [
+            row._mapping for row in loan_stats_repository.top_books(db, since=self._since(days), limit=limit)
+        ])
+
+    def top_authors_json(self, db: Session, days: int = 30, limit: int = 10) -> bytes:
+        return self._cached(f"top_authors:{days}:{limit}", AuthorLoanStats, lambda: [
+            row._mapping for row in loan_stats_repository.top_authors(db, since=self._since(days), limit=limit)
+        ])
+
+    def active_loans_by_author_json(self, db: Session, limit: int = 10) -> bytes:
+        return self._cached(f"active_loans_by_author:{limit}", AuthorActiveLoans, lambda: [
+            row._mapping for row in loan_stats_repository.active_loans_by_author(db, limit=limit)
+        ])
+
+    def overdue_rate_json(self, db: Session, days: int = 30) -> bytes:
+        return self._cached(f"overdue_rate:{days}", DailyLoanStats, lambda: [
+            {**row._mapping, "overdue_rate": round(row.late_returns / row.returns, 4) if row.returns else 0.0}
+            for row in loan_stats_repository.daily_totals(db, since=self._since(days))
+        ])
@@ -1,11 +1,14 @@
 from typing import List, Optional
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 from app.domain.entities.user import User
 from app.domain.dtos.user import UserCreate, UserUpdate
-from app.repositories.user_repository import user_repository
+from app.repositories.user_repository import user_repository, async_user_repository
 from app.core.security import get_password_hash
+from app.core.auth_cache import auth_cache
 
 class UserService:
     def get_user(self, db: Session, user_id: int) -> Optional[User]:
@@ -14,15 +17,20 @@ class UserService:
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
         return user_repository.get_by_email(db, email=email)
 
-    def get_users(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        return user_repository.get_multi(db, skip=skip, limit=limit)
+    def get_users(self, db: Session, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[User]:
+        return user_repository.get_multi(db, skip=skip, limit=limit, after=after)
 
-    def create_user(self, db: Session, user: UserCreate) -> User:
+    def export_query(self) -> Select:
+        return user_repository.export_query()
+
+    def create_user(self, db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+        """`hashed_password` lets async callers hash the password off the event loop beforehand."""
         db_user = self.get_user_by_email(db, email=user.email)
         if db_user:
             raise HTTPException(status_code=400, detail="Email already registered")
             
-        hashed_password = get_password_hash(user.password)
+        if hashed_password is None:
+            hashed_password = get_password_hash(user.password)
         db_user_data = {
             "email": user.email,
             "name": user.name,
@@ -30,4 +38,34 @@ class UserService:
         }
         return user_repository.create(db=db, obj_in_data=db_user_data)
 
+    def update_user(self, db: Session, user_id: int, user_in: UserUpdate, hashed_password: Optional[str] = None) -> User:
+        """
+        Applies the fields set in `user_in` and drops the user's cached auth snapshots, so a
+        deactivation takes effect on their next request. `hashed_password` as in `create_user`.
+        """
+        db_user = user_repository.get(db, id=user_id)
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        update_data = user_in.model_dump(exclude_unset=True, exclude={"password"})
+        if "email" in update_data and update_data["email"] != db_user.email:
+            if self.get_user_by_email(db, email=update_data["email"]):
+                raise HTTPException(status_code=400, detail="Email already registered")
+        if user_in.password is not None:
+            update_data["hashed_password"] = hashed_password or get_password_hash(user_in.password)
+
+        updated_user = user_repository.update(db, db_obj=db_user, obj_in_data=update_data)
+        auth_cache.invalidate_user(user_id)
+        return updated_user
+
+class AsyncUserService:
+    """The user reads over an AsyncSession (DB_ASYNC_MODE); writes go through `UserService`."""
+
+    async def get_user(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        return await async_user_repository.get(db, id=user_id)
+
+    async def get_users(self, db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[int] = None) -> List[User]:
+        return await async_user_repository.get_multi(db, skip=skip, limit=limit, after=after)
+
 user_service = UserService()
+async_user_service = AsyncUserService()
@@ -0,0 +1,44 @@
+"""
+Bulk imports books from a CSV or JSON Lines file, streaming it in batches.
+
+    python -m app.tools.import_books books.csv [--format csv|jsonl] [--batch-size 1000]
+"""
+import argparse
+import sys
+
+from app.core.cache import close_redis, get_redis, init_redis
+from app.core.database import SessionLocal
+from app.services.book_import_service import BookImportService, SUPPORTED_FORMATS, detect_format
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV or JSON Lines.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=BookImportService.BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot infer the format from the file name, pass --format")
+
+    def progress(result):
+        print(f"{result.rows_read} rows read, {result.books_created} books created "
+              f"({result.rows_per_second} rows/s)", file=sys.stderr)
+
+    init_redis()
+    db = SessionLocal()
+    try:
+        service = BookImportService(redis_client=get_redis(), batch_size=args.batch_size)
+        with open(args.path, "rb") as stream:
+            result = service.import_stream(db, stream, fmt, progress=progress)
+    finally:
+        db.close()
+        close_redis()
+
+    for error in result.errors:
+        print(f"line {error.line}: {error.detail}", file=sys.stderr)
+    print(result.model_dump_json(exclude={"errors"}))
+    return 1 if result.errors_count else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
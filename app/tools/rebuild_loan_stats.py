@@ -0,0 +1,31 @@
+"""
+Rebuilds the daily loan summary rows (loan_daily_stats) of the LOAN_STATS_REBUILD_DAYS days
+before today, or of the days from --since up to --before, from the loans table.
+
+    python -m app.tools.rebuild_loan_stats [--since YYYY-MM-DD] [--before YYYY-MM-DD]
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from app.core.database import SessionLocal
+from app.services.loan_stats_refresher import loan_stats_refresher
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the daily loan statistics from the loans table.")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day rebuilt (default: LOAN_STATS_REBUILD_DAYS before --before)")
+    parser.add_argument("--before", type=date.fromisoformat, help="first day left as is (default: today, UTC)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        rows = loan_stats_refresher.refresh(db, since=args.since, before=args.before)
+    finally:
+        db.close()
+
+    print(json.dumps({"daily_rows": rows}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
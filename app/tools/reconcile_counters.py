@@ -0,0 +1,33 @@
+"""
+Checks users.active_loan_count, the book copies and copy counters, and the Redis availability
+cache against the loans table, and fixes any drift.
+
+    python -m app.tools.reconcile_counters [--dry-run]
+"""
+import argparse
+import json
+import sys
+
+from app.core.cache import close_redis, init_redis
+from app.core.database import SessionLocal
+from app.services.counter_reconciler import counter_reconciler
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile loan counters with the loans table.")
+    parser.add_argument("--dry-run", action="store_true", help="only report drift")
+    args = parser.parse_args(argv)
+
+    init_redis()
+    db = SessionLocal()
+    try:
+        report = counter_reconciler.reconcile(db, fix=not args.dry_run)
+    finally:
+        db.close()
+        close_redis()
+
+    print(json.dumps(report))
+    drifted = report["user_counts_drifted"] + report["books_availability_drifted"] + report["cache_entries_drifted"]
+    return 1 if drifted and args.dry_run else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+API load suite: drives the real ASGI app through realistic request mixes on a deterministic
+dataset, records latency percentiles and throughput, and checks them against a stored baseline.
+
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --scale 2 --clients 50 --output results.json
+    python -m benchmarks.bench_api --baseline benchmarks/baselines/bench_api.json --threshold 0.25
+    python -m benchmarks.bench_api --save-baseline benchmarks/baselines/bench_api.json
+
+Runs fully locally: SQLite and fakeredis (standing in for Redis), with rate limiting off and
+requests sent in-process through httpx's ASGI transport. The dataset (benchmarks/dataset.py) is
+seeded once into a template database that is copied before every scenario, so each one starts
+from the same state; client request sequences are seeded too.
+
+Scenarios:
+- browse: list pages, book details, search, single and batched availability, authors
+  (80% of book lookups hit a hot 5% of the catalogue).
+- checkout_storm: each client checks out books from the hot set and returns them, as its own user.
+  Losing a race for a book (400) is expected, not an error.
+- overdue_report: walks the active/overdue loans report by cursor and reads users' loan histories.
+
+Reports p50/p95/p99 latency and requests/s per scenario (and per endpoint in the JSON). With
+--baseline, exits with status 1 when a scenario's p95 rose above, or its requests/s fell below,
+the baseline by more than --threshold, or when it had errors the baseline did not. Baselines are
+machine specific: record them with --save-baseline on the machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+# The app reads its settings at import time (benchmarks.common already imports it): point it at
+# the scratch SQLite database and an unreachable Redis (replaced by fakeredis) before anything else
+DB_PATH = os.path.join(tempfile.gettempdir(), "digital_lib_bench_api.db")
+TEMPLATE_PATH = os.path.join(tempfile.gettempdir(), "digital_lib_bench_api.template.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+import logging  # noqa: E402
+
+from benchmarks.common import percentile  # noqa: E402
+from benchmarks.dataset import WORDS, DatasetSize, seed_dataset  # noqa: E402
+
+API = "/api/v1"
+SCENARIOS: Dict[str, Callable] = {}
+
+
+def scenario(fn: Callable) -> Callable:
+    SCENARIOS[fn.__name__] = fn
+    return fn
+
+
+class Recorder:
+    """Latency samples per endpoint label, and response status counts, for one scenario."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    async def request(self, client, label: str, method: str, url: str, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        resp = await client.request(method, url, **kwargs)
+        self.samples[label].append(time.perf_counter() - start)
+        self.statuses[resp.status_code] += 1
+        if resp.status_code not in expected:
+            self.errors += 1
+        return resp
+
+
+class Context:
+    def __init__(self, size: DatasetSize):
+        self.size = size
+        self.hot_books = max(1, size.books // 20)
+        self._tokens: Dict[int, str] = {}
+
+    def book_id(self, rng: random.Random) -> int:
+        if rng.random() < 0.8:
+            return rng.randint(1, self.hot_books)
+        return rng.randint(1, self.size.books)
+
+    def auth(self, user_id: int) -> dict:
+        from app.core.security import create_access_token
+
+        if user_id not in self._tokens:
+            self._tokens[user_id] = create_access_token(data={"sub": str(user_id)})
+        return {"Authorization": f"Bearer {self._tokens[user_id]}"}
+
+
+@scenario
+async def browse(client, rec: Recorder, rng: random.Random, ctx: Context, n: int, requests: int) -> None:
+    for _ in range(requests):
+        roll = rng.random()
+        if roll < 0.35:
+            skip = rng.randrange(0, ctx.size.books, 20) if rng.random() < 0.2 else rng.randrange(0, 200, 20)
+            await rec.request(client, "GET /books/", "GET", f"{API}/books/", params={"limit": 20, "skip": skip})
+        elif roll < 0.55:
+            await rec.request(client, "GET /books/{id}", "GET", f"{API}/books/{ctx.book_id(rng)}")
+        elif roll < 0.70:
+            words = rng.sample(WORDS, rng.randint(1, 2))
+            query = " ".join(words) if rng.random() < 0.7 else words[0][:4]
+            await rec.request(client, "GET /books/search", "GET", f"{API}/books/search", params={"q": query})
+        elif roll < 0.85:
+            book_ids = [ctx.book_id(rng) for _ in range(25)]
+            await rec.request(client, "POST /books/availability", "POST", f"{API}/books/availability", json={"book_ids": book_ids})
+        elif roll < 0.95:
+            await rec.request(client, "GET /books/{id}/availability", "GET", f"{API}/books/{ctx.book_id(rng)}/availability")
+        else:
+            author_id = rng.randint(1, ctx.size.authors)
+            await rec.request(client, "GET /books/authors/{id}", "GET", f"{API}/books/authors/{author_id}")
+
+
+@scenario
+async def checkout_storm(client, rec: Recorder, rng: random.Random, ctx: Context, n: int, requests: int) -> None:
+    user_id = n % ctx.size.users + 1
+    headers = ctx.auth(user_id)
+    sent = 0
+    while sent < requests:
+        resp = await rec.request(
+            client, "POST /loans/", "POST", f"{API}/loans/", expected=(200, 400),
+            json={"user_id": user_id, "book_id": ctx.book_id(rng)}, headers=headers,
+        )
+        sent += 1
+        if resp.status_code == 200 and sent < requests:
+            await rec.request(client, "POST /loans/{id}/return", "POST", f"{API}/loans/{resp.json()['id']}/return", headers=headers)
+            sent += 1
+
+
+@scenario
+async def overdue_report(client, rec: Recorder, rng: random.Random, ctx: Context, n: int, requests: int) -> None:
+    sent = 0
+    cursor: Optional[str] = None
+    while sent < requests:
+        if rng.random() < 0.6:
+            params = {"limit": 50, **({"after": cursor} if cursor else {})}
+            resp = await rec.request(client, "GET /loans/active-delayed", "GET", f"{API}/loans/active-delayed", params=params)
+            cursor = resp.headers.get("X-Next-Cursor")
+        else:
+            user_id = rng.randint(1, ctx.size.users)
+            await rec.request(client, "GET /users/{id}/loans", "GET", f"{API}/users/{user_id}/loans", params={"limit": 20})
+        sent += 1
+
+
+def latency_summary(samples: List[float]) -> dict:
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+    }
+
+
+def reset_state() -> None:
+    """Restores the seeded database and empties every cache, so each scenario starts identically."""
+    from app.core import cache
+    from app.core.auth_cache import auth_cache
+    from app.core.database import engine
+    from app.core.entity_cache import CacheFamily
+    from app.services.book_availability_service import book_availability_service
+    from app.services.book_search_service import book_search_service
+
+    engine.dispose()
+    shutil.copyfile(TEMPLATE_PATH, DB_PATH)
+    cache.redis_client.flushall()
+    auth_cache.clear()
+    book_search_service.reset()
+    book_availability_service.reset()
+    for family in CacheFamily.registry.values():
+        family.reset()
+
+
+async def run_scenario(name: str, ctx: Context, clients: int, requests: int, seed: int) -> dict:
+    import httpx
+    from app.main import app
+
+    rec = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            SCENARIOS[name](client, rec, random.Random(f"{seed}:{name}:{n}"), ctx, n, requests)
+            for n in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+
+    all_samples = [sample for samples in rec.samples.values() for sample in samples]
+    return {
+        **latency_summary(all_samples),
+        "rps": round(len(all_samples) / elapsed, 1),
+        "errors": rec.errors,
+        "statuses": {str(status): count for status, count in sorted(rec.statuses.items())},
+        "endpoints": {label: latency_summary(samples) for label, samples in sorted(rec.samples.items())},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Regressions of `results` against `baseline`, as printable lines."""
+    regressions = []
+    print(f"\n{'scenario':<16} {'p95 ms':>9} {'baseline':>9} {'change':>8} {'req/s':>8} {'baseline':>9} {'change':>8}")
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            print(f"{name:<16} {'(not in baseline)':>30}")
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_change = current["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        print(f"{name:<16} {current['p95_ms']:>9.2f} {base['p95_ms']:>9.2f} {p95_change:>+8.0%} "
+              f"{current['rps']:>8.1f} {base['rps']:>9.1f} {rps_change:>+8.0%}")
+        if p95_change > threshold:
+            regressions.append(f"{name}: p95 {current['p95_ms']:.2f} ms vs {base['p95_ms']:.2f} ms ({p95_change:+.0%})")
+        if rps_change < -threshold:
+            regressions.append(f"{name}: {current['rps']:.1f} req/s vs {base['rps']:.1f} ({rps_change:+.0%})")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors vs {base.get('errors', 0)}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable; default: all")
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset scale (1 = 1k users, 5k books, 20k loans)")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=100, help="requests per client per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    import fakeredis
+    from sqlalchemy import create_engine
+    from app.core import cache
+    from app.core.rate_limit import limiter
+
+    size = DatasetSize.at_scale(args.scale)
+    start = time.perf_counter()
+    template_engine = create_engine(f"sqlite:///{TEMPLATE_PATH}")
+    seed_dataset(template_engine, size, seed=args.seed)
+    template_engine.dispose()
+    print(f"seeded {size.users:,} users, {size.authors:,} authors, {size.books:,} books, "
+          f"{size.loans:,} loans in {time.perf_counter() - start:.1f}s")
+
+    cache.redis_client = fakeredis.FakeRedis()
+    limiter.enabled = False
+    # Per-request access logs would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    ctx = Context(size)
+
+    results = {
+        "meta": {
+            "scale": args.scale, "clients": args.clients, "requests_per_client": args.requests, "seed": args.seed,
+            "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+    print(f"\n{'scenario':<16} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name in args.scenario or list(SCENARIOS):
+        reset_state()
+        r = asyncio.run(run_scenario(name, ctx, args.clients, args.requests, args.seed))
+        results["scenarios"][name] = r
+        print(f"{name:<16} {r['requests']:>9} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['errors']:>7}")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regression beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
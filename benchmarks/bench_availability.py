@@ -0,0 +1,91 @@
+"""
+Book availability lookups: an ORM `Book` load per id vs one batched SELECT vs the Redis bitfield.
+
+    python -m benchmarks.bench_availability --books 200000 --batch 100
+    python -m benchmarks.bench_availability --redis-url redis://localhost:6379/15
+
+Times one and `--batch` lookups through each path on a scratch SQLite catalogue (a third of the
+books lent). The bitfield runs on fakeredis in-process (the command's own cost, no network) and,
+with --redis-url, on a real Redis (its availability key is overwritten). Also reports the
+bitfield's memory for the catalogue.
+"""
+import argparse
+import random
+from unittest.mock import patch
+
+from sqlalchemy import insert
+
+from app.core import cache
+from app.domain.entities import Author, Book
+from app.repositories.book_repository import book_repository
+from app.services.book_availability_service import BookAvailabilityService
+from benchmarks.common import make_sqlite_session, timed
+
+
+def seed(SessionLocal, books: int) -> None:
+    db = SessionLocal()
+    db.execute(insert(Author), [{"name": "Author"}])
+    for start in range(0, books, 50_000):
+        db.execute(insert(Book), [
+            {"title": f"Book {i}", "isbn": f"AV-{i}", "is_available": i % 3 != 0, "author_id": 1}
+            for i in range(start, min(books, start + 50_000))
+        ])
+    db.commit()
+    db.close()
+
+
+def redis_clients(redis_url):
+    try:
+        import fakeredis
+    except ImportError:
+        print("fakeredis not installed: skipping the in-process Redis backend")
+    else:
+        yield "fakeredis", fakeredis.FakeRedis()
+    if redis_url:
+        import redis
+        yield "redis", redis.Redis.from_url(redis_url)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--redis-url", help="a scratch Redis")
+    args = parser.parse_args()
+
+    _, SessionLocal = make_sqlite_session("availability")
+    seed(SessionLocal, args.books)
+    rng = random.Random(5)
+    one = [rng.randint(1, args.books)]
+    batch = rng.sample(range(1, args.books + 1), args.batch)
+    db = SessionLocal()
+
+    def orm_per_id(ids):
+        return {book.id: book.is_available for book in (book_repository.get(db, id=book_id) for book_id in ids)}
+
+    rows = [("ORM Book per id", lambda ids: orm_per_id(ids)),
+            ("batched SELECT", lambda ids: book_repository.get_availability(db, ids))]
+    for name, client in redis_clients(args.redis_url):
+        service = BookAvailabilityService()
+        client.delete(service.KEY)
+        with patch.object(cache, "redis_client", client):
+            # Warm the whole catalogue, as the reconciliation does
+            for start in range(1, args.books + 1, 10_000):
+                ids = list(range(start, min(args.books + 1, start + 10_000)))
+                service.write(client, book_repository.get_availability(db, ids))
+        memory = client.memory_usage(service.KEY) if name == "redis" else client.strlen(service.KEY)
+        print(f"{name} bitfield: {memory / 1024:.0f} KiB for {args.books:,} books")
+        rows.append((f"{name} bitfield", lambda ids, client=client, service=service: service.read(client, ids)))
+
+    assert orm_per_id(batch) == book_repository.get_availability(db, batch)
+    print(f"\n{'path':<20} {'1 id ms':>9} {f'{args.batch} ids ms':>12}")
+    for name, lookup in rows:
+        single_ms = timed(lambda: lookup(one), args.repeat)
+        batch_ms = timed(lambda: lookup(batch), args.repeat)
+        print(f"{name:<20} {single_ms:>9.3f} {batch_ms:>12.3f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
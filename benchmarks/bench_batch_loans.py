@@ -0,0 +1,113 @@
+"""
+Basket checkout and return: N single calls vs one batch call.
+
+    python -m benchmarks.bench_batch_loans --baskets 1000 --basket-size 3 --threads 8
+
+Each basket is one user borrowing `--basket-size` distinct books (at most MAX_ACTIVE_LOANS) and
+returning them, through `LoanService` on a scratch SQLite database. Reports statements and
+commits per basket and baskets/sec for both flows, sequential and threaded.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, insert
+
+from app.domain.dtos.loan import LoanBatchCreate, LoanBatchReturn, LoanCreate
+from app.domain.entities import Author, Book, User
+from app.repositories.book_repository import book_repository
+from app.services.loan_service import loan_service
+from benchmarks.common import make_sqlite_session
+
+
+def single_checkout(db, user_id, book_ids):
+    return [loan_service.create_loan(db, LoanCreate(user_id=user_id, book_id=book_id)).id for book_id in book_ids]
+
+
+def batch_checkout(db, user_id, book_ids):
+    return [loan.id for loan in loan_service.create_loans(db, LoanBatchCreate(user_id=user_id, book_ids=book_ids))]
+
+
+def single_return(db, loan_ids):
+    for loan_id in loan_ids:
+        loan_service.return_loan(db, loan_id=loan_id)
+
+
+def batch_return(db, loan_ids):
+    loan_service.return_loans(db, LoanBatchReturn(loan_ids=loan_ids))
+
+
+FLOWS = {"single": (single_checkout, single_return), "batch": (batch_checkout, batch_return)}
+
+
+def seed(SessionLocal, baskets: int, basket_size: int) -> None:
+    db = SessionLocal()
+    db.execute(insert(Author), [{"name": "Bench Author"}])
+    db.execute(insert(Book), [
+        {"title": f"Book {i}", "isbn": f"BATCH-{i}", "is_available": True, "author_id": 1}
+        for i in range(baskets * basket_size)
+    ])
+    book_repository.add_first_copies(db)
+    db.execute(insert(User), [
+        {"name": f"User {i}", "email": f"user{i}@bench.example.com", "hashed_password": "x", "is_active": True}
+        for i in range(baskets)
+    ])
+    db.commit()
+    db.close()
+
+
+def run(flow: str, baskets: int, basket_size: int, threads: int) -> None:
+    checkout, give_back = FLOWS[flow]
+    engine, SessionLocal = make_sqlite_session(f"batch_loans_{flow}_{threads}")
+    seed(SessionLocal, baskets, basket_size)
+    counts = {"statements": 0, "commits": 0}
+    event.listen(engine, "before_cursor_execute", lambda *a: counts.__setitem__("statements", counts["statements"] + 1))
+    event.listen(engine, "commit", lambda *a: counts.__setitem__("commits", counts["commits"] + 1))
+
+    def timed_phase(work) -> tuple:
+        counts.update(statements=0, commits=0)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(work, range(baskets)))
+        return results, time.perf_counter() - start, dict(counts)
+
+    def lend(i: int):
+        db = SessionLocal()
+        try:
+            return checkout(db, i + 1, [i * basket_size + j + 1 for j in range(basket_size)])
+        finally:
+            db.close()
+
+    loan_ids, lend_seconds, lend_counts = timed_phase(lend)
+
+    def back(i: int) -> None:
+        db = SessionLocal()
+        try:
+            give_back(db, loan_ids[i])
+        finally:
+            db.close()
+
+    _, return_seconds, return_counts = timed_phase(back)
+    for phase, seconds, phase_counts in (("checkout", lend_seconds, lend_counts), ("return", return_seconds, return_counts)):
+        print(
+            f"{flow:>7} {phase:>9} {threads:>8} {phase_counts['statements'] / baskets:>14.1f} "
+            f"{phase_counts['commits'] / baskets:>9.1f} {baskets / seconds:>11.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baskets", type=int, default=1_000)
+    parser.add_argument("--basket-size", type=int, default=loan_service.MAX_ACTIVE_LOANS)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"basket of {args.basket_size} books")
+    print(f"{'flow':>7} {'phase':>9} {'threads':>8} {'stmts/basket':>14} {'commits':>9} {'baskets/s':>11}")
+    for threads in (1, args.threads):
+        for flow in FLOWS:
+            run(flow, args.baskets, args.basket_size, threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Book list cache hit path for pages of 10, 100 and 1000 books: how the cached page becomes the
+response body.
+
+    python -m benchmarks.bench_cache_hit --repeat 200
+
+- orm rebuild: the original hit path. `json.loads` of a whole-page blob, transient `Book` and
+  `Author` ORM instances, `BookResponse` validation, then FastAPI's `jsonable_encoder` + `json.dumps`.
+- parsed entities: per-book entries parsed into `BookResponse`, then FastAPI's serialization.
+- raw splice: per-book entries (already the response JSON) joined into the body as bytes.
+
+Redis is served in-process by fakeredis, so every variant pays the same (network-free) command cost.
+"""
+import argparse
+import json
+from datetime import datetime
+from typing import List
+
+import fakeredis
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.domain.dtos.book import BookResponse
+from app.domain.entities.book import Author, Book
+from app.core.entity_cache import book_cache
+from benchmarks.common import timed
+
+PAGE_ADAPTER = TypeAdapter(List[BookResponse])
+
+
+def make_books(count: int) -> List[BookResponse]:
+    now = datetime.utcnow()
+    return [
+        BookResponse(
+            id=i, title=f"Book number {i}", isbn=f"978-{i:010d}", is_available=i % 3 != 0,
+            copy_count=2, available_count=2 if i % 3 != 0 else 0, author_id=i % 50 + 1, created_at=now, author={"id": i % 50 + 1, "name": f"Author {i % 50 + 1}", "created_at": now},
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def orm_rebuild(redis_client, key: str) -> bytes:
+    books = []
+    for data in json.loads(redis_client.get(key)):
+        author_data = data.pop("author", None)
+        book = Book(**data)
+        if author_data:
+            book.author = Author(**author_data)
+        books.append(book)
+    validated = PAGE_ADAPTER.validate_python(books, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), separators=(",", ":")).encode("utf-8")
+
+
+def parsed_entities(redis_client, ids: List[int]) -> bytes:
+    books = [BookResponse.model_validate_json(value) for value in book_cache.get_json_many(redis_client, ids).values()]
+    return json.dumps(jsonable_encoder(books), separators=(",", ":")).encode("utf-8")
+
+
+def raw_splice(redis_client, ids: List[int]) -> bytes:
+    entries = book_cache.get_json_many(redis_client, ids)
+    return b"[" + b",".join(entries[book_id] for book_id in ids if book_id in entries) + b"]"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    redis_client = fakeredis.FakeRedis()
+    print(f"{'page size':>9} {'orm rebuild ms':>15} {'parsed entities ms':>19} {'raw splice ms':>14}")
+    for size in (10, 100, 1000):
+        books = make_books(size)
+        ids = [book.id for book in books]
+        # The original cache stored each page as one blob with ISO datetimes
+        blob_key = f"bench:page:{size}"
+        redis_client.set(blob_key, json.dumps([book.model_dump(mode="json") for book in books]))
+        book_cache.set_many(redis_client, books)
+
+        assert json.loads(orm_rebuild(redis_client, blob_key)) == json.loads(raw_splice(redis_client, ids))
+        assert parsed_entities(redis_client, ids) == raw_splice(redis_client, ids)
+        results = [
+            timed(lambda: orm_rebuild(redis_client, blob_key), args.repeat),
+            timed(lambda: parsed_entities(redis_client, ids), args.repeat),
+            timed(lambda: raw_splice(redis_client, ids), args.repeat),
+        ]
+        print(f"{size:>9} {results[0]:>15.3f} {results[1]:>19.3f} {results[2]:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
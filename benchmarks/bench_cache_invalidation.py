@@ -0,0 +1,63 @@
+"""
+Cost of invalidating the book list cache: KEYS + DEL (previous approach) vs a single INCR
+of the `books_list:gen` generation counter.
+
+    python -m benchmarks.bench_cache_invalidation --redis-url redis://localhost:6379/15 --pages 1000 --noise 100000
+
+Uses a dedicated Redis database which is FLUSHED before and after the run. `--noise` adds
+unrelated keys, since KEYS walks the entire keyspace, not only the matching entries.
+"""
+import argparse
+
+import redis
+
+from app.services.book_service import BookService
+from benchmarks.common import timed
+
+
+def fill(client: redis.Redis, generation: int, pages: int) -> None:
+    pipe = client.pipeline(transaction=False)
+    for skip in range(pages):
+        pipe.setex(f"{BookService.CACHE_KEY_PREFIX}:{generation}:{skip * 10}:10", 3600, "[]")
+    pipe.execute()
+
+
+def keys_and_delete(client: redis.Redis) -> None:
+    keys = client.keys(f"{BookService.CACHE_KEY_PREFIX}:*")
+    if keys:
+        client.delete(*keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--pages", type=int, default=1_000, help="cached skip:limit variants")
+    parser.add_argument("--noise", type=int, default=100_000, help="unrelated keys in the keyspace")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis_url)
+    client.flushdb()
+    pipe = client.pipeline(transaction=False)
+    for i in range(args.noise):
+        pipe.set(f"noise:{i}", "x")
+    pipe.execute()
+
+    service = BookService(redis_client=client)
+    keys_ms = []
+    for _ in range(args.repeat):
+        fill(client, 0, args.pages)
+        keys_ms.append(timed(lambda: keys_and_delete(client), repeat=1))
+
+    fill(client, service._cache_generation(), args.pages)
+    incr_ms = timed(service._clear_books_cache, repeat=args.repeat)
+    client.flushdb()
+
+    keys_ms.sort()
+    print(f"keyspace: {args.noise + args.pages} keys, {args.pages} cached pages")
+    print(f"KEYS + DEL  median {keys_ms[len(keys_ms) // 2]:.3f} ms")
+    print(f"INCR        median {incr_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
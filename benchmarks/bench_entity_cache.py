@@ -0,0 +1,84 @@
+"""
+Book list reads right after an invalidation: whole cached pages (previous approach) vs pages of
+ids over the per-book cache. Also reports steady-state hits and the 304 savings of ETags.
+
+    python -m benchmarks.bench_entity_cache --books 100000 --limit 50
+
+Runs on a scratch SQLite catalogue with Redis served in-process by fakeredis (no network), so
+the numbers show database and serialization work, not round trips. Each invalidated read bumps
+the page generation first, as creating a book does.
+"""
+import argparse
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.domain.dtos.book import BookResponse
+from app.domain.entities import Author, Book
+from app.repositories.book_repository import book_repository
+from app.services.book_service import BookService
+from benchmarks.common import make_sqlite_session, timed
+
+PAGE_ADAPTER = TypeAdapter(List[BookResponse])
+
+
+def seed(SessionLocal, books: int) -> None:
+    db = SessionLocal()
+    db.execute(insert(Author), [{"name": f"Author {i}"} for i in range(1000)])
+    for start in range(0, books, 50_000):
+        db.execute(insert(Book), [
+            {"title": f"Book {i}", "isbn": f"EC-{i}", "is_available": True, "author_id": i % 1000 + 1}
+            for i in range(start, min(books, start + 50_000))
+        ])
+    db.commit()
+    db.close()
+
+
+def whole_page_miss(db, redis_client, skip: int, limit: int) -> None:
+    """The previous miss path: load the full page with authors and cache it as one JSON blob."""
+    generation = int(redis_client.get(BookService.CACHE_GENERATION_KEY) or 0)
+    books = PAGE_ADAPTER.validate_python(book_repository.get_multi(db, skip=skip, limit=limit))
+    redis_client.setex(f"{BookService.CACHE_KEY_PREFIX}:{generation}:{skip}:{limit}", 3600, PAGE_ADAPTER.dump_json(books))
+
+
+def main() -> None:
+    import fakeredis
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    _, SessionLocal = make_sqlite_session("entity_cache")
+    seed(SessionLocal, args.books)
+    db = SessionLocal()
+    redis_client = fakeredis.FakeRedis()
+    service = BookService(redis_client=redis_client)
+    skip = args.books // 2
+
+    def invalidated(read):
+        def run():
+            redis_client.incr(BookService.CACHE_GENERATION_KEY)
+            read()
+        return run
+
+    service.get_books(db, skip=skip, limit=args.limit)
+    results = [
+        ("no cache", timed(lambda: PAGE_ADAPTER.validate_python(book_repository.get_multi(db, skip=skip, limit=args.limit)), args.repeat)),
+        ("whole page, invalidated", timed(invalidated(lambda: whole_page_miss(db, redis_client, skip, args.limit)), args.repeat)),
+        ("id page, invalidated", timed(invalidated(lambda: service.get_books(db, skip=skip, limit=args.limit)), args.repeat)),
+        ("id page, hit", timed(lambda: service.get_books(db, skip=skip, limit=args.limit), args.repeat)),
+    ]
+    print(f"page of {args.limit} books at offset {skip:,}")
+    for name, ms in results:
+        print(f"{name:<26} {ms:>8.2f} ms")
+    db.close()
+
+    body = PAGE_ADAPTER.dump_json(service.get_books(SessionLocal(), skip=skip, limit=args.limit))
+    print(f"\nresponse body: 200 {len(body):,} bytes, 304 (If-None-Match) 0 bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Pulling loans out of the API: paging `/loans/active-delayed` vs the streaming `/loans/export`.
+
+    python -m benchmarks.bench_export --scale 10 --page-size 100
+
+Seeds the deterministic benchmark dataset (20,000 loans per unit of --scale, 5% of them open)
+into a scratch SQLite database and reads it through the ASGI app with rate limiting, logging and
+auth out of the way. The paging client follows `X-Next-Cursor` like the nightly report does;
+the exports stream the open loans and then the whole table in both formats, counting lines as
+the chunks arrive instead of keeping the body. Reports rows/s and the peak Python memory of each
+read (tracemalloc, in a separate pass so the timings are untraced).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'digital_lib_export.db')}"
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+from sqlalchemy import text  # noqa: E402
+
+from app.api.dependencies import get_current_user  # noqa: E402
+from app.core.database import engine  # noqa: E402
+from app.core.rate_limit import limiter  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.dataset import DatasetSize, seed_dataset  # noqa: E402
+
+
+async def get(path: str, query: str = "", on_body: Optional[Callable[[bytes], None]] = None):
+    """
+    One GET straight through the ASGI app. Body chunks go to `on_body` as they are sent, or are
+    collected and returned. Returns (status, headers, body).
+    """
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+    start, chunks = {}, []
+    requested, done = False, asyncio.Event()
+
+    async def receive():
+        # The request body once, then (like a server) nothing until the client goes away
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(status=message["status"], headers={k.decode(): v.decode() for k, v in message["headers"]})
+        elif message["type"] == "http.response.body":
+            (on_body or chunks.append)(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return start["status"], start["headers"], b"".join(chunks)
+
+
+async def paged(page_size: int) -> int:
+    rows, after = 0, None
+    while True:
+        query = f"limit={page_size}" + (f"&after={after}" if after else "")
+        status, headers, body = await get("/api/v1/loans/active-delayed", query)
+        assert status == 200, body
+        rows += len(json.loads(body))
+        after = headers.get("x-next-cursor")
+        if not after:
+            return rows
+
+
+async def export(format: str, open_only: bool) -> int:
+    lines = 0
+
+    def count(chunk: bytes) -> None:
+        nonlocal lines
+        lines += chunk.count(b"\n")
+
+    query = f"format={format}" + ("&status=ACTIVE&status=OVERDUE" if open_only else "")
+    status, _, _ = await get("/api/v1/loans/export", query, on_body=count)
+    assert status == 200
+    return lines - 1 if format == "csv" else lines
+
+
+def measure(read) -> tuple:
+    start = time.perf_counter()
+    rows = asyncio.run(read())
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    asyncio.run(read())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, rows / elapsed, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    seed_dataset(engine, DatasetSize.at_scale(args.scale), seed=args.seed)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    limiter.enabled = False
+    # Slow exports would otherwise be logged as warnings
+    logging.getLogger().setLevel(logging.ERROR)
+    app.dependency_overrides[get_current_user] = lambda: None
+
+    reads = {
+        f"paged open (limit={args.page_size})": lambda: paged(args.page_size),
+        "export open csv": lambda: export("csv", open_only=True),
+        "export open ndjson": lambda: export("ndjson", open_only=True),
+        "export all csv": lambda: export("csv", open_only=False),
+        "export all ndjson": lambda: export("ndjson", open_only=False),
+    }
+    print(f"{'read':<26} {'rows':>10} {'rows/s':>10} {'peak MiB':>9}")
+    for name, read in reads.items():
+        rows, rate, peak = measure(read)
+        print(f"{name:<26} {rows:>10,} {rate:>10,.0f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
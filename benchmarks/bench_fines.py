@@ -0,0 +1,82 @@
+"""
+Accrued fines per user: an ORM loop over overdue loans vs the single aggregate query.
+
+    python -m benchmarks.bench_fines --scale 50
+
+Seeds the deterministic benchmark dataset (20,000 loans per unit of --scale, 5% of them still
+open, about half of those overdue) into a scratch SQLite database. The ORM loop loads every
+overdue loan and its user and sums in Python; the aggregate query groups in SQL and is read the
+way the endpoint streams it. Reports statements and wall time of each, plus the query plan.
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, text
+
+from app.domain.entities.loan import Loan, OPEN_LOAN_STATUSES
+from app.repositories.loan_repository import loan_repository
+from app.services.loan_service import loan_service
+from benchmarks.common import make_sqlite_session
+from benchmarks.dataset import EPOCH, DatasetSize, seed_dataset
+
+
+def orm_loop(db):
+    """Fines per user computed in Python, one loan object at a time."""
+    fines = defaultdict(float)
+    names = {}
+    loans = db.query(Loan).filter(Loan.status.in_(OPEN_LOAN_STATUSES), Loan.due_date < EPOCH).all()
+    for loan in loans:
+        days_late = (EPOCH - loan.due_date).days
+        fines[loan.user_id] += days_late * loan_service.LATE_FEE_PER_DAY
+        names[loan.user_id] = loan.user.name
+    return sorted(((user_id, names[user_id], fee) for user_id, fee in fines.items()), key=lambda row: (-row[2], row[0]))
+
+
+def aggregate(db, statement):
+    rows = []
+    for chunk in db.execute(statement.execution_options(yield_per=1000)).partitions():
+        rows.extend(chunk)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine, SessionLocal = make_sqlite_session("fines")
+    size = DatasetSize.at_scale(args.scale)
+    start = time.perf_counter()
+    seed_dataset(engine, size, seed=args.seed)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"seeded {size.loans:,} loans in {time.perf_counter() - start:.1f}s")
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+    db = SessionLocal()
+    statement = loan_repository.accrued_fines_query(db, now=EPOCH, fee_per_day=loan_service.LATE_FEE_PER_DAY, group_by="user")
+
+    results = {}
+    for name, run in (("orm loop", lambda: orm_loop(db)), ("aggregate query", lambda: aggregate(db, statement))):
+        db.expunge_all()
+        statements.clear()
+        start = time.perf_counter()
+        rows = run()
+        elapsed = (time.perf_counter() - start) * 1000
+        results[name] = [(row[0], row[-1]) for row in rows]
+        print(f"{name:<16} {len(statements):>7} statements {elapsed:>10.1f} ms   {len(rows):,} users owing")
+    assert results["orm loop"] == results["aggregate query"], "the two computations disagree"
+
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    print("\nquery plan:")
+    with engine.connect() as conn:
+        for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+            print(f"  {row[-1]}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
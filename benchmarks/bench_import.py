@@ -0,0 +1,82 @@
+"""
+Book ingestion: one `BookService.create_book` call per row vs the streaming bulk import.
+
+    python -m benchmarks.bench_import --rows 200000 --authors 5000
+
+Reports rows/sec for both paths (the per-row path is run on a sample). With --trace-memory the
+bulk import also reports its peak Python memory, which should stay flat as --rows grows
+(tracing slows it down considerably, so rows/sec is not comparable in that mode).
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.domain.dtos.book import AuthorCreate, BookCreate
+from app.services.book_import_service import BookImportService
+from app.services.book_service import BookService
+from benchmarks.common import make_sqlite_session
+
+
+def write_csv(path: str, rows: int, authors: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("title,isbn,author_name\n")
+        for i in range(rows):
+            f.write(f"Book {i},BULK-{i:09d},Author {i % authors}\n")
+
+
+def per_row(SessionLocal, rows: int, authors: int) -> float:
+    service = BookService()
+    db = SessionLocal()
+    try:
+        author_ids = [service.create_author(db, AuthorCreate(name=f"Author {i}")).id for i in range(authors)]
+        start = time.perf_counter()
+        for i in range(rows):
+            service.create_book(db, BookCreate(title=f"Book {i}", isbn=f"ROW-{i:09d}", author_id=author_ids[i % authors]))
+        return rows / (time.perf_counter() - start)
+    finally:
+        db.close()
+
+
+def bulk(SessionLocal, path: str, batch_size: int, trace_memory: bool):
+    db = SessionLocal()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with open(path, "rb") as stream:
+            result = BookImportService(batch_size=batch_size).import_stream(db, stream, "csv")
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        tracemalloc.stop()
+        db.close()
+    return result, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--authors", type=int, default=5_000)
+    parser.add_argument("--sample", type=int, default=2_000, help="rows inserted through the per-row path")
+    parser.add_argument("--batch-size", type=int, default=BookImportService.BATCH_SIZE)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    _, SessionLocal = make_sqlite_session("import_per_row")
+    print(f"per-row create_book: {per_row(SessionLocal, args.sample, min(args.authors, args.sample)):,.0f} rows/s "
+          f"({args.sample} rows)")
+
+    path = os.path.join(tempfile.gettempdir(), "digital_lib_import.csv")
+    write_csv(path, args.rows, args.authors)
+    try:
+        _, SessionLocal = make_sqlite_session("import_bulk")
+        result, peak = bulk(SessionLocal, path, args.batch_size, args.trace_memory)
+    finally:
+        os.remove(path)
+    memory = f", peak {peak / 1024 / 1024:.1f} MiB" if peak is not None else ""
+    print(f"bulk import:         {result.rows_per_second:,.0f} rows/s ({result.books_created} books, "
+          f"{result.authors_created} authors{memory})")
+
+
+if __name__ == "__main__":
+    main()
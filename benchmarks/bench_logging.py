@@ -0,0 +1,108 @@
+"""
+Event-loop latency under load with request logging off, written synchronously (the previous
+StreamHandler on the event loop) and handed to the queue listener thread.
+
+    python -m benchmarks.bench_logging --clients 20 --requests 200 --write-delay-us 200
+
+Concurrent clients call `/health` (no SQL) through the ASGI app while a probe task sleeps 1 ms
+at a time and records how late it wakes up: the time the loop spent blocked. Every request is
+logged (ACCESS_LOG_SAMPLE_RATE=1) to a scratch file; --write-delay-us adds a pause to each write,
+standing in for a stdout pipe whose reader (docker, a log shipper) is slower than the app.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'digital_lib_logging.db')}"
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.logger import logging_stats, setup_logging, stop_logging  # noqa: E402
+from app.core.rate_limit import limiter  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.common import percentile  # noqa: E402
+
+
+class SlowFile:
+    """A file whose writes each take at least `delay` seconds."""
+
+    def __init__(self, path: str, delay: float):
+        self.file = open(path, "w")
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def probe(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def load(clients: int, requests: int) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            for _ in range(requests):
+                resp = await client.get("/health")
+                assert resp.status_code == 200, resp.text
+
+        probe_task = asyncio.create_task(probe(lags, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    return {
+        "rps": clients * requests / elapsed,
+        "lag_p50": percentile(lags, 0.50),
+        "lag_p99": percentile(lags, 0.99),
+        "lag_max": max(lags) * 1000 if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--write-delay-us", type=float, default=200.0)
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    settings.ACCESS_LOG_SAMPLE_RATE = 1.0
+    path = os.path.join(tempfile.gettempdir(), "digital_lib_bench_logging.log")
+    print(f"{'logging':<10} {'req/s':>8} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}   (ms)")
+    for mode in ("off", "sync", "queued"):
+        sink = SlowFile(path, args.write_delay_us / 1_000_000)
+        setup_logging(sink, use_queue=mode == "queued")
+        if mode == "off":
+            logging.getLogger().setLevel(logging.WARNING)
+        # Keep the client's own request logging out of the measurement
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        result = asyncio.run(load(args.clients, args.requests))
+        dropped = logging_stats().get("dropped", 0)
+        stop_logging()
+        sink.close()
+        print(f"{mode:<10} {result['rps']:>8.0f} {result['lag_p50']:>9.2f} {result['lag_p99']:>9.2f} "
+              f"{result['lag_max']:>9.2f}" + (f"   ({dropped} dropped)" if dropped else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+`/books` latency during a login storm: bcrypt on the shared threadpool vs the dedicated password pool.
+
+    python -m benchmarks.bench_login_storm --logins 100 --readers 10 --seconds 10
+
+Each mode runs in its own subprocess (the pool is configured at import time) and drives the real
+ASGI app in-process through httpx, with rate limiting and Redis disabled. `--logins` clients log
+in back to back while `--readers` clients page through `/books`; the report shows the readers'
+latency next to an idle baseline, and how many logins succeeded or were shed with a 503.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = (
+    ("idle", {"PASSWORD_HASH_WORKERS": "0"}, False),
+    ("shared", {"PASSWORD_HASH_WORKERS": "0"}, True),
+    ("pool", {}, True),
+)
+
+
+def seed(users: int, books: int) -> None:
+    from sqlalchemy import insert
+    from app.core.database import Base, engine
+    from app.core.security import get_password_hash
+    from app.domain.entities import Author, Book, User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed_password = get_password_hash("password123")
+    with engine.begin() as conn:
+        conn.execute(insert(Author), [{"name": f"Author {i}"} for i in range(100)])
+        conn.execute(insert(Book), [
+            {"title": f"Book {i}", "isbn": f"BENCH-{i}", "is_available": True, "author_id": i % 100 + 1}
+            for i in range(books)
+        ])
+        conn.execute(insert(User), [
+            {"name": f"User {i}", "email": f"user{i}@bench.example.com", "hashed_password": hashed_password, "is_active": True}
+            for i in range(users)
+        ])
+
+
+def percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * q) - 1)] * 1000 if samples else 0.0
+
+
+async def drive(args: argparse.Namespace, storm: bool) -> dict:
+    import httpx
+    from app.main import app
+    from app.core.config import settings
+    from app.core.rate_limit import limiter
+
+    limiter.enabled = False
+    book_latencies = []
+    login_statuses = {}
+    deadline = time.perf_counter() + args.seconds
+
+    async def reader(client: httpx.AsyncClient, n: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            resp = await client.get(f"{settings.API_V1_STR}/books/", params={"limit": 20, "skip": (n * 7 + i) % 500})
+            book_latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.text
+            i += 1
+
+    async def login(client: httpx.AsyncClient, n: int) -> None:
+        while time.perf_counter() < deadline:
+            resp = await client.post(
+                f"{settings.API_V1_STR}/login",
+                data={"username": f"user{n % args.users}@bench.example.com", "password": "password123"},
+            )
+            login_statuses[resp.status_code] = login_statuses.get(resp.status_code, 0) + 1
+            if resp.status_code == 503:
+                await asyncio.sleep(float(resp.headers.get("Retry-After", "1")))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        tasks = [reader(client, n) for n in range(args.readers)]
+        if storm:
+            tasks += [login(client, n) for n in range(args.logins)]
+        await asyncio.gather(*tasks)
+
+    return {
+        "books": len(book_latencies),
+        "p50_ms": percentile(book_latencies, 0.5),
+        "p99_ms": percentile(book_latencies, 0.99),
+        "logins_ok": login_statuses.get(200, 0),
+        "logins_shed": login_statuses.get(503, 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=10, help="concurrent /books clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=1_000)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'digital_lib_login_bench.db')}")
+    parser.add_argument("--worker", choices=[mode for mode, _, _ in MODES], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        storm = dict((mode, storm) for mode, _, storm in MODES)[args.worker]
+        seed(args.users, args.books)
+        print(json.dumps(asyncio.run(drive(args, storm))))
+        return
+
+    print(f"{args.readers} /books readers, {args.logins} login clients, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>7} {'/books':>8} {'p50 ms':>9} {'p99 ms':>9} {'logins ok':>10} {'shed 503':>9}")
+    for mode, env_overrides, _ in MODES:
+        # The app logs JSON lines to stdout too: keep the access log out of the run and pick the result line
+        env = dict(
+            os.environ, DATABASE_URL=args.database_url, REDIS_URL="redis://127.0.0.1:1/0", LOG_LEVEL="WARNING", **env_overrides
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_login_storm", "--worker", mode, *sys.argv[1:]],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        r = next(json.loads(line) for line in reversed(out.splitlines()) if line.startswith('{"books"'))
+        print(f"{mode:>7} {r['books']:>8} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['logins_ok']:>10} {r['logins_shed']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Overhead of the Prometheus instrumentation (METRICS_ENABLED) per request.
+
+    python -m benchmarks.bench_metrics --requests 2000
+
+Serves a cheap endpoint without SQL (`/health`) and a book detail read (two SQL statements, no
+Redis) through the ASGI app on a scratch SQLite database, with request logging and rate limiting
+off. The recording is switched off and on in alternating blocks so drift affects both sides
+alike. Also times one /metrics scrape.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'digital_lib_metrics.db')}"
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.rate_limit import limiter  # noqa: E402
+from app.domain.entities import Author, Book  # noqa: E402
+from app.main import app  # noqa: E402
+
+BLOCK = 100
+
+
+def seed() -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    book = Book(title="Metrics", isbn="MX-1", author=Author(name="Bench"))
+    db.add(book)
+    db.commit()
+    book_id = book.id
+    db.close()
+    return book_id
+
+
+async def latencies(path: str, requests: int) -> dict:
+    samples = {False: [], True: []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(BLOCK):  # warm-up
+            await client.get(path)
+        for block in range(requests // BLOCK):
+            enabled = block % 2 == 1
+            settings.METRICS_ENABLED = enabled
+            for _ in range(BLOCK):
+                start = time.perf_counter()
+                resp = await client.get(path)
+                samples[enabled].append(time.perf_counter() - start)
+                assert resp.status_code == 200, resp.text
+        settings.METRICS_ENABLED = True
+        start = time.perf_counter()
+        scrape = await client.get("/metrics")
+        scrape_ms = (time.perf_counter() - start) * 1000
+    return {
+        "off": statistics.median(samples[False]) * 1_000_000,
+        "on": statistics.median(samples[True]) * 1_000_000,
+        "scrape_ms": scrape_ms,
+        "scrape_bytes": len(scrape.content),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help=f"per endpoint, at least {2 * BLOCK}")
+    args = parser.parse_args()
+    if args.requests < 2 * BLOCK:
+        parser.error(f"--requests must be at least {2 * BLOCK}: requests alternate between blocks of {BLOCK} with metrics off and on")
+
+    # Request logging and rate limiting would dominate the difference being measured
+    logging.getLogger().setLevel(logging.WARNING)
+    limiter.enabled = False
+    book_id = seed()
+    print(f"{'endpoint':<22} {'off p50':>10} {'on p50':>10} {'overhead':>10}   (us)")
+    for name, path in (("GET /health", "/health"), ("GET /books/{id}", f"{settings.API_V1_STR}/books/{book_id}")):
+        result = asyncio.run(latencies(path, args.requests))
+        print(f"{name:<22} {result['off']:>10.0f} {result['on']:>10.0f} {result['on'] - result['off']:>+10.0f}")
+    print(f"\n/metrics scrape: {result['scrape_ms']:.2f} ms, {result['scrape_bytes']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
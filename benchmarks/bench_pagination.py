@@ -0,0 +1,59 @@
+"""
+Offset vs keyset pagination latency by page depth.
+
+    python -m benchmarks.bench_pagination --books 200000 --limit 20
+
+Offset pages get slower the deeper they are (the database scans and discards `skip` rows),
+while keyset pages (`WHERE id > :last ORDER BY id`) stay flat.
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.domain.entities.book import Author, Book
+from app.repositories.book_repository import book_repository
+from benchmarks.common import make_sqlite_session, timed
+
+
+def seed(SessionLocal, books: int) -> None:
+    db = SessionLocal()
+    db.execute(insert(Author), [{"name": "Bench Author", "created_at": datetime.utcnow()}])
+    batch = []
+    for i in range(books):
+        batch.append({"title": f"Book {i}", "isbn": f"BENCH-{i}", "is_available": True, "author_id": 1})
+        if len(batch) == 10_000:
+            db.execute(insert(Book), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Book), batch)
+    db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _, SessionLocal = make_sqlite_session("pagination")
+    seed(SessionLocal, args.books)
+    db = SessionLocal()
+
+    print(f"{'page depth':>12} {'offset ms':>10} {'keyset ms':>10}")
+    depth = 1
+    while depth * args.limit < args.books:
+        skip = depth * args.limit
+        # The cursor for page N is the id of the last row of page N-1; ids are dense from 1.
+        last_id = skip
+        offset_ms = timed(lambda: book_repository.get_multi(db, skip=skip, limit=args.limit), args.repeat)
+        keyset_ms = timed(lambda: book_repository.get_multi(db, limit=args.limit, after=last_id), args.repeat)
+        print(f"{depth:>12} {offset_ms:>10.3f} {keyset_ms:>10.3f}")
+        depth *= 4
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
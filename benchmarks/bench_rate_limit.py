@@ -0,0 +1,103 @@
+"""
+Per-check overhead of the rate limiter, by storage backend and strategy.
+
+    python -m benchmarks.bench_rate_limit --checks 20000
+    python -m benchmarks.bench_rate_limit --redis-url redis://localhost:6379/15
+
+Times `hit()` on the limits strategy slowapi uses: in-memory storage (the fallback), Redis
+served in-process by fakeredis (Lua executed through lupa, no network: the script's own cost),
+and a real Redis when --redis-url is given (a network round trip per check). Then measures a
+rate-limited endpoint (`GET /books/authors/`, 30/minute) end to end through the ASGI app, with
+the limiter enabled and disabled, on a scratch SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import MemoryStorage, RedisStorage
+from limits.strategies import STRATEGIES
+
+STRATEGY_NAMES = ("sliding-window-counter", "moving-window", "fixed-window")
+
+
+def storages(redis_url):
+    yield "memory", MemoryStorage()
+    try:
+        import fakeredis
+        import lupa  # noqa: F401  (fakeredis needs it for Lua scripts)
+    except ImportError:
+        print("fakeredis/lupa not installed: skipping the in-process Redis backend")
+    else:
+        fake = fakeredis.FakeRedis()
+        yield "fakeredis", RedisStorage("redis://fakeredis", connection_pool=fake.connection_pool)
+    if redis_url:
+        yield "redis", RedisStorage(redis_url)
+
+
+def per_check_us(limiter, checks: int) -> float:
+    # A generous limit so every check takes the same (allowed) path
+    limit = parse(f"{checks * 10}/minute")
+    start = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(limit, "bench", str(i % 100))
+    return (time.perf_counter() - start) / checks * 1_000_000
+
+
+async def endpoint_latency(requests: int, enabled: bool) -> float:
+    import httpx
+    from app.main import app
+    from app.core.config import settings
+    from app.core.rate_limit import limiter
+
+    limiter.enabled = enabled
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(requests):
+            # Reset often so the endpoint keeps answering 200 and not 429
+            if i % 25 == 0:
+                for storage in (limiter._storage, limiter._fallback_storage):
+                    try:
+                        storage.reset()
+                    except Exception:
+                        pass
+            start = time.perf_counter()
+            resp = await client.get(f"{settings.API_V1_STR}/books/authors/")
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.text
+    return statistics.median(latencies) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--redis-url", help="a scratch Redis; its rate limit keys are reset")
+    args = parser.parse_args()
+
+    print(f"{'storage':<10} " + " ".join(f"{name:>24}" for name in STRATEGY_NAMES) + "   (us per check)")
+    for storage_name, storage in storages(args.redis_url):
+        results = []
+        for strategy in STRATEGY_NAMES:
+            storage.reset()
+            results.append(per_check_us(STRATEGIES[strategy](storage), args.checks))
+        print(f"{storage_name:<10} " + " ".join(f"{us:>24.1f}" for us in results))
+
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'digital_lib_rate_limit.db')}"
+    os.environ["REDIS_URL"] = args.redis_url or "redis://127.0.0.1:1/0"
+    from app.core.database import engine
+    from app.domain.entities import Base
+    Base.metadata.create_all(bind=engine)
+    disabled_ms = asyncio.run(endpoint_latency(args.requests, enabled=False))
+    enabled_ms = asyncio.run(endpoint_latency(args.requests, enabled=True))
+    print(f"\nGET /books/authors/ p50: limiter off {disabled_ms:.3f} ms, on {enabled_ms:.3f} ms "
+          f"(+{(enabled_ms - disabled_ms) * 1000:.0f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Book search over a synthetic catalogue: the in-memory index vs a `LIKE '%term%'` scan.
+
+    python -m benchmarks.bench_search --books 1000000
+
+Titles are 2-5 words drawn from a synthetic vocabulary (Zipf-like, so some words are common),
+authors have two-word names. Reports the index build time and memory, then the median latency
+of exact, prefix, typo and multi-word queries through BookSearchService (SQLite fallback path)
+next to a LIKE scan for the same text.
+"""
+import argparse
+import itertools
+import random
+import resource
+import time
+
+from sqlalchemy import insert, or_
+
+from app.domain.entities.book import Author, Book
+from app.services.book_search_service import BookSearchService
+from benchmarks.common import make_sqlite_session, timed
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vor", "el", "dun", "ith", "sa", "mor", "qua", "bel", "nor", "thi", "gal"]
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(SessionLocal, books: int, authors: int, vocabulary):
+    rng = random.Random(7)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    db = SessionLocal()
+    db.execute(insert(Author), [
+        {"name": f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}"} for _ in range(authors)
+    ])
+    batch = []
+    titles = []
+    for i in range(books):
+        title = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 5))).title()
+        if i % 1000 == 0:
+            titles.append(title)
+        batch.append({"title": title, "isbn": f"S-{i}", "is_available": True, "author_id": rng.randint(1, authors)})
+        if len(batch) == 50_000:
+            db.execute(insert(Book), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Book), batch)
+    db.commit()
+    db.close()
+    return titles
+
+
+def like_scan(db, text: str, limit: int):
+    words = text.split()
+    query = db.query(Book.id).join(Book.author)
+    for word in words:
+        query = query.filter(or_(Book.title.ilike(f"%{word}%"), Author.name.ilike(f"%{word}%")))
+    return query.limit(limit).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=50_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    _, SessionLocal = make_sqlite_session("search")
+    sample_titles = seed(SessionLocal, args.books, args.authors, vocabulary)
+    db = SessionLocal()
+
+    service = BookSearchService()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    service.search(db, "warmup")
+    build_s = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"indexed {service.stats()['books']:,} books / {service.stats()['tokens']:,} tokens "
+          f"in {build_s:.1f}s, max RSS +{(rss_after - rss_before) / 1024:.0f} MiB")
+
+    title = rng.choice(sample_titles).lower().split()
+    # Vocabulary words are drawn with Zipf weights by position: the last one seen is the rarest
+    seen = {word for sample in sample_titles for word in sample.lower().split()}
+    rare = max(seen, key=vocabulary.index)
+    queries = [
+        ("exact rare word", rare),
+        ("exact common word", vocabulary[0]),
+        ("prefix", rare[:4]),
+        ("typo", rare[:2] + rare[3:] if len(rare) > 4 else rare + "x"),
+        ("two words from a title", " ".join(title[:2])),
+    ]
+    print(f"\n{'query':<24} {'text':<22} {'index ms':>9} {'LIKE ms':>9} {'hits':>5}")
+    for name, text in queries:
+        index_ms = timed(lambda: service.search(db, text, limit=args.limit), args.repeat)
+        like_ms = timed(lambda: like_scan(db, text, args.limit), 1)
+        hits = len(service.search(db, text, limit=args.limit))
+        print(f"{name:<24} {text:<22} {index_ms:>9.2f} {like_ms:>9.1f} {hits:>5}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
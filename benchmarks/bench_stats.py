@@ -0,0 +1,104 @@
+"""
+/stats queries on the daily summary table vs ad-hoc GROUP BYs over `loans`, as history grows.
+
+    python -m benchmarks.bench_stats --books 5000 --loans-per-day 500 --history 90 365 1460
+
+For each history length (in days) a scratch SQLite database gets the same catalogue and the same
+daily loan volume, so only the length of the history changes; loan_daily_stats is then built
+over the whole history by the refresh job. Reports how long that full build and the scheduled
+rebuild (the last LOAN_STATS_REBUILD_DAYS days) take, and the median latency of the most borrowed
+books over the last 30 days and of the daily overdue rate over the last 30 days, computed both
+ways (uncached).
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, case, func, insert, select
+
+from app.domain.entities import Author, Book, Loan, User
+from app.domain.entities.loan import LoanStatus
+from app.repositories.loan_stats_repository import loan_stats_repository
+from app.services.loan_stats_refresher import LoanStatsRefresher
+from benchmarks.common import make_sqlite_session, timed
+
+NOW = datetime(2026, 1, 1)
+WINDOW_DAYS = 30
+
+
+def seed(engine, books: int, loans_per_day: int, history_days: int, seed: int = 42) -> int:
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(Author), [{"name": f"Author {i}"} for i in range(max(1, books // 25))])
+        conn.execute(insert(Book), [
+            {"title": f"Book {i}", "isbn": f"STATS-{i}", "is_available": True, "author_id": rng.randint(1, max(1, books // 25))}
+            for i in range(books)
+        ])
+        conn.execute(insert(User), [{"name": "Reader", "email": "reader@bench.example.com", "hashed_password": "!"}])
+        for day in range(history_days, 0, -1):
+            rows = []
+            for i in range(loans_per_day):
+                loan_date = NOW - timedelta(days=day, minutes=i % 1440)
+                returned_at = loan_date + timedelta(days=rng.randint(1, 20))
+                rows.append({
+                    "user_id": 1, "book_id": rng.randint(1, books), "loan_date": loan_date,
+                    "due_date": loan_date + timedelta(days=14), "return_date": returned_at,
+                    "status": LoanStatus.RETURNED, "late_fee": 0.0,
+                })
+            conn.execute(insert(Loan), rows)
+    return history_days * loans_per_day
+
+
+def adhoc_top_books(db, since):
+    totals = (
+        select(Loan.book_id, func.count().label("checkouts"))
+        .where(Loan.loan_date >= since)
+        .group_by(Loan.book_id)
+        .order_by(func.count().desc(), Loan.book_id)
+        .limit(10)
+        .subquery()
+    )
+    return db.execute(select(Book.id, Book.title, totals.c.checkouts).join(totals, totals.c.book_id == Book.id)).all()
+
+
+def adhoc_overdue_rate(db, since):
+    day = func.date(Loan.return_date, type_=Date)
+    return db.execute(
+        select(day, func.count(), func.sum(case((Loan.return_date > Loan.due_date, 1), else_=0)))
+        .where(Loan.return_date >= since)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5_000)
+    parser.add_argument("--loans-per-day", type=int, default=500)
+    parser.add_argument("--history", type=int, nargs="+", default=[90, 365, 1460], help="days of loan history")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    since = (NOW - timedelta(days=WINDOW_DAYS)).date()
+    print(f"{'history':>8} {'loans':>10} {'full build':>11} {'daily build':>12} "
+          f"{'top adhoc':>10} {'top stats':>10} {'rate adhoc':>11} {'rate stats':>11}   (ms)")
+    for history_days in args.history:
+        engine, SessionLocal = make_sqlite_session(f"stats_{history_days}")
+        loans = seed(engine, args.books, args.loans_per_day, history_days)
+        db = SessionLocal()
+        refresher = LoanStatsRefresher(interval_seconds=0)
+        full_ms = timed(lambda: refresher.refresh(db, since=(NOW - timedelta(days=history_days + 1)).date(), before=NOW.date()), repeat=1)
+        daily_ms = timed(lambda: refresher.refresh(db, before=NOW.date()), repeat=1)
+        top_adhoc = timed(lambda: adhoc_top_books(db, since), args.repeat)
+        top_stats = timed(lambda: loan_stats_repository.top_books(db, since=since, limit=10), args.repeat)
+        rate_adhoc = timed(lambda: adhoc_overdue_rate(db, since), args.repeat)
+        rate_stats = timed(lambda: loan_stats_repository.daily_totals(db, since=since), args.repeat)
+        assert [row[0] for row in adhoc_top_books(db, since)] == [row[0] for row in loan_stats_repository.top_books(db, since=since, limit=10)]
+        print(f"{history_days:>8} {loans:>10,} {full_ms:>11.0f} {daily_ms:>12.0f} "
+              f"{top_adhoc:>10.2f} {top_stats:>10.2f} {rate_adhoc:>11.2f} {rate_stats:>11.2f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared helpers for the standalone benchmark scripts.
+
+Benchmarks run against a throwaway local SQLite database so they need no Docker services.
+Run them from the repository root, e.g. `python -m benchmarks.bench_pagination`.
+"""
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities import Base
+
+
+def make_sqlite_session(name: str, timeout: float = 5.0):
+    """
+    Creates a fresh SQLite file database with the full schema and returns (engine, SessionLocal).
+    `timeout` is how long a writer waits for the database lock (raise it for many writer threads).
+    """
+    path = os.path.join(tempfile.gettempdir(), f"digital_lib_{name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": timeout})
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def timed(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Returns the median wall time of `fn` in milliseconds."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """The `q` quantile (nearest rank) of latency samples in seconds, in milliseconds."""
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * q + 0.5) - 1)] * 1000 if samples else 0.0
@@ -0,0 +1,115 @@
+"""
+Deterministic benchmark dataset: users, authors, books and a loan history at a configurable scale.
+
+The same `scale` and `seed` always produce the same rows. Open loans are consistent with the
+materialized counters: their books are lent and `users.active_loan_count` matches.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.domain.entities import Author, Base, Book, BookCopy, Loan, User
+from app.domain.entities.loan import LoanStatus
+
+WORDS = [
+    "shadow", "river", "garden", "winter", "empire", "silent", "glass", "harbor", "iron", "lantern",
+    "meadow", "north", "orchard", "paper", "quiet", "raven", "salt", "thunder", "velvet", "willow",
+    "amber", "canyon", "ember", "forest", "hollow", "island", "jasmine", "kingdom", "marble", "ocean",
+]
+# A fixed reference time, so due dates and overdue loans do not depend on when the seed ran
+EPOCH = datetime(2026, 1, 1)
+CHUNK_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    users: int
+    authors: int
+    books: int
+    loans: int
+
+    @classmethod
+    def at_scale(cls, scale: float) -> "DatasetSize":
+        return cls(
+            users=max(10, int(1_000 * scale)),
+            authors=max(10, int(200 * scale)),
+            books=max(100, int(5_000 * scale)),
+            loans=max(100, int(20_000 * scale)),
+        )
+
+
+def _insert(conn, model, rows) -> None:
+    for start in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def seed_dataset(engine: Engine, size: DatasetSize, seed: int = 42, now: datetime = EPOCH) -> None:
+    """Recreates the schema on `engine` and fills it. `now` anchors loan and due dates."""
+    rng = random.Random(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    authors = [{"name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}son", "created_at": now}
+               for _ in range(size.authors)]
+    books = [
+        {
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title(),
+            "isbn": f"978-{i:010d}",
+            "is_available": True,
+            "copy_count": 1,
+            "available_count": 1,
+            "author_id": rng.randint(1, size.authors),
+            "created_at": now,
+        }
+        for i in range(size.books)
+    ]
+
+    # About 5% of the history is still open: at most one open loan per book and 3 per user
+    open_target = max(1, size.loans // 20)
+    active_counts = [0] * (size.users + 1)
+    lent = set()
+    loans = []
+    for i in range(size.loans):
+        user_id = rng.randint(1, size.users)
+        book_id = rng.randint(1, size.books)
+        is_open = (
+            open_target > 0 and book_id not in lent and active_counts[user_id] < 3
+            and rng.random() < open_target / (size.loans - i)
+        )
+        # Open loans are recent (about half of them past due), returned ones span a year
+        loan_date = now - timedelta(days=rng.randint(1, 28 if is_open else 365), minutes=i % 1440)
+        due_date = loan_date + timedelta(days=14)
+        if is_open:
+            open_target -= 1
+            lent.add(book_id)
+            active_counts[user_id] += 1
+            status = LoanStatus.OVERDUE if due_date < now else LoanStatus.ACTIVE
+            loans.append({"user_id": user_id, "book_id": book_id, "copy_id": book_id, "loan_date": loan_date,
+                          "due_date": due_date, "return_date": None, "status": status, "late_fee": 0.0})
+        else:
+            returned_at = loan_date + timedelta(days=rng.randint(1, 20))
+            late_days = max(0, (returned_at - due_date).days)
+            loans.append({"user_id": user_id, "book_id": book_id, "copy_id": book_id, "loan_date": loan_date,
+                          "due_date": due_date, "return_date": returned_at, "status": LoanStatus.RETURNED,
+                          "late_fee": late_days * 2.0})
+    for book_id in lent:
+        books[book_id - 1].update(is_available=False, available_count=0)
+    # One copy per book, with the book's id
+    copies = [{"id": i + 1, "book_id": i + 1, "is_available": book["is_available"], "created_at": now}
+              for i, book in enumerate(books)]
+
+    users = [
+        {"name": f"User {i}", "email": f"user{i}@bench.example.com", "hashed_password": "!",
+         "is_active": True, "active_loan_count": active_counts[i], "created_at": now}
+        for i in range(1, size.users + 1)
+    ]
+
+    with engine.begin() as conn:
+        _insert(conn, Author, authors)
+        _insert(conn, Book, books)
+        _insert(conn, BookCopy, copies)
+        _insert(conn, User, users)
+        _insert(conn, Loan, loans)
@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fails the test when a block runs more SQL statements than allowed, to catch N+1 regressions:
+
+        with assert_max_queries(1):
+            client.get("/api/v1/books/")
+    """
+    @contextmanager
+    def _assert_max_queries(max_queries: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+        assert len(statements) <= max_queries, (
+            f"Expected at most {max_queries} queries, got {len(statements)}:\n" + "\n".join(statements)
+        )
+
+    return _assert_max_queries
@@ -1,21 +1,51 @@
 import pytest
+import json
+import os
 import uuid
+import asyncio
+import threading
+import redis
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from unittest.mock import patch
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from unittest.mock import patch, MagicMock
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, READ_ONLY, RoutingSession, get_db, run_db
 from app.core.config import settings
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user, get_redis_client
 from app.domain.entities.user import User
+from app.domain.entities.book import Author, Book, BookCopy
+from app.domain.entities.loan import Loan
+from app.domain.entities.loan_stats import LoanDailyStats
+from app.domain.dtos.loan import LoanCreate
+from app.services.loan_service import loan_service
 from app.core.rate_limit import limiter
+from app.core import cache
+from app.core.auth_cache import auth_cache
+from app.core.security import create_access_token, password_pool
+from app.services.user_service import user_service
+from app.services.book_search_service import book_search_service
+from app.services.overdue_sweeper import OverdueLoanSweeper
+from app.services.counter_reconciler import CounterReconciler
+from app.services.loan_stats_refresher import LoanStatsRefresher
+from app.services.periodic_job import PeriodicJob
+from app.services.book_availability_service import book_availability_service
+from app.core.entity_cache import CacheFamily
+from app.core.metrics import instrument_engine, registry
+from app.core.logger import JsonFormatter
+from app.domain.entities.loan import LoanStatus
 
 # Setup test DB
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# A scratch Postgres database (its schema is DROPPED and recreated) for the tests SQLite cannot run
+POSTGRES_TEST_URL = os.environ.get("POSTGRES_TEST_URL")
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base.metadata.create_all(bind=engine)
@@ -30,7 +60,7 @@ def override_get_db():
 
 
 def override_get_current_user():
-    """Bypasses JWT auth for tests. Controllers do not use current_user for business logic."""
+    """Bypasses JWT auth for tests. Only `PUT /users/{id}` looks at the user (its own id only)."""
     return User(id=999, name="Test Admin", email="testadmin@test.com", hashed_password="", is_active=True)
 
 
@@ -44,11 +74,17 @@ client = TestClient(app)
 def reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-    # Reset rate limiter counters so tests don't bleed into each other
-    try:
-        limiter._storage.reset()
-    except Exception:
-        pass
+    # Reset rate limiter counters (Redis, and the in-memory fallback used while Redis is down)
+    for storage in (limiter._storage, limiter._fallback_storage):
+        try:
+            storage.reset()
+        except Exception:
+            pass
+    auth_cache.clear()
+    book_search_service.reset()
+    book_availability_service.reset()
+    for family in CacheFamily.registry.values():
+        family.reset()
     yield
 
 
@@ -85,7 +121,9 @@ def create_loan(user_id, book_id):
 def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    data = response.json()
+    assert data["status"] == "ok"
+    assert data["redis"]["circuit_open"] is False
 
 
 def test_create_user():
@@ -129,6 +167,17 @@ def test_create_author_and_book():
     assert book["author"]["name"] == "George Orwell"
 
 
+def test_create_book_availability_follows_its_copies():
+    author = create_author()
+    resp = client.post(
+        f"{settings.API_V1_STR}/books/",
+        json={"title": "X", "author_id": author["id"], "copies": 2, "is_available": False},
+    )
+    assert resp.status_code == 200, resp.text
+    book = resp.json()
+    assert (book["is_available"], book["copy_count"], book["available_count"]) == (True, 2, 2)
+
+
 def test_create_book_duplicate_isbn():
     author = create_author()
     isbn = f"ISBN-{uuid.uuid4().hex[:8]}"
@@ -206,6 +255,26 @@ def test_loan_max_active_limit():
     assert resp.status_code == 400
     assert "maximum" in resp.json()["detail"].lower()
 
+    # An overdue loan still counts, whether or not the sweep has marked it OVERDUE yet
+    db = TestingSessionLocal()
+    loan = db.scalars(select(Loan).where(Loan.user_id == user["id"])).first()
+    loan.due_date = datetime.utcnow() - timedelta(days=1)
+    db.commit()
+    overdue_id = loan.id
+    batch = client.post(f"{settings.API_V1_STR}/loans/batch", json={"user_id": user["id"], "book_ids": [extra_book["id"]]})
+    assert batch.status_code == 400
+    assert OverdueLoanSweeper(interval_seconds=0).sweep(db) == 1
+    db.close()
+    batch = client.post(f"{settings.API_V1_STR}/loans/batch", json={"user_id": user["id"], "book_ids": [extra_book["id"]]})
+    assert batch.status_code == 400
+
+    # Returning the OVERDUE loan frees its slot
+    client.post(f"{settings.API_V1_STR}/loans/{overdue_id}/return")
+    create_loan(user["id"], extra_book["id"])
+    db = TestingSessionLocal()
+    assert db.get(User, user["id"]).active_loan_count == 3
+    db.close()
+
 
 def test_late_fee_calculation():
     """Validates that returning an overdue loan persists the correct late_fee."""
@@ -228,6 +297,49 @@ def test_late_fee_calculation():
     assert data["late_fee"] == 3 * 2.0  # R$ 6.00
 
 
+def test_batch_checkout_and_return(assert_max_queries):
+    user = create_user()
+    author = create_author()
+    books = [create_book(author["id"], f"Book {i}") for i in range(3)]
+    url = f"{settings.API_V1_STR}/loans/batch"
+
+    # Slots, copies, loans, the books' available counts and the daily loan stats: one statement each
+    with assert_max_queries(6):
+        resp = client.post(url, json={"user_id": user["id"], "book_ids": [books[0]["id"], books[1]["id"]]})
+    assert resp.status_code == 200, resp.text
+    loans = resp.json()
+    assert [loan["book_id"] for loan in loans] == [books[0]["id"], books[1]["id"]]
+    assert all(loan["status"] == "ACTIVE" for loan in loans)
+
+    # All or none: a basket over the limit, with a lent book or with an unknown book claims nothing
+    resp = client.post(url, json={"user_id": user["id"], "book_ids": [books[2]["id"], create_book(author["id"])["id"]]})
+    assert resp.status_code == 400 and "maximum" in resp.json()["detail"]
+    user2 = create_user()
+    resp = client.post(url, json={"user_id": user2["id"], "book_ids": [books[2]["id"], books[0]["id"]]})
+    assert resp.status_code == 400 and resp.json()["detail"] == f"Books not available for loan: [{books[0]['id']}]"
+    resp = client.post(url, json={"user_id": user2["id"], "book_ids": [books[2]["id"], 999999]})
+    assert resp.status_code == 404
+    assert client.get(f"{settings.API_V1_STR}/books/{books[2]['id']}/availability").json()["is_available"] is True
+    assert client.post(url, json={"user_id": user2["id"], "book_ids": [1, 1]}).status_code == 422
+
+    # One return is 3 days late (R$ 6.00), the other is on time
+    db = TestingSessionLocal()
+    db.get(Loan, loans[0]["id"]).due_date = datetime.utcnow() - timedelta(days=3, hours=1)
+    db.commit()
+    db.close()
+    with assert_max_queries(7):
+        resp = client.post(f"{settings.API_V1_STR}/loans/return/batch", json={"loan_ids": [loan["id"] for loan in loans]})
+    assert resp.status_code == 200, resp.text
+    assert [(loan["status"], loan["late_fee"]) for loan in resp.json()] == [("RETURNED", 6.0), ("RETURNED", 0.0)]
+    resp = client.post(f"{settings.API_V1_STR}/loans/return/batch", json={"loan_ids": [loans[1]["id"]]})
+    assert resp.status_code == 400
+
+    db = TestingSessionLocal()
+    assert db.get(User, user["id"]).active_loan_count == 0
+    assert all(db.get(Book, book["id"]).is_available for book in books)
+    db.close()
+
+
 def test_user_loan_history():
     user = create_user()
     author = create_author()
@@ -252,3 +364,998 @@ def test_list_active_loans():
     resp = client.get(f"{settings.API_V1_STR}/loans/active-delayed")
     assert resp.status_code == 200
     assert len(resp.json()) >= 1
+
+
+def insert_loans(due_dates):
+    """Inserts ACTIVE loans with the given due dates directly, returning their ids."""
+    user = create_user()
+    author = create_author()
+    book_ids = [create_book(author["id"])["id"] for _ in due_dates]
+    with engine.begin() as conn:
+        return [
+            conn.execute(insert(Loan).values(
+                user_id=user["id"], book_id=book_id, loan_date=datetime.utcnow(),
+                due_date=due_date, status=LoanStatus.ACTIVE, late_fee=0.0,
+            )).inserted_primary_key[0]
+            for book_id, due_date in zip(book_ids, due_dates)
+        ]
+
+
+def loan_statuses():
+    db = TestingSessionLocal()
+    try:
+        return {loan.id: loan.status for loan in db.query(Loan).all()}
+    finally:
+        db.close()
+
+
+def test_active_delayed_derives_overdue_without_writing(assert_max_queries):
+    now = datetime.utcnow()
+    late_id, on_time_id = insert_loans([now - timedelta(days=1), now + timedelta(days=1)])
+
+    with assert_max_queries(1):
+        resp = client.get(f"{settings.API_V1_STR}/loans/active-delayed")
+    statuses = {loan["id"]: loan["status"] for loan in resp.json()}
+    assert statuses == {late_id: "OVERDUE", on_time_id: "ACTIVE"}
+    # Nothing was persisted by the read
+    assert loan_statuses()[late_id] == LoanStatus.ACTIVE
+
+
+def test_overdue_sweeper_only_touches_newly_overdue_loans():
+    now = datetime.utcnow()
+    old_id, recent_id, future_id = insert_loans([now - timedelta(days=10), now - timedelta(hours=1), now + timedelta(days=1)])
+    sweeper = OverdueLoanSweeper(interval_seconds=0)
+    db = TestingSessionLocal()
+    try:
+        assert sweeper.sweep(db, now=now - timedelta(days=1)) == 1
+        # A loan that fell due before the watermark is outside every later sweep window
+        db.query(Loan).filter(Loan.id == old_id).update({"status": LoanStatus.ACTIVE})
+        db.commit()
+        assert sweeper.sweep(db, now=now) == 1
+    finally:
+        db.close()
+
+    statuses = loan_statuses()
+    assert statuses[recent_id] == LoanStatus.OVERDUE
+    assert statuses[old_id] == LoanStatus.ACTIVE
+    assert statuses[future_id] == LoanStatus.ACTIVE
+    assert sweeper.stats()["total_swept"] == 2
+
+
+def test_periodic_job_keeps_running_after_a_failed_run():
+    results = []
+
+    class FlakyJob(PeriodicJob):
+        RUN_AT_STARTUP = True
+
+        def run(self, db):
+            if not results:
+                results.append("failed")
+                raise RuntimeError("boom")
+            return "ok"
+
+        def on_result(self, result):
+            results.append(result)
+
+    async def run_job():
+        job = FlakyJob(interval_seconds=0.01)
+        job.start()
+        while len(results) < 2:
+            await asyncio.sleep(0.01)
+        assert job.stats() == {"running": True}
+        await job.stop()
+        assert job.stats() == {"running": False}
+
+    asyncio.run(asyncio.wait_for(run_job(), timeout=5))
+    assert results[:2] == ["failed", "ok"]
+
+
+def test_accrued_fines_per_user_and_author(assert_max_queries):
+    now = datetime.utcnow()
+    late = insert_loans([now - timedelta(days=3, hours=5), now - timedelta(days=1, hours=1), now + timedelta(days=5)])
+    very_late = insert_loans([now - timedelta(days=10, hours=1)])
+    # A returned loan owes nothing more
+    returned = insert_loans([now - timedelta(days=30)])
+    assert client.post(f"{settings.API_V1_STR}/loans/{returned[0]}/return").status_code == 200
+
+    db = TestingSessionLocal()
+    late_user, very_late_user = (db.get(Loan, ids[0]).user for ids in (late, very_late))
+    late_author, very_late_author = (db.get(Loan, ids[0]).book.author for ids in (late, very_late))
+    db.close()
+
+    with assert_max_queries(1):
+        by_user = client.get(f"{settings.API_V1_STR}/loans/fines")
+    assert by_user.status_code == 200
+    assert by_user.json() == [
+        {"id": very_late_user.id, "name": very_late_user.name, "overdue_loans": 1, "days_late": 10, "fines": 20.0},
+        {"id": late_user.id, "name": late_user.name, "overdue_loans": 2, "days_late": 4, "fines": 8.0},
+    ]
+    by_author = client.get(f"{settings.API_V1_STR}/loans/fines", params={"group_by": "author"}).json()
+    assert [(row["id"], row["fines"]) for row in by_author] == [(very_late_author.id, 20.0), (late_author.id, 8.0)]
+    assert client.get(f"{settings.API_V1_STR}/loans/fines", params={"group_by": "book"}).status_code == 422
+
+    del app.dependency_overrides[get_current_user]
+    try:
+        assert client.get(f"{settings.API_V1_STR}/loans/fines").status_code == 401
+    finally:
+        app.dependency_overrides[get_current_user] = override_get_current_user
+
+
+def test_export_loans_books_and_users_as_csv_and_ndjson(assert_max_queries):
+    now = datetime.utcnow()
+    open_ids = insert_loans([now + timedelta(days=5), now - timedelta(days=2)])
+    returned = insert_loans([now + timedelta(days=1)])
+    assert client.post(f"{settings.API_V1_STR}/loans/{returned[0]}/return").status_code == 200
+
+    with assert_max_queries(1):
+        resp = client.get(f"{settings.API_V1_STR}/loans/export", params={"status": ["ACTIVE", "OVERDUE"]})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert resp.headers["content-disposition"] == 'attachment; filename="loans.csv"'
+    lines = resp.text.splitlines()
+    assert lines[0] == "id,user_id,book_id,loan_date,due_date,return_date,status,late_fee"
+    assert [int(line.split(",")[0]) for line in lines[1:]] == open_ids
+    assert lines[1].split(",")[5:] == ["", "ACTIVE", "0.0"]
+
+    resp = client.get(f"{settings.API_V1_STR}/loans/export", params={"format": "ndjson", "status": "RETURNED"})
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    (row,) = [json.loads(line) for line in resp.text.splitlines()]
+    assert row["id"] == returned[0] and row["status"] == "RETURNED"
+    assert datetime.fromisoformat(row["return_date"]) >= now
+
+    books = client.get(f"{settings.API_V1_STR}/books/export", params={"format": "ndjson"}).text.splitlines()
+    assert json.loads(books[0]).keys() == {"id", "title", "isbn", "is_available", "copy_count", "available_count", "author_id", "author_name"}
+    assert len(books) == 3
+    users = [json.loads(line) for line in client.get(f"{settings.API_V1_STR}/users/export", params={"format": "ndjson"}).text.splitlines()]
+    assert len(users) == 2 and all("hashed_password" not in user for user in users)
+    assert client.get(f"{settings.API_V1_STR}/users/export", params={"format": "xml"}).status_code == 422
+
+
+def test_stats_from_daily_aggregates_rebuilt_and_cached(assert_max_queries):
+    fakeredis = pytest.importorskip("fakeredis")
+    user, user2 = create_user(), create_user()
+    orwell, austen = create_author("Orwell"), create_author("Austen")
+    b1984, farm = create_book(orwell["id"], "1984"), create_book(orwell["id"], "Animal Farm")
+    emma = create_book(austen["id"], "Emma")
+
+    first = create_loan(user["id"], b1984["id"])
+    client.post(f"{settings.API_V1_STR}/loans/batch", json={"user_id": user2["id"], "book_ids": [farm["id"], emma["id"]]})
+    db = TestingSessionLocal()
+    db.get(Loan, first["id"]).due_date = datetime.utcnow() - timedelta(days=1)
+    db.commit()
+    db.close()
+    client.post(f"{settings.API_V1_STR}/loans/{first['id']}/return")
+    create_loan(user2["id"], b1984["id"])
+    # A loan from before the table was maintained only shows up once the past days are rebuilt
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(Loan).values(
+            user_id=user["id"], book_id=emma["id"], loan_date=yesterday, due_date=yesterday,
+            return_date=yesterday, status=LoanStatus.RETURNED, late_fee=0.0,
+        ))
+
+    url = f"{settings.API_V1_STR}/stats"
+    with assert_max_queries(1):
+        top_books = client.get(f"{url}/books/top").json()
+    assert [(row["title"], row["checkouts"]) for row in top_books] == [("1984", 2), ("Animal Farm", 1), ("Emma", 1)]
+    assert client.get(f"{url}/authors/active-loans").json() == [
+        {"id": orwell["id"], "name": "Orwell", "active_loans": 2},
+        {"id": austen["id"], "name": "Austen", "active_loans": 1},
+    ]
+    (today,) = client.get(f"{url}/overdue-rate").json()
+    assert today == {"day": datetime.utcnow().date().isoformat(), "checkouts": 4, "returns": 1, "late_returns": 1, "overdue_rate": 1.0}
+
+    db = TestingSessionLocal()
+    assert LoanStatsRefresher().refresh(db) == 1
+    db.close()
+    days = client.get(f"{url}/overdue-rate", params={"days": 2}).json()
+    assert [(row["checkouts"], row["returns"], row["late_returns"]) for row in days] == [(1, 1, 0), (4, 1, 1)]
+    top_authors = client.get(f"{url}/authors/top", params={"days": 2}).json()
+    assert [(row["name"], row["checkouts"]) for row in top_authors] == [("Orwell", 3), ("Austen", 2)]
+
+    with patch.object(cache, "redis_client", fakeredis.FakeRedis()):
+        first = client.get(f"{url}/books/top")
+        with assert_max_queries(0):
+            cached = client.get(f"{url}/books/top")
+    assert cached.content == first.content
+    assert [(row["title"], row["checkouts"]) for row in cached.json()] == [("1984", 2), ("Emma", 2), ("Animal Farm", 1)]
+    assert client.get(f"{url}/books/top", params={"days": 0}).status_code == 422
+
+
+def test_loan_stats_rebuild_only_touches_recent_days():
+    user = create_user()
+    book = create_book(create_author()["id"])
+    today = datetime.utcnow().date()
+    with engine.begin() as conn:
+        for days_ago in (2, 30):
+            day = datetime.utcnow() - timedelta(days=days_ago)
+            conn.execute(insert(Loan).values(
+                user_id=user["id"], book_id=book["id"], loan_date=day, due_date=day + timedelta(days=14),
+                return_date=day, status=LoanStatus.RETURNED, late_fee=0.0,
+            ))
+
+    def rebuilt_days():
+        db = TestingSessionLocal()
+        try:
+            return sorted((today - day).days for day in db.scalars(select(LoanDailyStats.day)))
+        finally:
+            db.close()
+
+    db = TestingSessionLocal()
+    assert LoanStatsRefresher(days=7).refresh(db) == 1
+    assert rebuilt_days() == [2]
+    assert LoanStatsRefresher(days=7).refresh(db, since=today - timedelta(days=60)) == 2
+    db.close()
+    assert rebuilt_days() == [2, 30]
+
+
+def test_concurrent_checkouts_of_one_book_only_one_wins():
+    author = create_author()
+    book = create_book(author["id"])
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": f"Patron {i}", "email": f"patron{i}@example.com", "hashed_password": "x", "is_active": True}
+            for i in range(200)
+        ])
+        user_ids = [row.id for row in conn.execute(User.__table__.select())]
+
+    def checkout(user_id):
+        db = TestingSessionLocal()
+        try:
+            loan_service.create_loan(db, LoanCreate(user_id=user_id, book_id=book["id"]))
+            return 200
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(checkout, user_ids))
+
+    assert results.count(200) == 1
+    assert results.count(400) == len(user_ids) - 1
+    db = TestingSessionLocal()
+    assert db.query(Loan).filter(Loan.book_id == book["id"]).count() == 1
+    assert db.get(Book, book["id"]).is_available is False
+    db.close()
+
+
+def test_concurrent_checkouts_of_a_multi_copy_book_take_every_copy_once():
+    author = create_author()
+    resp = client.post(f"{settings.API_V1_STR}/books/", json={"title": "Popular", "author_id": author["id"], "copies": 3})
+    book = resp.json()
+    assert (book["copy_count"], book["available_count"], book["is_available"]) == (3, 3, True)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": f"Borrower {i}", "email": f"borrower{i}@example.com", "hashed_password": "x", "is_active": True}
+            for i in range(50)
+        ])
+        user_ids = [row.id for row in conn.execute(select(User.id).where(User.email.like("borrower%")))]
+
+    def checkout(user_id):
+        db = TestingSessionLocal()
+        try:
+            return loan_service.create_loan(db, LoanCreate(user_id=user_id, book_id=book["id"])).copy_id
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(checkout, user_ids))
+    copy_ids = [result for result in results if result != 400]
+    assert len(copy_ids) == len(set(copy_ids)) == 3
+    url = f"{settings.API_V1_STR}/books/{book['id']}"
+    assert client.get(f"{url}/availability").json()["is_available"] is False
+
+    # Two copies come back in one batch, the third on its own
+    db = TestingSessionLocal()
+    loan_ids = list(db.scalars(select(Loan.id).where(Loan.book_id == book["id"])))
+    db.close()
+    assert client.post(f"{settings.API_V1_STR}/loans/return/batch", json={"loan_ids": loan_ids[:2]}).status_code == 200
+    assert (client.get(url).json()["available_count"], client.get(f"{url}/availability").json()["is_available"]) == (2, True)
+    assert client.post(f"{settings.API_V1_STR}/loans/{loan_ids[2]}/return").status_code == 200
+
+    book = client.post(f"{url}/copies", json={"count": 2}).json()
+    assert (book["copy_count"], book["available_count"]) == (5, 5)
+    assert client.post(f"{settings.API_V1_STR}/books/999999/copies", json={"count": 1}).status_code == 404
+    db = TestingSessionLocal()
+    try:
+        report = CounterReconciler(interval_seconds=0).reconcile(db, fix=False)
+        assert report["books_availability_drifted"] == 0
+    finally:
+        db.close()
+
+
+@pytest.mark.skipif(POSTGRES_TEST_URL is None, reason="set POSTGRES_TEST_URL to a scratch Postgres database")
+def test_concurrent_checkouts_on_postgres_lend_each_copy_once():
+    """SQLite serializes writers; on Postgres checkouts of one title really claim copies concurrently."""
+    pg_engine = create_engine(POSTGRES_TEST_URL, pool_size=50, max_overflow=0)
+    Base.metadata.drop_all(bind=pg_engine)
+    Base.metadata.create_all(bind=pg_engine)
+    PgSession = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)
+    titles, copies, borrowers = 4, 5, 25
+    with pg_engine.begin() as conn:
+        conn.execute(insert(Author), [{"name": "Popular Author"}])
+        conn.execute(insert(Book), [
+            {"title": f"Popular {i}", "isbn": f"PG-{i}", "is_available": True,
+             "copy_count": copies, "available_count": copies, "author_id": 1}
+            for i in range(titles)
+        ])
+        conn.execute(insert(BookCopy), [
+            {"book_id": book_id, "is_available": True} for book_id in range(1, titles + 1) for _ in range(copies)
+        ])
+        conn.execute(insert(User), [
+            {"name": f"Borrower {i}", "email": f"borrower{i}@example.com", "hashed_password": "x", "is_active": True}
+            for i in range(titles * borrowers)
+        ])
+
+    # Every round of 50 borrowers starts at once, the first one on cold statement caches too
+    start = threading.Barrier(50)
+
+    def checkout(i):
+        db = PgSession()
+        start.wait()
+        try:
+            loan_service.create_loan(db, LoanCreate(user_id=i + 1, book_id=i % titles + 1))
+            return 200
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            results = list(pool.map(checkout, range(titles * borrowers)))
+        assert results.count(200) == titles * copies
+        assert results.count(400) == titles * (borrowers - copies)
+        db = PgSession()
+        try:
+            lent = db.execute(select(Loan.book_id, BookCopy.book_id, Loan.copy_id).join(BookCopy, Loan.copy_id == BookCopy.id)).all()
+            assert len(lent) == len({copy_id for _, _, copy_id in lent}) == titles * copies
+            assert all(loan_book == copy_book for loan_book, copy_book, _ in lent)
+            assert db.scalar(select(func.count()).select_from(BookCopy).where(BookCopy.is_available == True)) == 0
+            assert db.scalar(select(func.sum(Book.available_count))) == 0
+        finally:
+            db.close()
+    finally:
+        Base.metadata.drop_all(bind=pg_engine)
+        pg_engine.dispose()
+
+
+# ─── keyset pagination ────────────────────────────────────────────────────────
+
+def collect_pages(path, limit):
+    """Walks a keyset-paginated endpoint by following the X-Next-Cursor header."""
+    items, params = [], {"limit": limit}
+    while True:
+        resp = client.get(path, params=params)
+        assert resp.status_code == 200, resp.text
+        items.extend(resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+        params = {"limit": limit, "after": cursor}
+
+
+def test_list_users_keyset_pagination():
+    user_ids = [create_user()["id"] for _ in range(5)]
+
+    users = collect_pages(f"{settings.API_V1_STR}/users/", limit=2)
+    assert [u["id"] for u in users] == user_ids
+
+
+def test_list_books_keyset_pagination():
+    author = create_author()
+    book_ids = [create_book(author["id"])["id"] for _ in range(5)]
+
+    books = collect_pages(f"{settings.API_V1_STR}/books/", limit=2)
+    assert [b["id"] for b in books] == book_ids
+
+
+def test_user_loans_keyset_pagination():
+    user = create_user()
+    author = create_author()
+    loan_ids = [create_loan(user["id"], create_book(author["id"])["id"])["id"] for _ in range(3)]
+
+    loans = collect_pages(f"{settings.API_V1_STR}/users/{user['id']}/loans", limit=1)
+    assert [l["id"] for l in loans] == loan_ids
+
+
+def test_invalid_pagination_cursor():
+    resp = client.get(f"{settings.API_V1_STR}/users/", params={"after": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+# ─── book list cache ──────────────────────────────────────────────────────────
+
+def test_book_cache_invalidation_bumps_generation():
+    fake_redis = MagicMock()
+    fake_redis.get.return_value = None
+    app.dependency_overrides[get_redis_client] = lambda: fake_redis
+    try:
+        author = create_author()
+        create_book(author["id"])
+        client.get(f"{settings.API_V1_STR}/books/", params={"skip": 0, "limit": 10})
+    finally:
+        del app.dependency_overrides[get_redis_client]
+
+    fake_redis.incr.assert_called_once_with("books_list:gen")
+    fake_redis.keys.assert_not_called()
+    fake_redis.delete.assert_not_called()
+    cache_key = fake_redis.setex.call_args[0][0]
+    assert cache_key == "books_list:0:0:10"
+
+
+def test_book_pages_cache_ids_and_books_per_entity(assert_max_queries):
+    fakeredis = pytest.importorskip("fakeredis")
+    with patch.object(cache, "redis_client", fakeredis.FakeRedis()):
+        user = create_user()
+        author = create_author()
+        books = [create_book(author["id"], f"Book {i}") for i in range(3)]
+        url = f"{settings.API_V1_STR}/books/"
+        first = client.get(url)
+
+        with assert_max_queries(0):
+            cached = client.get(url)
+        assert [b["title"] for b in cached.json()] == ["Book 0", "Book 1", "Book 2"]
+        # The hit splices the cached books' JSON: byte for byte what the miss serialized
+        assert cached.content == first.content
+        assert cached.headers["ETag"] == first.headers["ETag"]
+
+        # A new book re-reads the page's ids only; the cached books are reused
+        create_book(author["id"], "Book 3")
+        with assert_max_queries(2) as statements:
+            resp = client.get(url)
+        assert len(resp.json()) == 4
+        assert "JOIN" not in statements[0]
+
+        # Checkout drops the book's entry, so the detail shows the new availability
+        create_loan(user["id"], books[0]["id"])
+        assert client.get(f"{url}{books[0]['id']}").json()["is_available"] is False
+
+        health = client.get("/health").json()["cache"]
+    assert health["books_list"]["hits"] == 1
+    assert health["book"]["hits"] >= 6
+
+
+def test_redis_failure_opens_circuit_breaker():
+    author = create_author()
+    create_book(author["id"])
+
+    broken_redis = MagicMock()
+    broken_redis.get.side_effect = redis.ConnectionError("connection refused")
+    with patch.object(cache, "redis_client", broken_redis), \
+            patch.object(cache, "redis_breaker", cache.RedisCircuitBreaker(cooldown_seconds=60)) as breaker:
+        first = client.get(f"{settings.API_V1_STR}/books/")
+        second = client.get(f"{settings.API_V1_STR}/books/")
+        health = client.get("/health").json()
+
+    # Both requests fall back to the database; only the first one touches Redis
+    assert first.status_code == 200 and len(first.json()) == 1
+    assert second.status_code == 200 and len(second.json()) == 1
+    assert broken_redis.get.call_count == 1
+    assert breaker.failures == 1
+    assert health["redis"]["circuit_open"] is True
+
+
+# ─── ETags ────────────────────────────────────────────────────────────────────
+
+def test_book_etag_not_modified_until_changed():
+    user = create_user()
+    author = create_author()
+    book = create_book(author["id"])
+    url = f"{settings.API_V1_STR}/books/{book['id']}"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.json()["author"]["id"] == author["id"]
+    etag = first.headers["ETag"]
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    create_loan(user["id"], book["id"])
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert client.get(f"{settings.API_V1_STR}/books/99999").status_code == 404
+
+
+def test_author_user_and_list_etags():
+    user = create_user()
+    author = create_author()
+    for url in (
+        f"{settings.API_V1_STR}/books/authors/{author['id']}",
+        f"{settings.API_V1_STR}/users/{user['id']}",
+        f"{settings.API_V1_STR}/users/",
+    ):
+        etag = client.get(url).headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    # List responses keep their pagination header
+    resp = client.get(f"{settings.API_V1_STR}/users/", params={"limit": 1})
+    assert "X-Next-Cursor" in resp.headers
+    assert client.get(f"{settings.API_V1_STR}/books/authors/99999").status_code == 404
+
+
+# ─── async request path ───────────────────────────────────────────────────────
+
+def test_async_mode_reads_natively_and_writes_through_run_sync():
+    """DB_ASYNC_MODE hands requests an AsyncSession (aiosqlite here): reads are awaited natively."""
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+
+    async def override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_async_db
+    try:
+        # Writes still run the sync services, on the AsyncSession's sync side
+        user = create_user()
+        author = create_author("Ursula K. Le Guin")
+        book = create_book(author["id"], "The Dispossessed")
+        loan = create_loan(user["id"], book["id"])
+
+        with patch.object(AsyncSession, "run_sync", side_effect=AssertionError("read went through run_sync")):
+            books = client.get(f"{settings.API_V1_STR}/books/").json()
+            assert [(b["id"], b["author"]["name"]) for b in books] == [(book["id"], "Ursula K. Le Guin")]
+            assert client.get(f"{settings.API_V1_STR}/books/{book['id']}").json()["title"] == "The Dispossessed"
+            assert client.get(f"{settings.API_V1_STR}/books/{book['id']}/availability").json()["is_available"] is False
+            assert [a["id"] for a in client.get(f"{settings.API_V1_STR}/books/authors/").json()] == [author["id"]]
+            assert client.get(f"{settings.API_V1_STR}/books/authors/{author['id']}").json()["name"] == "Ursula K. Le Guin"
+            assert client.get(f"{settings.API_V1_STR}/users/{user['id']}").json()["email"] == user["email"]
+            assert [u["id"] for u in client.get(f"{settings.API_V1_STR}/users/").json()] == [user["id"]]
+            assert [l["id"] for l in client.get(f"{settings.API_V1_STR}/users/{user['id']}/loans").json()] == [loan["id"]]
+            assert [l["id"] for l in client.get(f"{settings.API_V1_STR}/loans/active-delayed").json()] == [loan["id"]]
+            assert client.get(f"{settings.API_V1_STR}/users/99999").status_code == 404
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        asyncio.run(async_engine.dispose())
+
+
+# ─── read replica ─────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def replica(tmp_path):
+    """
+    Routes the app's sessions like production with a replica: a second SQLite database that only
+    receives what the test copies into it, so a read shows which database answered.
+    """
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=replica_engine)
+    RoutingSessionLocal = sessionmaker(class_=RoutingSession, autoflush=False, bind=engine, replica=replica_engine)
+
+    def override_routing_db():
+        db = RoutingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_routing_db
+    try:
+        yield replica_engine
+    finally:
+        app.dependency_overrides[get_db] = override_get_db
+        replica_engine.dispose()
+
+
+def test_read_only_calls_use_replica_and_writes_primary(replica):
+    user = create_user("Primary Name")
+    # Not replicated yet: list and detail reads answer from the replica
+    assert client.get(f"{settings.API_V1_STR}/users/").json() == []
+    assert client.get(f"{settings.API_V1_STR}/users/{user['id']}").status_code == 404
+
+    with replica.begin() as conn:
+        conn.execute(insert(User), [{"id": user["id"], "name": "Replica Name", "email": user["email"],
+                                     "hashed_password": "!", "is_active": True}])
+    assert client.get(f"{settings.API_V1_STR}/users/{user['id']}").json()["name"] == "Replica Name"
+
+    # Writes (and the reads inside them) stay on the primary
+    app.dependency_overrides[get_current_user] = lambda: User(id=user["id"], name=user["name"], email=user["email"], is_active=True)
+    try:
+        resp = client.put(f"{settings.API_V1_STR}/users/{user['id']}", json={"name": "Renamed"})
+    finally:
+        app.dependency_overrides[get_current_user] = override_get_current_user
+    assert resp.status_code == 200 and resp.json()["name"] == "Renamed"
+    db = TestingSessionLocal()
+    assert db.get(User, user["id"]).name == "Renamed"
+    db.close()
+
+    # Stats are cached in Redis, so they are read from the primary too
+    book = create_book(create_author()["id"], "Primary Only")
+    create_loan(user["id"], book["id"])
+    top_books = client.get(f"{settings.API_V1_STR}/stats/books/top").json()
+    assert [(row["title"], row["checkouts"]) for row in top_books] == [("Primary Only", 1)]
+
+    session = RoutingSession(bind=engine, replica=replica)
+    session.info[READ_ONLY] = True
+    assert session.get_bind(clause=select(User)) is replica
+    assert session.get_bind(clause=select(User).with_for_update()) is engine
+    session.info[READ_ONLY] = False
+    assert session.get_bind(clause=select(User)) is engine
+    session.close()
+
+
+def test_read_only_calls_retried_once_after_disconnect():
+    calls = []
+
+    def flaky(session):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("SELECT 1", {}, Exception("server closed the connection"), connection_invalidated=True)
+        return "ok"
+
+    assert asyncio.run(run_db(TestingSessionLocal(), flaky, read_only=True)) == "ok"
+    assert len(calls) == 2
+
+    calls.clear()
+    with pytest.raises(OperationalError):
+        asyncio.run(run_db(TestingSessionLocal(), flaky))
+    assert len(calls) == 1
+
+
+# ─── query counts ─────────────────────────────────────────────────────────────
+
+def test_list_books_loads_authors_in_one_query(assert_max_queries):
+    for i in range(5):
+        author = create_author(f"Author {i}")
+        create_book(author["id"])
+
+    with assert_max_queries(1):
+        resp = client.get(f"{settings.API_V1_STR}/books/", params={"limit": 5})
+    assert resp.status_code == 200
+    assert len({b["author"]["id"] for b in resp.json()}) == 5
+
+
+def test_book_availability_single_query(assert_max_queries):
+    author = create_author()
+    book = create_book(author["id"])
+
+    with assert_max_queries(1):
+        resp = client.get(f"{settings.API_V1_STR}/books/{book['id']}/availability")
+    assert resp.json()["is_available"] is True
+
+
+def test_batch_availability():
+    user = create_user()
+    author = create_author()
+    lent, free = create_book(author["id"]), create_book(author["id"])
+    create_loan(user["id"], lent["id"])
+
+    resp = client.post(f"{settings.API_V1_STR}/books/availability", json={"book_ids": [lent["id"], free["id"], 99999]})
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "items": [{"book_id": lent["id"], "is_available": False}, {"book_id": free["id"], "is_available": True}],
+        "not_found": [99999],
+    }
+    assert client.get(f"{settings.API_V1_STR}/books/99999/availability").status_code == 404
+
+
+def test_availability_served_from_redis_without_queries(assert_max_queries):
+    fakeredis = pytest.importorskip("fakeredis")
+    with patch.object(cache, "redis_client", fakeredis.FakeRedis()):
+        user = create_user()
+        author = create_author()
+        books = [create_book(author["id"]) for _ in range(3)]
+        loan = create_loan(user["id"], books[0]["id"])
+        book_ids = [book["id"] for book in books]
+
+        with assert_max_queries(0):
+            resp = client.post(f"{settings.API_V1_STR}/books/availability", json={"book_ids": book_ids})
+        assert [item["is_available"] for item in resp.json()["items"]] == [False, True, True]
+
+        client.post(f"{settings.API_V1_STR}/loans/{loan['id']}/return")
+        with assert_max_queries(0):
+            resp = client.get(f"{settings.API_V1_STR}/books/{book_ids[0]}/availability")
+        assert resp.json()["is_available"] is True
+
+        # A lookup's fill (read before a checkout committed) never overwrites the checkout's write
+        redis_client = cache.redis_client
+        book_availability_service.write(redis_client, {book_ids[1]: False})
+        book_availability_service.fill(redis_client, {book_ids[1]: True, 424242: True})
+        assert book_availability_service.read(redis_client, [book_ids[1], 424242]) == {
+            book_ids[1]: book_availability_service.LENT, 424242: book_availability_service.AVAILABLE,
+        }
+
+
+def test_returning_a_loan_without_a_copy_keeps_the_book_lent(assert_max_queries):
+    fakeredis = pytest.importorskip("fakeredis")
+    with patch.object(cache, "redis_client", fakeredis.FakeRedis()):
+        user = create_user()
+        book = create_book(create_author()["id"])
+        create_loan(user["id"], book["id"])
+        # A loan from before book copies: it holds the user's slot but no copy
+        db = TestingSessionLocal()
+        legacy = Loan(user_id=user["id"], book_id=book["id"], due_date=datetime.utcnow() + timedelta(days=14))
+        db.add(legacy)
+        db.commit()
+        legacy_id = legacy.id
+        db.close()
+
+        assert client.post(f"{settings.API_V1_STR}/loans/{legacy_id}/return").status_code == 200
+        with assert_max_queries(0):
+            resp = client.get(f"{settings.API_V1_STR}/books/{book['id']}/availability")
+        assert resp.json()["is_available"] is False
+
+
+def test_counter_reconciliation_fixes_drift():
+    user = create_user()
+    author = create_author()
+    book = create_book(author["id"])
+    create_loan(user["id"], book["id"])
+    with engine.begin() as conn:
+        conn.execute(User.__table__.update().values(active_loan_count=3))
+        conn.execute(Book.__table__.update().values(is_available=True))
+
+    reconciler = CounterReconciler(interval_seconds=0)
+    db = TestingSessionLocal()
+    try:
+        report = reconciler.reconcile(db, fix=False)
+        assert (report["user_counts_drifted"], report["books_availability_drifted"]) == (1, 1)
+        reconciler.reconcile(db)
+        report = reconciler.reconcile(db, fix=False)
+        assert (report["user_counts_drifted"], report["books_availability_drifted"]) == (0, 0)
+        assert db.get(User, user["id"]).active_loan_count == 1
+    finally:
+        db.close()
+
+    # The repaired counter lets the user borrow again
+    create_loan(user["id"], create_book(author["id"])["id"])
+    avail = client.get(f"{settings.API_V1_STR}/books/{book['id']}/availability")
+    assert avail.json()["is_available"] is False
+
+
+def test_counter_reconciliation_keeps_cache_writes_made_during_the_scan():
+    fakeredis = pytest.importorskip("fakeredis")
+    with patch.object(cache, "redis_client", fakeredis.FakeRedis()):
+        user = create_user()
+        book = create_book(create_author()["id"])
+        redis_client = cache.redis_client
+        book_availability_service.write(redis_client, {book["id"]: False})
+
+        # A checkout commits after the unlocked scan saw the book available, before the cache fix
+        read = book_availability_service.read
+        def read_then_checkout(*args):
+            values = read(*args)
+            create_loan(user["id"], book["id"])
+            return values
+
+        db = TestingSessionLocal()
+        try:
+            with patch.object(book_availability_service, "read", read_then_checkout):
+                CounterReconciler(interval_seconds=0).reconcile(db)
+        finally:
+            db.close()
+        assert book_availability_service.read(redis_client, [book["id"]]) == {book["id"]: book_availability_service.LENT}
+
+        # Entries rewritten since they were read are left alone
+        book_availability_service.replace(redis_client, {book["id"]: book_availability_service.AVAILABLE}, {book["id"]: True})
+        assert book_availability_service.read(redis_client, [book["id"]]) == {book["id"]: book_availability_service.LENT}
+        book_availability_service.replace(redis_client, {book["id"]: book_availability_service.LENT}, {book["id"]: True})
+        assert book_availability_service.read(redis_client, [book["id"]]) == {book["id"]: book_availability_service.AVAILABLE}
+
+
+# ─── bulk import ──────────────────────────────────────────────────────────────
+
+def import_books(content, filename, **params):
+    files = {"file": (filename, content.encode("utf-8"), "application/octet-stream")}
+    return client.post(f"{settings.API_V1_STR}/books/bulk", files=files, params=params)
+
+
+def test_bulk_import_csv():
+    author = create_author("Existing Author")
+    create_book(author["id"], isbn="ISBN-TAKEN")
+    content = (
+        "title,isbn,author_id,author_name\n"
+        f"By Id,ISBN-1,{author['id']},\n"
+        "By Name,ISBN-2,,New Author\n"
+        "Same Name,ISBN-3,,New Author\n"
+        "Taken,ISBN-TAKEN,,New Author\n"
+        "Repeated,ISBN-1,,New Author\n"
+        "Unknown Author,ISBN-4,424242,\n"
+        "No Author,ISBN-5,,\n"
+    )
+    resp = import_books(content, "books.csv")
+    assert resp.status_code == 200, resp.text
+    result = resp.json()
+    assert result["rows_read"] == 7
+    assert result["books_created"] == 3
+    assert result["authors_created"] == 1
+    assert result["duplicates_skipped"] == 2
+    assert result["errors_count"] == 2
+    assert sorted(e["line"] for e in result["errors"]) == [7, 8]
+
+    books = client.get(f"{settings.API_V1_STR}/books/", params={"limit": 10}).json()
+    assert len(books) == 4
+    assert {b["author"]["name"] for b in books if b["isbn"] in ("ISBN-2", "ISBN-3")} == {"New Author"}
+
+
+def test_bulk_import_jsonl_in_batches():
+    lines = [f'{{"title": "Book {i}", "isbn": "JL-{i % 25}", "author_name": "Author {i % 3}"}}' for i in range(30)]
+    lines.insert(5, "{not json")
+    with patch("app.services.book_import_service.BookImportService.BATCH_SIZE", 10):
+        resp = import_books("\n".join(lines) + "\n", "books.upload", format="jsonl")
+    assert resp.status_code == 200, resp.text
+    result = resp.json()
+    assert result["books_created"] == 25
+    assert result["rows_read"] == 31
+    assert result["duplicates_skipped"] == 5
+    assert result["authors_created"] == 3
+    assert result["errors"][0]["line"] == 6
+
+    authors = client.get(f"{settings.API_V1_STR}/books/authors/", params={"limit": 10}).json()
+    assert len(authors) == 3
+
+
+def test_bulk_import_rejects_blank_title_and_isbn():
+    lines = [
+        '{"title": "Kept", "isbn": "BL-1", "author_name": "Blank Author"}',
+        '{"title": "", "isbn": "BL-2", "author_name": "Blank Author"}',
+        '{"title": "   ", "isbn": "BL-3", "author_name": "Blank Author"}',
+        '{"title": "Blank ISBN", "isbn": "", "author_name": "Blank Author"}',
+        '{"title": "Spaces ISBN", "isbn": "  ", "author_name": "Blank Author"}',
+        '{"title": "No ISBN", "author_name": "Blank Author"}',
+    ]
+    resp = import_books("\n".join(lines) + "\n", "books.jsonl")
+    assert resp.status_code == 200, resp.text
+    result = resp.json()
+    assert result["books_created"] == 2
+    assert sorted(e["line"] for e in result["errors"]) == [2, 3, 4, 5]
+
+
+def test_bulk_import_unknown_format():
+    resp = import_books("title\n", "books.xml")
+    assert resp.status_code == 400
+
+
+# ─── search ───────────────────────────────────────────────────────────────────
+
+def search_titles(q, **params):
+    resp = client.get(f"{settings.API_V1_STR}/books/search", params={"q": q, **params})
+    assert resp.status_code == 200, resp.text
+    return [b["title"] for b in resp.json()]
+
+
+def test_search_books_prefix_typo_and_author():
+    le_guin = create_author("Ursula K. Le Guin")
+    herbert = create_author("Frank Herbert")
+    create_book(le_guin["id"], "The Dispossessed")
+    create_book(le_guin["id"], "The Left Hand of Darkness")
+    create_book(herbert["id"], "Dune")
+    create_book(herbert["id"], "Children of Dune")
+
+    assert search_titles("dispo") == ["The Dispossessed"]
+    assert search_titles("dispossesed") == ["The Dispossessed"]
+    assert search_titles("darkness le guin") == ["The Left Hand of Darkness"]
+    assert search_titles("herbert") == ["Dune", "Children of Dune"]
+    # Exact title matches rank above prefix matches ("dune" vs "duneland") and author matches
+    create_book(le_guin["id"], "Duneland")
+    assert search_titles("dune")[:2] == ["Dune", "Children of Dune"]
+    assert search_titles("dune", skip=1, limit=1) == ["Children of Dune"]
+    assert search_titles("nothing matches") == []
+
+
+def test_search_index_updates_on_create_book():
+    author = create_author("Octavia E. Butler")
+    create_book(author["id"], "Kindred")
+    assert search_titles("kindred") == ["Kindred"]
+
+    # Already built: the new book is added to the index directly, not on the next refresh
+    create_book(author["id"], "Parable of the Sower")
+    assert search_titles("sower") == ["Parable of the Sower"]
+    assert search_titles("butler") == ["Kindred", "Parable of the Sower"]
+
+
+# ─── rate limiting ────────────────────────────────────────────────────────────
+
+def test_rate_limit_enforced_without_redis():
+    """Limits hold whether counters live in Redis or, with Redis down, in the memory fallback."""
+    statuses = [
+        client.post(f"{settings.API_V1_STR}/books/authors/", json={"name": f"A{i}"}).status_code
+        for i in range(6)
+    ]
+    assert statuses == [200] * 5 + [429]
+
+
+# ─── authenticated user cache ─────────────────────────────────────────────────
+
+def test_current_user_cached_per_token_and_invalidated_on_update():
+    user = create_user()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user['id'])})}"}
+    del app.dependency_overrides[get_current_user]
+    try:
+        with patch.object(user_service, "get_user", wraps=user_service.get_user) as get_user:
+            for i in range(3):
+                resp = client.post(f"{settings.API_V1_STR}/books/authors/", json={"name": f"A{i}"}, headers=headers)
+                assert resp.status_code == 200, resp.text
+            assert get_user.call_count == 1
+        assert auth_cache.stats()["hits"] == 2
+
+        other = create_user()
+        resp = client.put(f"{settings.API_V1_STR}/users/{other['id']}", json={"is_active": False}, headers=headers)
+        assert resp.status_code == 403
+
+        resp = client.put(f"{settings.API_V1_STR}/users/{user['id']}", json={"is_active": False}, headers=headers)
+        assert resp.status_code == 200 and resp.json()["is_active"] is False
+
+        resp = client.post(f"{settings.API_V1_STR}/books/authors/", json={"name": "Late"}, headers=headers)
+        assert resp.status_code == 400
+        assert resp.json()["detail"] == "Inactive user"
+        assert auth_cache.stats()["misses"] == 2
+    finally:
+        app.dependency_overrides[get_current_user] = override_get_current_user
+
+
+def test_current_user_rejects_invalid_token():
+    del app.dependency_overrides[get_current_user]
+    try:
+        resp = client.post(f"{settings.API_V1_STR}/books/authors/", json={"name": "X"},
+                           headers={"Authorization": "Bearer not-a-jwt"})
+    finally:
+        app.dependency_overrides[get_current_user] = override_get_current_user
+    assert resp.status_code == 403
+
+
+# ─── password hashing pool ────────────────────────────────────────────────────
+
+def test_password_pool_sheds_load_when_full():
+    with patch.object(password_pool, "workers", 1), patch.object(password_pool, "max_pending", 0):
+        resp = client.post(f"{settings.API_V1_STR}/users/",
+                           json={"name": "Busy", "email": "busy@example.com", "password": "password123"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    assert password_pool.stats()["rejected"] >= 1
+
+
+# ─── access log ───────────────────────────────────────────────────────────────
+
+def test_access_log_samples_successes_and_keeps_errors_and_slow_requests(caplog):
+    caplog.set_level("INFO", logger="digital-lib.access")
+    with patch.object(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0):
+        client.get("/health")
+        client.get(f"{settings.API_V1_STR}/books/0")
+        with patch.object(settings, "ACCESS_LOG_SLOW_MS", 0.0):
+            client.get("/health")
+    records = [r for r in caplog.records if r.name == "digital-lib.access"]
+    assert [(r.path, r.status, r.levelname) for r in records] == [
+        (f"{settings.API_V1_STR}/books/0", 404, "WARNING"),
+        ("/health", 200, "WARNING"),
+    ]
+    line = json.loads(JsonFormatter().format(records[0]))
+    assert line["message"].startswith(f"GET {settings.API_V1_STR}/books/0 404 ")
+    assert line["status"] == 404 and line["method"] == "GET" and "duration_ms" in line
+
+
+# ─── metrics ──────────────────────────────────────────────────────────────────
+
+def test_metrics_per_route_latency_queries_and_rate_limits():
+    instrument_engine(engine, "test")
+    book_route = f"{settings.API_V1_STR}/books/{{book_id}}"
+    authors_route = f"{settings.API_V1_STR}/books/authors/"
+
+    def sample(name, **labels):
+        return registry.get_sample_value(name, labels) or 0.0
+
+    before = {
+        "latency": sample("http_request_duration_seconds_count", method="GET", route=book_route),
+        "queries": sample("db_queries_per_request_sum", route=book_route),
+        "rejected": sample("rate_limit_rejections_total", route=authors_route),
+        "not_found": sample("http_requests_total", method="GET", route=book_route, status="404"),
+    }
+    author = create_author()
+    book = create_book(author["id"])
+    assert client.get(f"{settings.API_V1_STR}/books/{book['id']}").status_code == 200
+    assert client.get(f"{settings.API_V1_STR}/books/{book['id'] + 1}").status_code == 404
+    statuses = [client.post(authors_route, json={"name": f"A{i}"}).status_code for i in range(5)]
+    assert statuses[-1] == 429
+
+    assert sample("http_request_duration_seconds_count", method="GET", route=book_route) == before["latency"] + 2
+    assert sample("http_requests_total", method="GET", route=book_route, status="404") == before["not_found"] + 1
+    # Without Redis each detail read loads the book with its author
+    assert sample("db_queries_per_request_sum", route=book_route) >= before["queries"] + 2
+    assert sample("rate_limit_rejections_total", route=authors_route) == before["rejected"] + 1
+    assert sample("http_requests_in_flight") == 0
+
+    body = client.get("/metrics").text
+    assert 'db_pool_wait_seconds_count{pool="sync"}' in body
+    assert 'cache_hits_total{cache="book"}' in body